@@ -0,0 +1,438 @@
+"""
+Benchmarks do editor e dos formatos do Graphos III, sem interface gráfica.
+
+    python benchmarks/bench_graphos.py                      # mede e compara com benchmarks/baseline.json
+    python benchmarks/bench_graphos.py --save-baseline      # grava as medidas como nova referência
+    python benchmarks/bench_graphos.py -k circle -k fill    # só os casos cujo nome contém um dos textos
+
+Casos medidos:
+    draw/*     ferramentas do MSScreen2Editor (linha, retângulos, círculos, lápis) em
+               vários tamanhos, incluindo a restrição de cor e o redesenho da região suja
+    fill/*     preenchimento da tela inteira e de uma célula 8x8
+    constraint restrição de duas cores sobre uma tela inteira de ruído (simples, no editor,
+               e o par de menor erro de msx_solver sobre uma tela RGB)
+    render     draw_all_pixels da tela inteira
+    decode/*   leitura de cada arquivo de III/ e readers/ (render_file)
+    encode/*   gravação de cada tela e alfabeto no próprio formato, alterados antes de cada repetição
+    import/*   importação de uma imagem 640x480 (msx_import) com cada pontilhado
+    script/*   análise e execução de um script de comandos (msx_commands) numa tela nova
+    startup/*  importação de main.py e, com display, a inicialização até a janela responder
+
+Sem display (ou com --no-tk) o editor roda sem widgets: os métodos de desenho são os
+mesmos, mas as imagens do Tk são trocadas por objetos que descartam os dados, então
+o redesenho mede a montagem dos dados e não o envio ao Tk. Com display, o editor é
+criado de verdade numa janela escondida.
+
+Cada caso é repetido várias vezes e o menor tempo é o comparado com a referência:
+o programa termina com código 1 se algum caso ficar mais lento que a referência
+por mais de --threshold (e por mais de MIN_DELTA_SECONDS, para ignorar ruído em
+casos de microssegundos).
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+from msx_screen2 import MSX_WIDTH, MSX_HEIGHT
+from msx_files import SCREEN_EXTENSIONS, file_kind, render_file, load_screen_document, save_screen_document
+from msx_alf import load_alf, save_alf
+from msx_shp import shape_cache
+from msx_solver import solve_screen
+from msx_import import DITHER_MODES, import_image
+from msx_commands import CommandRunner, parse_script
+from msx_surface import Screen2Surface
+from msx_render_service import RenderCache, render_png
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.25  # 25% mais lento que a referência conta como regressão
+MIN_DELTA_SECONDS = 0.0005
+SAMPLE_DIRS = ("III", "readers")
+PRIMITIVE_SIZES = (8, 64, 184)
+STROKE_POINTS = 200
+EVENTS_PER_IDLE = 8  # Eventos de movimento que o Tk entrega entre dois momentos ociosos
+STARTUP_REPEAT = 3
+SCRIPT_COMMANDS = 10_000
+
+
+# --- Editor sem interface ---
+class NullPhotoImage:
+    """Substitui tk.PhotoImage: aceita put e copy e descarta os dados."""
+
+    def __init__(self):
+        self.tk = self
+
+    def put(self, data, to=None):
+        pass
+
+    def call(self, *args):
+        return ""
+
+
+class NullViewport:
+    """Substitui msx_viewport.TileViewport: coordenadas no zoom padrão, sem células ampliadas."""
+
+    def __init__(self):
+        from msx_viewport import DEFAULT_ZOOM
+        self.zoom = DEFAULT_ZOOM
+
+    def msx_coords(self, window_x, window_y):
+        return window_x // self.zoom, window_y // self.zoom
+
+    def invalidate(self, x_min, y_min, x_max, y_max):
+        pass
+
+
+class NullCanvas:
+    def focus_set(self):
+        pass
+
+    def delete(self, *tags):
+        pass
+
+    def find_all(self):
+        return (1,)
+
+
+class HeadlessEditor:
+    """
+    Um MSScreen2Editor sem widgets nem loop de eventos: só o estado que as ferramentas
+    de desenho usam. after_idle guarda os callbacks, que flush() executa.
+    """
+
+    def __init__(self):
+        from msx_screen2_editor import MSScreen2Editor
+        editor = MSScreen2Editor.__new__(MSScreen2Editor)
+        editor.init_state()
+        editor.frame_image = NullPhotoImage()
+        editor.viewport = NullViewport()
+        editor.canvas = NullCanvas()
+        self._idle = []
+        editor.after_idle = lambda callback, *args: self._idle.append((callback, args))
+        self.editor = editor
+
+    def flush(self):
+        while self._idle:
+            callback, args = self._idle.pop(0)
+            callback(*args)
+
+    def close(self):
+        pass
+
+
+class TkEditor:
+    """O editor de verdade numa janela Tk escondida; flush() processa os eventos pendentes."""
+
+    def __init__(self):
+        import tkinter as tk
+        from msx_screen2_editor import MSScreen2Editor
+        self.root = tk.Tk()
+        self.root.withdraw()
+        self.editor = MSScreen2Editor(self.root)
+        self.root.update()
+
+    def flush(self):
+        self.root.update_idletasks()
+
+    def close(self):
+        self.root.destroy()
+
+
+def display_available() -> bool:
+    if sys.platform.startswith("win") or sys.platform == "darwin":
+        return True
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+# --- Medição ---
+def measure(function, repeat: int, setup=None) -> dict:
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return {"min": min(times), "median": statistics.median(times), "repeat": repeat}
+
+
+def noise_pixels(seed: int = 2) -> np.ndarray:
+    return np.random.default_rng(seed).integers(0, 16, size=(MSX_HEIGHT, MSX_WIDTH), dtype=np.uint8)
+
+
+def stroke_points(count: int = STROKE_POINTS, seed: int = 3):
+    """Pontos de um arrasto de lápis: passeio aleatório com passos de até 6 pixels."""
+    rng = np.random.default_rng(seed)
+    steps = rng.integers(-6, 7, size=(count, 2))
+    points = np.cumsum(steps, axis=0) + (MSX_WIDTH // 2, MSX_HEIGHT // 2)
+    points[:, 0] = np.clip(points[:, 0], 0, MSX_WIDTH - 1)
+    points[:, 1] = np.clip(points[:, 1], 0, MSX_HEIGHT - 1)
+    return [tuple(int(v) for v in p) for p in points]
+
+
+def editor_cases(view):
+    """[(nome, função, preparação)] das ferramentas de desenho sobre o editor de view."""
+    editor = view.editor
+
+    def blank():
+        editor.pixels[:] = editor.secondary_color_index
+        editor.constraint_blocks[:] = False
+        view.flush()
+
+    def noise():
+        editor.pixels[:] = noise_pixels()
+        editor.constraint_blocks[:] = True
+        view.flush()
+
+    def timed(draw):
+        def run():
+            draw()
+            view.flush()
+        return run
+
+    cases = []
+    for size in PRIMITIVE_SIZES:
+        end = size - 1
+        cases += [
+            (f"draw/line_{size}", timed(lambda e=end: editor.draw_line_pixels(0, 0, e, min(e, MSX_HEIGHT - 1))), blank),
+            (f"draw/rect_empty_{size}", timed(lambda e=end: editor.draw_rectangle_pixels(4, 4, 4 + e, 4 + e, fill=False)), blank),
+            (f"draw/rect_fill_{size}", timed(lambda e=end: editor.draw_rectangle_pixels(4, 4, 4 + e, 4 + e, fill=True)), blank),
+            (f"draw/circle_empty_{size}",
+             timed(lambda s=size: editor.draw_circle_pixels(128 - s // 2, 96, 128 + s // 2, 96, fill=False)), blank),
+            (f"draw/circle_fill_{size}",
+             timed(lambda s=size: editor.draw_circle_pixels(128 - s // 2, 96, 128 + s // 2, 96, fill=True)), blank),
+        ]
+
+    from msx_viewport import DEFAULT_ZOOM
+    points = stroke_points()
+    noise_rgb = np.random.default_rng(4).integers(0, 256, size=(MSX_HEIGHT, MSX_WIDTH, 3), dtype=np.uint8)
+
+    def stroke():
+        # Como on_mouse_drag: um segmento (com restrição e redesenho) por evento de movimento
+        for (x0, y0), (x1, y1) in zip(points, points[1:]):
+            editor.draw_line_pixels(x0, y0, x1, y1)
+            view.flush()
+
+    def drag():
+        # O arrasto pelos eventos do mouse (ferramenta lápis), com a fila de pontos esvaziada nos momentos ociosos
+        events = [SimpleNamespace(x=x * DEFAULT_ZOOM, y=y * DEFAULT_ZOOM) for x, y in points]
+        editor.on_mouse_down(events[0])
+        for i, event in enumerate(events[1:], 1):
+            editor.on_mouse_drag(event)
+            if i % EVENTS_PER_IDLE == 0:
+                view.flush()
+        editor.on_mouse_up(events[-1])
+        view.flush()
+
+    cases += [
+        (f"draw/pencil_stroke_{STROKE_POINTS}", stroke, blank),
+        (f"draw/pencil_drag_{STROKE_POINTS}", drag, blank),
+        ("fill/full_screen", timed(lambda: editor.fill_area(0, 0, 4)), blank),
+        ("fill/cell", timed(lambda: editor.fill_area(100, 100, 4, cell_mode=True)), blank),
+        ("constraint/full_screen", timed(editor.commit_operation), noise),
+        ("constraint/solver_full_screen", lambda: solve_screen(noise_rgb), None),
+        ("render/draw_all_pixels", editor.draw_all_pixels, noise),
+    ]
+    return cases
+
+
+def sample_files():
+    files = []
+    for folder in SAMPLE_DIRS:
+        path = os.path.join(ROOT, folder)
+        for name in sorted(os.listdir(path)):
+            if file_kind(name):
+                files.append((f"{folder}/{name}", os.path.join(path, name)))
+    return files
+
+
+def screen_encode_case(document, target: str):
+    """
+    Gravação de uma tela como o editor faz ao salvar: os blocos alterados são recodificados
+    sobre as tabelas do documento. A preparação desenha um retângulo de cor diferente a cada
+    repetição, para que nenhuma gravação encontre a tela já igual ao arquivo.
+    """
+    surface = Screen2Surface()
+    surface.load_vram(document.vram)
+    colors = itertools.cycle(range(1, 16))
+
+    def edit():
+        surface.rectangle(40, 40, 167, 103, True, next(colors))
+        surface.commit(0)
+
+    return (lambda: save_screen_document(target, surface.to_vram(document), document)), edit
+
+
+def font_encode_case(font, target: str):
+    """Gravação de um alfabeto com um caractere alterado antes de cada repetição."""
+    def edit():
+        font.glyphs[ord("A")] ^= 0xFF
+        font.invalidate()
+
+    return (lambda: save_alf(target, font)), edit
+
+
+def codec_cases(out_dir: str):
+    """Leitura de todos os arquivos de exemplo e gravação das telas e alfabetos no mesmo formato."""
+    cases = []
+    for label, path in sample_files():
+        cases.append((f"decode/{label}", lambda p=path: render_file(p), shape_cache.clear))
+        kind = file_kind(path)
+        target = os.path.join(out_dir, os.path.basename(path))
+        if kind in SCREEN_EXTENSIONS:
+            cases.append((f"encode/{label}", *screen_encode_case(load_screen_document(path), target)))
+        elif kind == ".alf":
+            cases.append((f"encode/{label}", *font_encode_case(load_alf(path), target)))
+
+    from PIL import Image
+    y, x = np.mgrid[0:480, 0:640]
+    photo = os.path.join(out_dir, "gradiente.png")
+    Image.fromarray(np.stack([x * 255 // 639, y * 255 // 479, (x + y) * 255 // 1118], axis=-1).astype(np.uint8)).save(photo)
+    for mode in DITHER_MODES:
+        cases.append((f"import/{mode}", lambda m=mode: import_image(photo, m), None))
+
+    rng = np.random.default_rng(5)
+    lines = []
+    for i in range(SCRIPT_COMMANDS // 4):
+        x0, x1 = rng.integers(0, MSX_WIDTH, 2)
+        y0, y1 = rng.integers(0, MSX_HEIGHT, 2)
+        lines += [f"COLOR {i % 15 + 1}", f"LINE {x0},{y0},{x1},{y1}", f"BOX {x0},{y0},{x1},{y1}{',F' if i % 2 else ''}",
+                  f"CIRCLE {x0},{y0},{(x1 + y1) % 48}{',F' if i % 3 == 0 else ''}"]
+    script = "\n".join(lines)
+    cases.append((f"script/commands_{SCRIPT_COMMANDS}", lambda: CommandRunner().run(parse_script(script)), None))
+
+    # O mesmo PNG pedido ao serviço: renderização completa e resposta vinda do cache
+    screen = os.path.join(ROOT, "III", "ROBOCOP.SCR")
+    render_cache = RenderCache()
+    cases.append(("service/render_png", lambda: render_png(screen, scale=2), shape_cache.clear))
+    cases.append(("service/render_png_cached", lambda: render_png(screen, scale=2, cache=render_cache),
+                  lambda: render_png(screen, scale=2, cache=render_cache)))
+    return cases
+
+
+def startup_cases(use_tk: bool):
+    """Tempo de parede de um interpretador novo: importar main e, com display, abrir até ficar pronto."""
+    work_dir = tempfile.mkdtemp(prefix="graphos_bench_")  # main.py cria o banco no diretório atual
+
+    def run(*args):
+        subprocess.run([sys.executable, *args], cwd=work_dir, check=True,
+                       stdout=subprocess.DEVNULL, env=dict(os.environ, PYTHONPATH=ROOT))
+
+    cases = [("startup/import_main", lambda: run("-c", "import main"), None)]
+    if use_tk:
+        cases.append(("startup/main_window", lambda: run(os.path.join(ROOT, "main.py"), "--startup-only"), None))
+    return cases
+
+
+def selected(name: str, filters) -> bool:
+    return not filters or any(f in name for f in filters)
+
+
+def run_benchmarks(args) -> dict:
+    use_tk = args.tk if args.tk is not None else display_available()
+    view = TkEditor() if use_tk else HeadlessEditor()
+    results = {}
+
+    def run_cases(cases, repeat):
+        for name, function, setup in cases:
+            if not selected(name, args.filter):
+                continue
+            results[name] = measure(function, repeat, setup)
+            if not args.quiet:
+                print(f"{name:45s} {results[name]['min'] * 1000:10.3f} ms")
+
+    try:
+        run_cases(editor_cases(view), args.repeat)
+    finally:
+        view.close()
+    with tempfile.TemporaryDirectory(prefix="graphos_bench_") as out_dir:
+        run_cases(codec_cases(out_dir), args.repeat)
+    if not args.skip_startup:
+        run_cases(startup_cases(use_tk), min(args.repeat, STARTUP_REPEAT))
+
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "tk": use_tk,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float):
+    """[(nome, referência, atual, razão)] dos casos que ficaram mais lentos além do limite."""
+    regressions = []
+    for name, current in results["results"].items():
+        reference = baseline.get("results", {}).get(name)
+        if reference is None:
+            continue
+        before, after = reference["min"], current["min"]
+        if after > before * (1 + threshold) and after - before > MIN_DELTA_SECONDS:
+            regressions.append((name, before, after, after / before))
+    return regressions
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmarks do editor e dos formatos do Graphos III.")
+    parser.add_argument("-o", "--output", help="grava os resultados em JSON neste arquivo")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="JSON de referência para a comparação")
+    parser.add_argument("--save-baseline", action="store_true", help="grava os resultados como nova referência")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="fração de lentidão tolerada antes de acusar regressão (0.25 = 25%%)")
+    parser.add_argument("-r", "--repeat", type=int, default=DEFAULT_REPEAT, help="repetições de cada caso")
+    parser.add_argument("-k", "--filter", action="append", help="só os casos cujo nome contém este texto")
+    parser.add_argument("--skip-startup", action="store_true", help="não mede a inicialização (processos novos)")
+    tk_group = parser.add_mutually_exclusive_group()
+    tk_group.add_argument("--tk", dest="tk", action="store_true", default=None, help="usa o Tk de verdade (precisa de display)")
+    tk_group.add_argument("--no-tk", dest="tk", action="store_false", help="roda o editor sem widgets")
+    parser.add_argument("-q", "--quiet", action="store_true", help="mostra apenas o resumo final")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = run_benchmarks(args)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Referência gravada em {args.baseline} ({len(results['results'])} casos).")
+        return 0
+
+    try:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    except OSError:
+        print(f"Sem referência em {args.baseline}; use --save-baseline para criar uma.")
+        return 0
+    regressions = compare(results, baseline, args.threshold)
+    for name, before, after, ratio in regressions:
+        print(f"REGRESSÃO {name}: {before * 1000:.3f} ms -> {after * 1000:.3f} ms ({ratio:.2f}x)", file=sys.stderr)
+    compared = sum(1 for name in results["results"] if name in baseline.get("results", {}))
+    print(f"{compared} caso(s) comparado(s) com {args.baseline}, {len(regressions)} regressão(ões) "
+          f"acima de {args.threshold:.0%}.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+"""
+Conversão em lote de arquivos do Graphos III, sem interface gráfica.
+
+    python graphos_cli.py png III/ -o png/            # .SCR .LAY .GRP .ALF .SHP -> PNG
+    python graphos_cli.py scr png/*.SCR.png -o telas/ # PNG -> .SCR (também lay, grp e alf)
+    python graphos_cli.py scr fotos/ --constraint otima # blocos com o par de cores de menor erro
+
+Usa os mesmos leitores e gravadores do editor (msx_files), mas nunca importa o
+customtkinter. Os arquivos são distribuídos em lotes entre processos, cada
+resultado é mostrado (e registrado) assim que fica pronto, e um manifesto no
+diretório de saída permite retomar uma conversão interrompida: arquivos já
+convertidos e não modificados desde então são pulados.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+import numpy as np
+from PIL import Image
+
+from msx_screen2 import MSX_PALETTE_RGB, MSX_WIDTH, MSX_HEIGHT, new_block_mask
+from msx_files import (GRAPHOS_EXTENSIONS, SCREEN_EXTENSIONS, file_kind, render_file, pixels_from_rgb,
+                       vram_from_pixels, save_screen_document, font_from_atlas)
+from msx_alf import save_alf
+from msx_solver import CONSTRAINT_MODES, apply_optimal_constraint, solve_screen
+from msx_surface import indexed_image
+
+MANIFEST_NAME = ".graphos_manifest.jsonl"
+DEFAULT_CHUNK_SIZE = 4
+TARGET_FORMATS = ("png",) + tuple(ext[1:] for ext in SCREEN_EXTENSIONS) + ("alf",)
+
+
+def collect_inputs(paths, extensions):
+    """
+    Arquivos (diretórios percorridos recursivamente) com uma das extensões, com a raiz de cada um,
+    e a lista dos caminhos pedidos que não existem.
+    """
+    found, missing = [], []
+    for path in paths:
+        if os.path.isdir(path):
+            for folder, _, names in os.walk(path):
+                for name in sorted(names):
+                    if name.lower().endswith(extensions):
+                        found.append((os.path.join(folder, name), path))
+        elif not os.path.isfile(path):
+            missing.append(path)
+        elif path.lower().endswith(extensions):
+            found.append((path, os.path.dirname(path)))
+    return found, missing
+
+
+def file_signature(path: str):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def save_png(filename: str, pixels: np.ndarray):
+    indexed_image(pixels).save(filename, optimize=False)
+
+
+def load_png_pixels(filename: str, constraint: str = "simples") -> np.ndarray:
+    """
+    Pixels indexados de um PNG: índices diretos se a paleta for a do MSX, senão a cor mais próxima.
+    Com constraint="otima", uma tela que viola a regra de duas cores recebe em cada bloco o par
+    de menor erro (msx_solver) em vez de ficar para a substituição simples da gravação.
+    """
+    optimal = constraint == "otima"
+    with Image.open(filename) as image:
+        if image.mode == "P" and bytes(image.getpalette()[:MSX_PALETTE_RGB.nbytes]) == MSX_PALETTE_RGB.tobytes():
+            pixels = np.array(image, dtype=np.uint8)
+            if pixels.max(initial=0) < 16:
+                if optimal and pixels.shape == (MSX_HEIGHT, MSX_WIDTH):
+                    apply_optimal_constraint(pixels, ~new_block_mask())
+                return pixels
+        rgb = np.asarray(image.convert("RGB"))
+        if optimal and rgb.shape[:2] == (MSX_HEIGHT, MSX_WIDTH):
+            return solve_screen(rgb)
+        return pixels_from_rgb(rgb)
+
+
+def output_base(source: str, root: str, out_dir: str) -> str:
+    """Caminho de saída que preserva os subdiretórios de source em relação a root."""
+    relative = os.path.relpath(source, root) if root else os.path.basename(source)
+    return os.path.join(out_dir, relative)
+
+
+def convert_to_png(source: str, base: str):
+    """ROBOCOP.SCR vira ROBOCOP.SCR.png; cada shape de um banco vira BANCO.SHP_000.png, ..."""
+    outputs = []
+    for suffix, pixels in render_file(source):
+        filename = f"{base}{suffix}.png"
+        save_png(filename, pixels)
+        outputs.append(filename)
+    return outputs
+
+
+def png_target_name(base: str, target: str) -> str:
+    """ROBOCOP.SCR.png vira ROBOCOP.SCR (ou .LAY, .GRP, .ALF conforme target)."""
+    stem = base[:-4] if base.lower().endswith(".png") else base
+    if file_kind(stem):
+        stem = os.path.splitext(stem)[0]
+    return f"{stem}.{target.upper()}"
+
+
+def output_key(job) -> str:
+    """Saída de um trabalho, normalizada para comparar: a base dos PNGs ou o arquivo gravado."""
+    source, root, out_dir, target, _ = job
+    base = output_base(source, root, out_dir)
+    return os.path.normcase(base if target == "png" else png_target_name(base, target))
+
+
+def drop_clashes(jobs):
+    """
+    Separa os trabalhos cuja saída já é de um trabalho anterior: [(trabalho, origem que ficou com a saída)].
+    O mesmo arquivo pedido duas vezes (sozinho e pelo diretório) é convertido uma vez só.
+    """
+    owners, kept, clashes = {}, [], []
+    for job in jobs:
+        key = output_key(job)
+        owner = owners.get(key)
+        if owner is None:
+            owners[key] = job[0]
+            kept.append(job)
+        elif owner != job[0]:
+            clashes.append((job, owner))
+    return kept, clashes
+
+
+def convert_from_png(source: str, base: str, target: str, constraint: str = "simples"):
+    """ROBOCOP.SCR.png vira ROBOCOP.SCR (ou .LAY, .GRP, .ALF conforme target)."""
+    filename = png_target_name(base, target)
+    pixels = load_png_pixels(source, "simples" if target == "alf" else constraint)
+    if target == "alf":
+        save_alf(filename, font_from_atlas(pixels))
+    else:
+        if pixels.shape != (MSX_HEIGHT, MSX_WIDTH):
+            raise ValueError(f"Tela deve ter {MSX_WIDTH}x{MSX_HEIGHT} pixels, recebido {pixels.shape[1]}x{pixels.shape[0]}.")
+        save_screen_document(filename, vram_from_pixels(pixels))
+    return [filename]
+
+
+def run_job(job):
+    """Executado nos processos de trabalho: converte um arquivo e devolve um resumo (sem exceções)."""
+    source, root, out_dir, target, constraint = job
+    start = time.perf_counter()
+    result = {"source": source, "target": target, "bytes": 0, "outputs": [], "error": None}
+    try:
+        result["signature"] = file_signature(source)
+        result["bytes"] = result["signature"][1]
+        base = output_base(source, root, out_dir)
+        os.makedirs(os.path.dirname(base) or ".", exist_ok=True)
+        if target == "png":
+            result["outputs"] = convert_to_png(source, base)
+        else:
+            result["outputs"] = convert_from_png(source, base, target, constraint)
+    except Exception as e: # Qualquer erro dos leitores (até DecompressionBombError do PIL) vira um erro do arquivo
+        result["error"] = str(e)
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def load_manifest(out_dir: str) -> dict:
+    """Conversões já concluídas: {(origem, formato): assinatura}. Linhas incompletas são ignoradas."""
+    done = {}
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue # Última linha cortada por uma interrupção
+                if all(os.path.exists(path) for path in entry["outputs"]):
+                    done[(entry["source"], entry["target"])] = tuple(entry["signature"])
+    except OSError:
+        pass
+    return done
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Conversão em lote de arquivos do Graphos III.")
+    parser.add_argument("target", choices=TARGET_FORMATS, help="formato de saída")
+    parser.add_argument("inputs", nargs="+", help="arquivos ou diretórios de entrada")
+    parser.add_argument("-o", "--output", default=".", help="diretório de saída")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="processos de trabalho")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="arquivos por lote enviado a cada processo")
+    parser.add_argument("--constraint", choices=CONSTRAINT_MODES, default="simples",
+                        help="blocos 8x1 com mais de duas cores (PNG -> tela): simples troca as cores excedentes, "
+                             "otima escolhe o par de menor erro")
+    parser.add_argument("--no-resume", action="store_true", help="converte tudo de novo, ignorando o manifesto")
+    parser.add_argument("-q", "--quiet", action="store_true", help="mostra apenas o resumo final")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    extensions = GRAPHOS_EXTENSIONS if args.target == "png" else (".png",)
+    out_dir = os.path.abspath(args.output)
+    os.makedirs(out_dir, exist_ok=True)
+
+    inputs, missing = collect_inputs(args.inputs, extensions)
+    for path in missing:
+        print(f"ERRO {path}: arquivo não encontrado", file=sys.stderr)
+    done = {} if args.no_resume else load_manifest(out_dir)
+    jobs = [(os.path.abspath(source), os.path.abspath(root), out_dir, args.target, args.constraint)
+            for source, root in inputs]
+    # Raízes diferentes com o mesmo caminho relativo gravariam no mesmo arquivo de saída
+    jobs, clashes = drop_clashes(jobs)
+    for job, owner in clashes:
+        print(f"ERRO {job[0]}: mesma saída que {owner} ({output_key(job)})", file=sys.stderr)
+    pending = [job for job in jobs if done.get((job[0], job[3])) != file_signature(job[0])]
+    skipped = len(jobs) - len(pending)
+    if skipped:
+        print(f"{skipped} arquivo(s) já convertido(s), retomando com {len(pending)}.")
+
+    start = time.perf_counter()
+    converted = total_bytes = 0
+    failed = len(missing) + len(clashes)
+    with open(os.path.join(out_dir, MANIFEST_NAME), "a", encoding="utf-8") as manifest:
+        if args.jobs > 1 and len(pending) > 1:
+            pool = Pool(processes=args.jobs)
+            results = pool.imap_unordered(run_job, pending, chunksize=max(args.chunk_size, 1))
+        else:
+            pool = None
+            results = map(run_job, pending)
+        try:
+            for result in results:
+                if result["error"]:
+                    failed += 1
+                    print(f"ERRO {result['source']}: {result['error']}", file=sys.stderr)
+                    continue
+                converted += 1
+                total_bytes += result["bytes"]
+                manifest.write(json.dumps(result) + "\n")
+                manifest.flush()
+                if not args.quiet:
+                    rate = result["bytes"] / 1024 / result["seconds"] if result["seconds"] else 0.0
+                    print(f"{result['source']} -> {len(result['outputs'])} arquivo(s) "
+                          f"em {result['seconds'] * 1000:.1f} ms ({rate:.0f} KB/s)")
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+    elapsed = time.perf_counter() - start
+    print(f"{converted} convertido(s), {failed} com erro, {skipped} pulado(s) em {elapsed:.2f} s "
+          f"({converted / elapsed if elapsed else 0:.0f} arquivos/s, {total_bytes / 1024 / elapsed if elapsed else 0:.0f} KB/s)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Acesso ao banco SQLite do editor (msx_screen_editor.db) por uma única conexão de longa duração.
+
+A conexão é aberta uma vez em modo WAL com synchronous=NORMAL, então um commit
+não força um fsync. As consultas usam textos SQL fixos, montados uma vez a
+partir de uma lista fechada de colunas, e ficam no cache de comandos preparados
+do sqlite3.
+
+A tabela configuracoes é lida uma vez para um dicionário em memória. Leituras
+saem do dicionário; alterações atualizam o dicionário na hora e são gravadas em
+lote, em uma única transação, quando flush() é chamado (a aplicação agenda o
+flush para logo depois de uma rajada de alterações e o executa ao fechar).
+"""
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+CONFIG_COLUMNS = ("tema", "ultima_tela_aberta")
+CONFIG_DEFAULTS = {"tema": "Dark", "ultima_tela_aberta": ""}
+STATEMENT_CACHE_SIZE = 128
+
+_CONFIG_SELECT = f"SELECT {', '.join(CONFIG_COLUMNS)} FROM configuracoes WHERE id = 1"
+_CONFIG_UPDATE = {column: f"UPDATE configuracoes SET {column} = ? WHERE id = 1" for column in CONFIG_COLUMNS}
+
+
+class GraphosDB:
+    """
+    Conexão única com o banco do editor e cache das configurações.
+
+    schedule_flush, se definido, recebe flush() sempre que uma configuração muda e
+    deve executá-lo mais tarde (por exemplo com Tk after); sem ele a gravação é imediata.
+    """
+
+    def __init__(self, db_file: str, schedule_flush=None):
+        self.db_file = db_file
+        self.schedule_flush = schedule_flush
+        self.conn = sqlite3.connect(db_file, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._lock = threading.RLock()
+        self._config = {}
+        self._pending = {}
+        self._flush_scheduled = False
+        self._setup()
+
+    def _setup(self):
+        with self.transaction() as conn:
+            conn.execute("""
+                         CREATE TABLE IF NOT EXISTS configuracoes
+                         (
+                             id                 INTEGER PRIMARY KEY,
+                             tema               TEXT NOT NULL,
+                             ultima_tela_aberta TEXT
+                         )
+                         """)
+            conn.execute("INSERT OR IGNORE INTO configuracoes (id, tema, ultima_tela_aberta) VALUES (1, ?, ?)",
+                         (CONFIG_DEFAULTS["tema"], CONFIG_DEFAULTS["ultima_tela_aberta"]))
+            row = conn.execute(_CONFIG_SELECT).fetchone()
+        self._config = {column: value for column, value in zip(CONFIG_COLUMNS, row)}
+
+    @contextmanager
+    def transaction(self):
+        """Executa um bloco de comandos em uma única transação (commit no fim, rollback em erro)."""
+        with self._lock:
+            with self.conn:
+                yield self.conn
+
+    # --- Configurações ---
+    def get_config(self, key: str) -> Optional[str]:
+        if key not in CONFIG_COLUMNS:
+            raise KeyError(f"Configuração desconhecida: {key}")
+        value = self._config.get(key)
+        return CONFIG_DEFAULTS[key] if value is None else str(value)
+
+    def set_config(self, key: str, value: str):
+        if key not in CONFIG_COLUMNS:
+            raise KeyError(f"Configuração desconhecida: {key}")
+        if self._config.get(key) == value:
+            return
+        self._config[key] = value
+        self._pending[key] = value
+        if self.schedule_flush is None:
+            self.flush()
+        elif not self._flush_scheduled:
+            self._flush_scheduled = True
+            self.schedule_flush(self.flush)
+
+    def flush(self):
+        """Grava todas as configurações alteradas desde o último flush em uma transação."""
+        self._flush_scheduled = False
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        with self.transaction() as conn:
+            for key, value in pending.items():
+                conn.execute(_CONFIG_UPDATE[key], (value,))
+
+    def close(self):
+        self.flush()
+        self.conn.close()
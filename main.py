@@ -1,27 +1,88 @@
+import time
+
+STARTUP_T0 = time.perf_counter()  # Antes das demais importações, para medir a inicialização inteira
+
+import argparse
 import customtkinter as ctk
 import sqlite3
+import io
 import os
+import sys
+import threading
+from tkinter import filedialog
 from typing import Optional
-from PIL import Image, ImageTk
 
-# --- IMPORTAÇÃO DO MÓDULO SCREEN 2 ---
-try:
-    from msx_screen2_editor import MSScreen2Editor
-except ImportError:
-    print("AVISO: Não foi possível importar 'msx_screen2_editor.py'. A opção 'edita tela' não funcionará como editor.")
+from graphos_db import GraphosDB, CONFIG_DEFAULTS
+from msx_profiler import Profiler
+
+# Os módulos com numpy, os codecs e o editor SCREEN 2 só são importados no primeiro
+# uso (ou em segundo plano, depois que a janela principal já responde).
+PRELOAD_MODULES = ("msx_screen2_editor", "msx_shp", "msx_alf", "msx_versions", "msx_thumbs")
+
+
+class MissingScreen2Editor:
+    def __init__(self, master, app_instance=None):
+        ctk.CTkLabel(master, text="ERRO: Módulo SCREEN 2 não encontrado!", fg_color="red").pack(pady=20)
 
+    def pack(self, **kwargs):
+        pass
 
-    class MSScreen2Editor:
-        def __init__(self, master, app_instance=None):
-            ctk.CTkLabel(master, text="ERRO: Módulo SCREEN 2 não encontrado!", fg_color="red").pack(pady=20)
 
-        def pack(self, **kwargs):
+_editor_class = None
+
+
+def screen2_editor_class():
+    """Classe do editor SCREEN 2, importada na primeira vez que é pedida."""
+    global _editor_class
+    if _editor_class is None:
+        try:
+            from msx_screen2_editor import MSScreen2Editor
+            _editor_class = MSScreen2Editor
+        except ImportError:
+            print("AVISO: Não foi possível importar 'msx_screen2_editor.py'. A opção 'edita tela' não funcionará como editor.")
+            _editor_class = MissingScreen2Editor
+    return _editor_class
+
+
+def preload_modules():
+    """Importa os módulos pesados numa thread, para que o primeiro uso não espere por eles."""
+    import importlib
+    for name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
             pass
 
-        # --- Constantes de Estilo e Configuração ---
+
+class StartupTimer:
+    """Tempo (ms desde STARTUP_T0) no fim de cada fase da inicialização."""
+
+    def __init__(self, start: float = STARTUP_T0):
+        self.start = start
+        self.phases = []
+
+    def mark(self, phase: str) -> float:
+        elapsed_ms = (time.perf_counter() - self.start) * 1000
+        self.phases.append((phase, elapsed_ms))
+        return elapsed_ms
+
+    def report(self) -> str:
+        return ", ".join(f"{phase} {elapsed_ms:.0f} ms" for phase, elapsed_ms in self.phases)
+
+
+# --- Constantes de Estilo e Configuração ---
 DB_FILE = "msx_screen_editor.db"
 SPLASH_IMAGE_PATH = "newgraphos.jpg"
-SPLASH_DURATION_MS = 4000
+PRELOAD_DELAY_MS = 100  # Espera a janela principal ser desenhada antes de importar o resto
+SHP_FILETYPES = [("Shapes Graphos III", "*.shp *.SHP"), ("Todos", "*.*")]
+SHAPE_PREVIEW_SCALE = 4
+ALF_FILETYPES = [("Alfabetos Graphos III", "*.alf *.ALF"), ("Todos", "*.*")]
+ALF_PREVIEW_SCALE = 3
+THUMB_COLUMNS = 5
+THUMB_POLL_MS = 40
+CONFIG_FLUSH_MS = 500  # Alterações de configuração em rajada viram uma única transação
+SCR_FILETYPES = [("Telas Graphos III", "*.scr *.SCR"), ("Telas BASIC (VRAM)", "*.grp *.GRP"), ("Layouts Graphos III", "*.lay *.LAY"), ("Todos", "*.*")]
+IMAGE_FILETYPES = [("Imagens", "*.png *.PNG *.jpg *.JPG *.jpeg *.JPEG *.bmp *.BMP *.gif *.GIF"), ("Todos", "*.*")]
 TITLE_TEXT = "Graphos III"
 
 # Cores Personalizadas (Hex) - Paleta de Acrílico/Glassmorphism
@@ -49,56 +110,29 @@ COR_SAIR = "#E53935"  # Vermelho Alaranjado (Moderno)
 HOVER_SAIR = "#FFCDD2"  # Rosa Claro (Simulação de clique/vidro pressionado)
 
 
-# Funções do SQLite (Mantidas)
-# ... (setup_database, get_config_value, update_config_value - Mantenha o código destas funções) ...
+# Funções do SQLite: uma conexão única (graphos_db) e configurações em cache na memória
+database: Optional[GraphosDB] = None
+
+
 def setup_database():
+    global database
     try:
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
-        cursor.execute("""
-                       CREATE TABLE IF NOT EXISTS configuracoes
-                       (
-                           id
-                           INTEGER
-                           PRIMARY
-                           KEY,
-                           tema
-                           TEXT
-                           NOT
-                           NULL,
-                           ultima_tela_aberta
-                           TEXT
-                       )
-                       """)
-        cursor.execute("SELECT id FROM configuracoes WHERE id = 1")
-        if cursor.fetchone() is None:
-            cursor.execute("INSERT INTO configuracoes (id, tema, ultima_tela_aberta) VALUES (1, ?, ?)",
-                           ("Dark", ""))
-        conn.commit()
-        conn.close()
+        database = GraphosDB(DB_FILE)
     except sqlite3.Error as e:
         print(f"Erro ao configurar o banco de dados: {e}")
 
 
 def get_config_value(key: str) -> Optional[str]:
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
-        cursor.execute(f"SELECT {key} FROM configuracoes WHERE id = 1")
-        result = cursor.fetchone()
-        conn.close()
-        return str(result[0]) if result else "Dark"
-    except sqlite3.Error as e:
-        return "Dark"
+    if database is None:
+        return CONFIG_DEFAULTS.get(key)
+    return database.get_config(key)
 
 
 def update_config_value(key: str, value: str):
+    if database is None:
+        return
     try:
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
-        cursor.execute(f"UPDATE configuracoes SET {key} = ? WHERE id = 1", (value,))
-        conn.commit()
-        conn.close()
+        database.set_config(key, value)
     except sqlite3.Error as e:
         print(f"Erro ao atualizar a configuração '{key}': {e}")
 
@@ -124,18 +158,54 @@ MAIN_MENU_OPTIONS = {
 
 # --- Classe Principal da Aplicação (O Editor) ---
 class App(ctk.CTk):
-    def __init__(self):
+    def __init__(self, show_splash: bool = True, startup: StartupTimer = None, exit_when_ready: bool = False,
+                 profile: bool = False):
         super().__init__()
+        self.profiler = Profiler(enabled=profile) # Compartilhado com o editor; ligado por --profile ou sub-opção
+        self.startup = startup or StartupTimer()
+        self.exit_when_ready = exit_when_ready
+        self.splash = None
+        if show_splash:
+            # A janela principal é montada escondida enquanto a splash aparece
+            self.withdraw()
+            self.splash = SplashScreen(self)
+            self.startup.mark("splash")
         self.current_editor = None
+        self.shape_library = None
+        self.current_shape = None
+        self.current_font = None
+        self.current_folder = None
+        self.thumbnail_loader = None
+        self.screen_versions = None
+        self.thumbnail_labels = {}
+        self.thumbnail_images = {}
+        self._thumbnail_poll_scheduled = False
         self.init_app()
+        self.startup.mark("janela")
+        self.after_idle(self._on_ready)
+
+    def _on_ready(self):
+        """Primeiro ciclo ocioso: a janela está montada, então a splash sai e o editor passa a responder."""
+        if self.splash is not None:
+            self.splash.destroy()
+            self.splash = None
+            self.deiconify()
+        self.update_idletasks()
+        self.startup.mark("interativo")
+        print(f"[INICIO] {self.startup.report()}")
+        if self.exit_when_ready:
+            self.quit()
+            return
+        self.after(PRELOAD_DELAY_MS, lambda: threading.Thread(target=preload_modules, daemon=True).start())
 
     def init_app(self):
         self.title("MSX Graphos III Editor")
         self.geometry("1200x800")
         self.minsize(800, 600)
-        self.deiconify()
         self.configure(fg_color=FUNDO_APLICACAO)
 
+        if database is not None:
+            database.schedule_flush = lambda flush: self.after(CONFIG_FLUSH_MS, flush)
         initial_theme = get_config_value("tema")
         if initial_theme:
             ctk.set_appearance_mode(initial_theme)
@@ -243,6 +313,31 @@ class App(ctk.CTk):
                                           corner_radius=5,
                                           font=ctk.CTkFont(family="Arial"))
         self.command_entry.grid(row=1, column=0, columnspan=2, padx=10, pady=(0, 5), sticky="ew")
+        self.command_entry.bind("<Return>", self.executa_comando)
+
+    def executa_comando(self, event=None):
+        """
+        Executa a linha de comandos na tela em edição (LINE, BOX, CIRCLE, ... ver msx_commands);
+        RUN "arquivo" executa um script inteiro no mesmo lote.
+        """
+        text = self.command_entry.get().strip()
+        if not text or not self._prepare_editor():
+            return
+        start = time.perf_counter()
+        runner, error = self.current_editor.run_commands(text, base_dir=os.getcwd(),
+                                                         shapes=self.shape_library, font=self.current_font)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        # LOAD pode ter trocado o banco de shapes ou o alfabeto
+        if runner.shapes is not self.shape_library:
+            if self.shape_library is not None:
+                self.shape_library.close()
+            self.shape_library, self.current_shape = runner.shapes, None
+        self.current_font = runner.font
+        if error:
+            self.log_status(f"Erro no comando: {error}")
+            return
+        self.command_entry.delete(0, "end")
+        self.log_status(f"{runner.executed} comando(s) em {elapsed_ms:.1f} ms")
 
     # Substitua esta função (simplificação):
     def log_status(self, message: str):
@@ -274,25 +369,55 @@ class App(ctk.CTk):
     def open_editor_screen2(self):
         self.clear_content_area()
         self.log_status("Modo: Edição de Tela (SCREEN 2, 256x192)")
-        self.current_editor = MSScreen2Editor(self.main_content_frame, app_instance=self)
+        self.current_editor = screen2_editor_class()(self.main_content_frame, app_instance=self)
         self.current_editor.pack(expand=True, fill="both")
         self._load_editor_sub_options()
 
     def _load_editor_sub_options(self):
-        for widget in [w for w in self.sub_options_frame.winfo_children() if w.winfo_class() != "CTkLabel"]:
-            widget.destroy()
-
-        # Botões com estilo moderno e cantos arredondados
-        ctk.CTkButton(self.sub_options_frame, text="EXPORTAR VRAM",
-                      command=lambda: self.log_status("Função: Exportar dados VRAM"),
-                      fg_color=FUNDO_TITULO, text_color="white", hover_color="#008C9E", corner_radius=8).pack(pady=5,
-                                                                                                              padx=8,
-                                                                                                              fill="x")
-        ctk.CTkButton(self.sub_options_frame, text="MUDAR PALETA",
-                      command=lambda: self.log_status("Função: Abrir Paleta de Cores"),
-                      fg_color=FUNDO_TITULO, text_color="white", hover_color="#008C9E", corner_radius=8).pack(pady=5,
-                                                                                                              padx=8,
-                                                                                                              fill="x")
+        self._show_sub_options([("EXPORTAR VRAM", self.exportar_vram),
+                                ("MUDAR PALETA", lambda: self.log_status("Função: Abrir Paleta de Cores")),
+                                ("PERFIL LIGA/DESLIGA", self.alterna_perfil),
+                                ("EXPORTAR TRACE", self.exportar_trace)])
+
+    def alterna_perfil(self):
+        """Liga ou desliga a instrumentação do editor (tempos e contadores na barra de status)."""
+        self.profiler.enabled = not self.profiler.enabled
+        if self.profiler.enabled:
+            self.profiler.clear()
+            self.log_status("Perfil ligado: cada operação mostra tempos e contadores aqui.")
+        else:
+            self.log_status(f"Perfil desligado ({len(self.profiler.events)} eventos guardados para exportar).")
+
+    def exportar_trace(self):
+        """Grava os eventos do perfil em JSON do Chrome (abrir em chrome://tracing ou no Perfetto)."""
+        if not self.profiler.events:
+            self.log_status("Nenhum evento de perfil para exportar. Ligue o perfil e desenhe algo.")
+            return
+        filename = filedialog.asksaveasfilename(title="Exportar trace", defaultextension=".json",
+                                                filetypes=[("Chrome Trace", "*.json"), ("Todos", "*.*")])
+        if not filename:
+            return
+        try:
+            count = self.profiler.export_chrome_trace(filename)
+        except OSError as e:
+            self.log_status(f"Erro ao exportar o trace: {e}")
+            return
+        self.log_status(f"Trace com {count} eventos exportado para {os.path.basename(filename)}")
+
+    def exportar_vram(self):
+        """Exporta as tabelas de padrões e cores da tela em edição (12 KB)."""
+        if not hasattr(self.current_editor, "export_vram"):
+            self.log_status("Abra o editor de tela antes de exportar a VRAM.")
+            return
+        filename = filedialog.asksaveasfilename(title="Exportar VRAM", defaultextension=".vram",
+                                                filetypes=[("VRAM SCREEN 2", "*.vram"), ("Todos", "*.*")])
+        if not filename:
+            return
+        try:
+            self.current_editor.export_vram(filename)
+            self.log_status(f"VRAM exportada para {os.path.basename(filename)}")
+        except OSError as e:
+            self.log_status(f"Erro ao exportar VRAM: {e}")
 
     def display_tela(self):
         self.clear_content_area()
@@ -301,36 +426,237 @@ class App(ctk.CTk):
                      font=ctk.CTkFont(family="Arial", size=20)).pack(pady=50)
 
     # --- Placeholder para as demais funções (Mantidas) ---
+    def _editor_is_open(self) -> bool:
+        return hasattr(self.current_editor, "load_screen_data") and self.current_editor.winfo_exists()
+
+    def _show_sub_options(self, options):
+        """Troca os botões do painel de sub-opções por [(texto, comando)]."""
+        for widget in [w for w in self.sub_options_frame.winfo_children() if w.winfo_class() != "CTkLabel"]:
+            widget.destroy()
+        for text, command in options:
+            ctk.CTkButton(self.sub_options_frame, text=text, command=command,
+                          fg_color=FUNDO_TITULO, text_color="white", hover_color="#008C9E",
+                          corner_radius=8).pack(pady=5, padx=8, fill="x")
+
+    def _screen_versions(self):
+        """Versões de telas no banco, ou None (com o aviso no status) se o banco não pôde ser aberto."""
+        if database is None:
+            self.log_status("Banco de dados indisponível: não é possível arquivar nem recuperar telas nele.")
+            return None
+        if self.screen_versions is None:
+            from msx_versions import ScreenVersions
+            self.screen_versions = ScreenVersions(database)
+        return self.screen_versions
+
     def arquiva_tela(self):
-        self.clear_content_area()
         self.log_status("Modo: Arquiva Tela")
-        ctk.CTkLabel(self.main_content_frame, text="Função de Salvar/Exportar Tela (binário MSX)",
-                     text_color=COR_TEXTO_PADRAO,
-                     font=ctk.CTkFont(family="Arial", size=20)).pack(pady=50)
+        if not self._editor_is_open():
+            self.log_status("Nenhuma tela em edição para arquivar. Use 'edita tela' ou 'recupera tela'.")
+            return
+        self._show_sub_options([("EM ARQUIVO...", self._arquiva_tela_em_arquivo),
+                                ("NO BANCO (VERSÃO)", self._arquiva_tela_no_banco)])
+
+    def _arquiva_tela_em_arquivo(self):
+        filename = filedialog.asksaveasfilename(title="Arquivar tela", defaultextension=".SCR",
+                                                filetypes=SCR_FILETYPES)
+        if not filename:
+            return
+        try:
+            start = time.perf_counter()
+            self.current_editor.save_screen_data(filename)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+        except OSError as e:
+            self.log_status(f"Erro ao arquivar a tela: {e}")
+            return
+        update_config_value("ultima_tela_aberta", filename)
+        self.log_status(f"Tela arquivada em {os.path.basename(filename)} ({elapsed_ms:.1f} ms)")
+
+    def _arquiva_tela_no_banco(self):
+        if not self._editor_is_open():
+            return
+        versions = self._screen_versions()
+        if versions is None:
+            return
+        name = ctk.CTkInputDialog(title="Arquivar no banco", text="Nome da tela:").get_input()
+        if not name:
+            return
+        try:
+            start = time.perf_counter()
+            version = versions.save(name.strip(), self.current_editor.to_vram())
+            elapsed_ms = (time.perf_counter() - start) * 1000
+        except sqlite3.Error as e:
+            self.log_status(f"Erro ao arquivar a tela no banco: {e}")
+            return
+        self.log_status(f"Tela '{name.strip()}' arquivada no banco, versão {version} ({elapsed_ms:.1f} ms)")
 
     def recupera_tela(self):
-        self.clear_content_area()
         self.log_status("Modo: Recupera Tela")
-        ctk.CTkLabel(self.main_content_frame, text="Função de Carregar Tela (binário MSX)", text_color=COR_TEXTO_PADRAO,
-                     font=ctk.CTkFont(family="Arial", size=20)).pack(pady=50)
+        self._show_sub_options([("DE ARQUIVO...", self._recupera_tela_de_arquivo),
+                                ("DO BANCO...", self._recupera_tela_do_banco),
+                                ("DE IMAGEM...", self._recupera_tela_de_imagem)])
+
+    def _prepare_editor(self) -> bool:
+        if not self._editor_is_open():
+            self.open_editor_screen2()
+        return self._editor_is_open()
+
+    def _recupera_tela_de_arquivo(self):
+        initial_file = get_config_value("ultima_tela_aberta")
+        filename = filedialog.askopenfilename(title="Recuperar tela", filetypes=SCR_FILETYPES,
+                                              initialdir=os.path.dirname(initial_file) if initial_file else None)
+        if not filename or not self._prepare_editor():
+            return
+        try:
+            start = time.perf_counter()
+            self.current_editor.load_screen_data(filename)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+        except (OSError, ValueError) as e:
+            self.log_status(f"Erro ao recuperar a tela: {e}")
+            return
+        update_config_value("ultima_tela_aberta", filename)
+        self.log_status(f"Tela {os.path.basename(filename)} recuperada ({elapsed_ms:.1f} ms)")
+
+    def _recupera_tela_de_imagem(self):
+        """
+        Converte uma imagem qualquer (PNG, JPEG, ...) para o SCREEN 2 e a abre no editor.
+        A janela de opções continua aberta para testar outro pontilhado na mesma imagem.
+        """
+        filename = filedialog.askopenfilename(title="Importar imagem", filetypes=IMAGE_FILETYPES)
+        if not filename or not self._prepare_editor():
+            return
+        from msx_import import DITHER_MODES, import_image
+        from msx_scr import ScrFile
+        window = ctk.CTkToplevel(self)
+        window.title(f"Importar {os.path.basename(filename)}")
+        window.resizable(False, False)
+        dither_menu = ctk.CTkOptionMenu(window, values=[mode.upper() for mode in DITHER_MODES])
+        dither_menu.set("DIFUSAO")
+        dither_menu.pack(pady=5, padx=10, fill="x")
+        keep_aspect = ctk.CTkCheckBox(window, text="Manter proporção")
+        keep_aspect.pack(pady=5, padx=10, anchor="w")
+
+        def apply():
+            if not self._prepare_editor():
+                window.destroy()
+                return
+            try:
+                start = time.perf_counter()
+                vram = import_image(filename, dither_menu.get().lower(), bool(keep_aspect.get()))
+                elapsed_ms = (time.perf_counter() - start) * 1000
+            except (OSError, ValueError) as e:
+                self.log_status(f"Erro ao importar a imagem: {e}")
+                return
+            self.current_editor.show_document(ScrFile(vram))
+            self.log_status(f"Imagem {os.path.basename(filename)} importada, pontilhado "
+                            f"{dither_menu.get().lower()} ({elapsed_ms:.1f} ms)")
+
+        ctk.CTkButton(window, text="APLICAR", command=apply, fg_color=FUNDO_TITULO, text_color="white",
+                      hover_color="#008C9E", corner_radius=8).pack(pady=5, padx=10, fill="x")
+        ctk.CTkButton(window, text="FECHAR", command=window.destroy, fg_color=FUNDO_TITULO, text_color="white",
+                      hover_color="#008C9E", corner_radius=8).pack(pady=5, padx=10, fill="x")
+        apply()
+
+    def _recupera_tela_do_banco(self):
+        """Janela com as telas do banco; escolher uma lista as versões (apenas metadados)."""
+        versions = self._screen_versions()
+        if versions is None:
+            return
+        screens = versions.screens()
+        if not screens:
+            self.log_status("Nenhuma tela arquivada no banco.")
+            return
+        window = ctk.CTkToplevel(self)
+        window.title("Telas no banco")
+        window.geometry("640x420")
+        window.grid_columnconfigure((0, 1), weight=1)
+        window.grid_rowconfigure(0, weight=1)
+        screen_list = ctk.CTkScrollableFrame(window, label_text="Telas")
+        screen_list.grid(row=0, column=0, sticky="nsew", padx=5, pady=5)
+        version_list = ctk.CTkScrollableFrame(window, label_text="Versões")
+        version_list.grid(row=0, column=1, sticky="nsew", padx=5, pady=5)
+
+        def show_versions(name):
+            for widget in version_list.winfo_children():
+                widget.destroy()
+            for info in versions.versions(name):
+                when = time.strftime("%d/%m/%Y %H:%M", time.localtime(info.created))
+                ctk.CTkButton(version_list,
+                              text=f"v{info.version}  {when}  {info.kind} ({info.cells} células, {info.size} bytes)",
+                              command=lambda v=info.version: self._carrega_versao(name, v, window),
+                              fg_color=FUNDO_TITULO, text_color="white", hover_color="#008C9E",
+                              corner_radius=8).pack(pady=2, padx=4, fill="x")
+
+        for screen in screens:
+            ctk.CTkButton(screen_list, text=f"{screen.name} ({screen.versions} versões)",
+                          command=lambda n=screen.name: show_versions(n),
+                          fg_color=FUNDO_TITULO, text_color="white", hover_color="#008C9E",
+                          corner_radius=8).pack(pady=2, padx=4, fill="x")
+
+    def _carrega_versao(self, name: str, version: int, window):
+        versions = self._screen_versions()
+        if versions is None:
+            return
+        try:
+            start = time.perf_counter()
+            vram = versions.load(name, version)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+        except (KeyError, sqlite3.Error) as e:
+            self.log_status(f"Erro ao recuperar a tela do banco: {e}")
+            return
+        window.destroy()
+        if not self._prepare_editor():
+            return
+        from msx_scr import ScrFile
+        self.current_editor.show_document(ScrFile(vram))
+        self.log_status(f"Tela '{name}' versão {version} recuperada do banco ({elapsed_ms:.1f} ms)")
 
     def edita_alfabeto(self):
         self.clear_content_area()
         self.log_status("Modo: Edita Alfabeto (Pattern/Char Table)")
-        ctk.CTkLabel(self.main_content_frame, text="EDITOR DE CARACTERES 8x8 AQUI", text_color=COR_TEXTO_PADRAO,
-                     font=ctk.CTkFont(family="Arial", size=20)).pack(pady=50)
+        if self.current_font is None:
+            ctk.CTkLabel(self.main_content_frame, text="Nenhum alfabeto carregado. Use 'recupera alfabeto'.",
+                         text_color=COR_TEXTO_PADRAO, font=ctk.CTkFont(family="Arial", size=20)).pack(pady=50)
+            return
+        # O atlas já tem os 256 caracteres prontos; só é ampliado para exibição
+        from PIL import Image
+        image = Image.fromarray(self.current_font.atlas_image())
+        size = (image.width * ALF_PREVIEW_SCALE, image.height * ALF_PREVIEW_SCALE)
+        image = image.resize(size, Image.NEAREST)
+        self.font_atlas_image = ctk.CTkImage(light_image=image, dark_image=image, size=size)
+        ctk.CTkLabel(self.main_content_frame, image=self.font_atlas_image, text="").pack(expand=True)
 
     def arquiva_alfabeto(self):
-        self.clear_content_area()
         self.log_status("Modo: Arquiva Alfabeto")
-        ctk.CTkLabel(self.main_content_frame, text="Função de salvar Pattern Table", text_color=COR_TEXTO_PADRAO,
-                     font=ctk.CTkFont(family="Arial", size=20)).pack(pady=50)
+        if self.current_font is None:
+            self.log_status("Nenhum alfabeto carregado para arquivar.")
+            return
+        filename = filedialog.asksaveasfilename(title="Arquivar alfabeto", defaultextension=".ALF",
+                                                filetypes=ALF_FILETYPES)
+        if not filename:
+            return
+        from msx_alf import save_alf
+        try:
+            save_alf(filename, self.current_font)
+        except OSError as e:
+            self.log_status(f"Erro ao arquivar o alfabeto: {e}")
+            return
+        self.log_status(f"Alfabeto arquivado em {os.path.basename(filename)}")
 
     def recupera_alfabeto(self):
-        self.clear_content_area()
         self.log_status("Modo: Recupera Alfabeto")
-        ctk.CTkLabel(self.main_content_frame, text="Função de carregar Pattern Table", text_color=COR_TEXTO_PADRAO,
-                     font=ctk.CTkFont(family="Arial", size=20)).pack(pady=50)
+        filename = filedialog.askopenfilename(title="Recuperar alfabeto", filetypes=ALF_FILETYPES)
+        if not filename:
+            return
+        from msx_alf import load_alf
+        try:
+            font = load_alf(filename)
+        except (OSError, ValueError) as e:
+            self.log_status(f"Erro ao recuperar o alfabeto: {e}")
+            return
+        self.current_font = font
+        if not self._editor_is_open():
+            self.edita_alfabeto()
+        self.log_status(f"Alfabeto {os.path.basename(filename)} recuperado; use a ferramenta Texto no editor")
 
     def cria_shapes(self):
         self.clear_content_area()
@@ -345,17 +671,126 @@ class App(ctk.CTk):
                      font=ctk.CTkFont(family="Arial", size=20)).pack(pady=50)
 
     def recupera_shapes(self):
-        self.clear_content_area()
         self.log_status("Modo: Recupera Shapes")
-        ctk.CTkLabel(self.main_content_frame, text="Função de carregar Sprite/Shape data", text_color=COR_TEXTO_PADRAO,
-                     font=ctk.CTkFont(family="Arial", size=20)).pack(pady=50)
-
-    def mostra_diretorio(self):
+        filename = filedialog.askopenfilename(title="Recuperar shapes", filetypes=SHP_FILETYPES)
+        if not filename:
+            return
+        from msx_shp import ShapeLibrary
+        try:
+            start = time.perf_counter()
+            library = ShapeLibrary(filename)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+        except OSError as e:
+            self.log_status(f"Erro ao recuperar os shapes: {e}")
+            return
+        if self.shape_library is not None:
+            self.shape_library.close()
+        self.shape_library = library
+        self.current_shape = None
+        self._show_shape_browser()
+        status = f"{len(library)} shapes em {os.path.basename(filename)} ({elapsed_ms:.1f} ms)"
+        if not library.complete:
+            status += " - arquivo danificado, shapes seguintes ignorados"
+        self.log_status(status)
+
+    def _show_shape_browser(self):
+        """Lista os shapes do banco aberto; um shape só é decodificado ao ser selecionado."""
         self.clear_content_area()
-        self.log_status("Modo: Mostra Diretório")
-        ctk.CTkLabel(self.main_content_frame, text=f"Conteúdo do diretório atual:\n{os.getcwd()}",
-                     text_color=COR_TEXTO_PADRAO,
-                     font=ctk.CTkFont(family="Arial", size=20)).pack(pady=50)
+        browser = ctk.CTkFrame(self.main_content_frame, fg_color="transparent")
+        browser.pack(expand=True, fill="both", padx=10, pady=10)
+        browser.grid_columnconfigure(1, weight=1)
+        browser.grid_rowconfigure(0, weight=1)
+
+        shape_list = ctk.CTkScrollableFrame(browser, width=220, fg_color=FUNDO_SUB_OPCOES)
+        shape_list.grid(row=0, column=0, sticky="ns", padx=(0, 10))
+        self.shape_preview_label = ctk.CTkLabel(browser, text="Selecione um shape", text_color=COR_TEXTO_PADRAO)
+        self.shape_preview_label.grid(row=0, column=1, sticky="nsew")
+
+        for index, entry in enumerate(self.shape_library.entries):
+            ctk.CTkButton(shape_list,
+                          text=f"{entry.number:3d}  tipo {entry.shape_type}  {entry.width}x{entry.height_chars * 8}",
+                          command=lambda i=index: self._select_shape(i),
+                          fg_color=FUNDO_TITULO, text_color="white", hover_color="#008C9E",
+                          corner_radius=8).pack(pady=2, padx=4, fill="x")
+
+    def _select_shape(self, index: int):
+        from PIL import Image
+        shape = self.shape_library[index]
+        self.current_shape = shape
+        size = (shape.width * SHAPE_PREVIEW_SCALE, shape.height * SHAPE_PREVIEW_SCALE)
+        image = Image.fromarray(shape.to_rgb()).resize(size, Image.NEAREST)
+        self.shape_preview_image = ctk.CTkImage(light_image=image, dark_image=image, size=size)
+        self.shape_preview_label.configure(image=self.shape_preview_image, text="")
+        self.log_status(f"Shape {shape.number} selecionado ({shape.width}x{shape.height}, tipo {shape.shape_type})")
+
+    def mostra_diretorio(self, folder: str = None):
+        """Mostra miniaturas de todos os arquivos do Graphos da pasta, geradas em segundo plano."""
+        from msx_thumbs import (ThumbnailStore, MemoryThumbnailStore, ThumbnailLoader, list_graphos_files,
+                                THUMB_WIDTH, THUMB_HEIGHT)
+        self.clear_content_area()
+        folder = folder or self.current_folder or os.getcwd()
+        self.current_folder = folder
+        self.log_status(f"Modo: Mostra Diretório ({folder})")
+        if self.thumbnail_loader is None:
+            # Sem banco, as miniaturas ficam só na memória e são geradas de novo a cada execução
+            store = ThumbnailStore(database) if database is not None else MemoryThumbnailStore()
+            self.thumbnail_loader = ThumbnailLoader(store)
+
+        header = ctk.CTkFrame(self.main_content_frame, fg_color="transparent")
+        header.pack(fill="x", padx=10, pady=(10, 0))
+        ctk.CTkLabel(header, text=folder, text_color=COR_TEXTO_PADRAO).pack(side="left")
+        ctk.CTkButton(header, text="Trocar pasta", command=self._escolhe_pasta,
+                      fg_color=FUNDO_TITULO, text_color="white", hover_color="#008C9E",
+                      corner_radius=8).pack(side="right")
+        grid = ctk.CTkScrollableFrame(self.main_content_frame, fg_color=FUNDO_SUB_OPCOES)
+        grid.pack(expand=True, fill="both", padx=10, pady=10)
+
+        try:
+            entries = list_graphos_files(folder)
+        except OSError as e:
+            self.log_status(f"Erro ao ler a pasta: {e}")
+            return
+        self.thumbnail_labels = {}
+        self.thumbnail_images = {}
+        for i, (path, _, _) in enumerate(entries):
+            label = ctk.CTkLabel(grid, text=os.path.basename(path), compound="top", text_color=COR_TEXTO_PADRAO,
+                                 width=THUMB_WIDTH + 8, height=THUMB_HEIGHT + 24)
+            label.grid(row=i // THUMB_COLUMNS, column=i % THUMB_COLUMNS, padx=4, pady=4)
+            self.thumbnail_labels[path] = label
+
+        # Miniaturas já no banco aparecem agora; as demais chegam pela fila do carregador
+        for path, png in self.thumbnail_loader.request(entries).items():
+            self._mostra_miniatura(path, png)
+        self._agenda_miniaturas()
+
+    def _escolhe_pasta(self):
+        folder = filedialog.askdirectory(title="Mostrar diretório", initialdir=self.current_folder)
+        if folder:
+            self.mostra_diretorio(folder)
+
+    def _agenda_miniaturas(self):
+        if self.thumbnail_loader.pending and not self._thumbnail_poll_scheduled:
+            self._thumbnail_poll_scheduled = True
+            self.after(THUMB_POLL_MS, self._recebe_miniaturas)
+
+    def _recebe_miniaturas(self):
+        self._thumbnail_poll_scheduled = False
+        for path, png in self.thumbnail_loader.poll():
+            self._mostra_miniatura(path, png)
+        self._agenda_miniaturas()
+
+    def _mostra_miniatura(self, path: str, png: Optional[bytes]):
+        label = self.thumbnail_labels.get(path)
+        if label is None or not label.winfo_exists():
+            return # A pasta foi trocada ou a tela fechada
+        if png is None:
+            label.configure(text=f"{os.path.basename(path)}\n(não foi possível ler)")
+            return
+        from PIL import Image
+        image = Image.open(io.BytesIO(png))
+        image.load()
+        self.thumbnail_images[path] = ctk.CTkImage(light_image=image, dark_image=image, size=image.size)
+        label.configure(image=self.thumbnail_images[path])
 
     def versao_sistema(self):
         self.clear_content_area()
@@ -367,22 +802,25 @@ class App(ctk.CTk):
 
     def quit(self):
         self.log_status("Encerrando aplicação...")
+        if self.thumbnail_loader is not None:
+            self.thumbnail_loader.shutdown()
+        if database is not None:
+            database.flush()
         super().quit()
 
 
-# --- Classe da Splash Screen (Mantida) ---
-class SplashScreen(ctk.CTk):
-    def __init__(self, app_to_run):
-        super().__init__()
-        self.app_to_run = app_to_run
+# --- Classe da Splash Screen ---
+class SplashScreen(ctk.CTkToplevel):
+    """Imagem de abertura mostrada enquanto a janela principal é montada; App a fecha quando fica pronta."""
 
+    def __init__(self, master):
+        super().__init__(master)
         self.overrideredirect(True)
         self.wm_attributes("-topmost", True)
         self.resizable(False, False)
         ctk.set_appearance_mode("Dark")
 
         self.img_tk = self.load_splash_image()
-
         if self.img_tk:
             img_width = self.img_tk.width()
             img_height = self.img_tk.height()
@@ -395,29 +833,44 @@ class SplashScreen(ctk.CTk):
 
             label = ctk.CTkLabel(self, image=self.img_tk, text="")
             label.pack(expand=True, fill="both")
-
-            self.after(SPLASH_DURATION_MS, self.start_main_app)
-        else:
-            self.start_main_app()
+        self.update()  # Desenha a splash agora; o loop de eventos só começa depois de montada a janela
 
     def load_splash_image(self):
         if not os.path.exists(SPLASH_IMAGE_PATH):
             return None
 
         try:
+            from PIL import Image, ImageTk
             img = Image.open(SPLASH_IMAGE_PATH)
             return ImageTk.PhotoImage(img)
         except Exception as e:
             return None
 
-    def start_main_app(self):
-        self.destroy()
-        main_app = self.app_to_run()
-        main_app.mainloop()
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Editor gráfico MSX Graphos III.")
+    parser.add_argument("--no-splash", action="store_true", help="abre direto a janela principal (início rápido)")
+    parser.add_argument("--startup-only", action="store_true",
+                        help="encerra assim que a janela fica pronta, depois de mostrar os tempos de inicialização")
+    parser.add_argument("--profile", action="store_true",
+                        help="liga a instrumentação do editor (tempos e contadores na barra de status)")
+    return parser.parse_args(argv)
 
-# --- Execução Principal (Mantida) ---
-if __name__ == "__main__":
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    startup = StartupTimer()
+    startup.mark("importações")
     setup_database()
-    splash = SplashScreen(App)
-    splash.mainloop()
\ No newline at end of file
+    startup.mark("banco")
+    app = App(show_splash=not (args.no_splash or args.startup_only), startup=startup,
+              exit_when_ready=args.startup_only, profile=args.profile)
+    app.mainloop()
+    if database is not None:
+        database.close()
+    return 0
+
+
+# --- Execução Principal ---
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Alfabetos .ALF do Graphos III: cópias do gerador de caracteres (256 caracteres 8x8).
+
+Formato (ver readers/g3viewer.doc e readers/msxalfvw.pas): arquivo binário MSX
+com cabeçalho FE 00 92 FF 99 00 92 seguido dos 2 KB de padrões, 8 bytes por
+caractere, bit 7 à esquerda. Os arquivos gravados pelo Graphos têm bytes extras
+de preenchimento depois dos padrões, preservados ao salvar.
+
+Os caracteres são convertidos uma única vez em um atlas; depois disso um texto
+inteiro vira um plano de bits com uma indexação do atlas, pronto para ser
+carimbado na tabela de padrões por msx_stamp.stamp_planes.
+"""
+import numpy as np
+
+from msx_scr import BSAVE_ID, HEADER_SIZE, DEFAULT_BASE_ADDRESS, bsave_header
+from msx_screen2 import MSX_PALETTE_RGB
+
+GLYPH_COUNT = 256
+GLYPH_HEIGHT = 8
+ALF_SIZE = GLYPH_COUNT * GLYPH_HEIGHT
+ATLAS_COLUMNS = 32  # Mesmo arranjo do visualizador: 32 x 8 caracteres
+
+# Estilos do menu TEXTO do Graphos III: (dupla altura, dupla largura, negrito, itálico)
+TEXT_STYLES = {
+    "normal": (False, False, False, False),
+    "italic": (False, False, False, True),
+    "bold": (False, False, True, False),
+    "duplo": (True, False, False, False),
+    "duplo_bold": (True, True, False, False),
+    "largo": (False, True, False, False),
+}
+
+# Cada byte com os bits duplicados (16 bits), para a dupla largura
+_WIDE_BITS = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).repeat(2, axis=1)
+WIDE_BYTES = np.packbits(_WIDE_BITS, axis=1)  # (256, 2)
+
+
+class AlfFont:
+    """Um alfabeto: os 2 KB de padrões, o cabeçalho e os bytes extras do arquivo."""
+
+    def __init__(self, glyphs=None, header: bytes = None, trailer: bytes = b""):
+        self.glyphs = np.zeros((GLYPH_COUNT, GLYPH_HEIGHT), dtype=np.uint8)
+        if glyphs is not None:
+            self.glyphs[:] = np.frombuffer(bytes(glyphs), dtype=np.uint8).reshape(GLYPH_COUNT, GLYPH_HEIGHT)
+        self.header = header
+        self.trailer = bytes(trailer)
+        self._atlas = None
+
+    @property
+    def atlas(self) -> np.ndarray:
+        """Todos os caracteres já expandidos em pixels: array bool (256, 8, 8), montado uma vez."""
+        if self._atlas is None:
+            self._atlas = np.unpackbits(self.glyphs, axis=1).reshape(GLYPH_COUNT, GLYPH_HEIGHT, 8).astype(bool)
+        return self._atlas
+
+    def invalidate(self):
+        """Descarta o atlas depois de alterar glyphs."""
+        self._atlas = None
+
+    def atlas_pixels(self, foreground: int = 15, background: int = 0) -> np.ndarray:
+        """Pixels indexados (64, 256) com os 256 caracteres em 8 linhas de 32."""
+        grid = self.atlas.reshape(GLYPH_COUNT // ATLAS_COLUMNS, ATLAS_COLUMNS, GLYPH_HEIGHT, 8)
+        grid = grid.transpose(0, 2, 1, 3).reshape(GLYPH_COUNT // ATLAS_COLUMNS * GLYPH_HEIGHT, ATLAS_COLUMNS * 8)
+        return np.where(grid, np.uint8(foreground), np.uint8(background))
+
+    def atlas_image(self, foreground: int = 15, background: int = 0) -> np.ndarray:
+        """Mesmo arranjo de atlas_pixels, como imagem RGB (64, 256, 3)."""
+        return MSX_PALETTE_RGB[self.atlas_pixels(foreground, background)]
+
+    def text_plane(self, text: str, style: str = "normal") -> np.ndarray:
+        """
+        Plano de bits (linhas, bytes) de um texto; cada linha do texto ocupa 8 linhas
+        de pixels (16 em dupla altura) e as linhas curtas são completadas com espaços.
+        """
+        double_height, double_width, bold, italic = TEXT_STYLES[style]
+        lines = text.split("\n")
+        columns = max(len(line) for line in lines)
+        codes = np.full((len(lines), columns), ord(" "), dtype=np.uint8)
+        for row, line in enumerate(lines):
+            codes[row, :len(line)] = np.frombuffer(line.encode("latin-1", "replace"), dtype=np.uint8)
+
+        # (linha de texto, caractere, linha do caractere) -> (linha de pixels, byte)
+        plane = self.glyphs[codes].transpose(0, 2, 1).reshape(len(lines) * GLYPH_HEIGHT, columns)
+        if bold:
+            plane = plane | _shift_right(plane, 1)
+        if italic:
+            rows = np.arange(plane.shape[0]) % GLYPH_HEIGHT
+            plane = _shift_rows(plane, (GLYPH_HEIGHT - 1 - rows) // 3)
+        if double_width:
+            plane = WIDE_BYTES[plane].reshape(plane.shape[0], -1)
+        if double_height:
+            plane = plane.repeat(2, axis=0)
+        return plane
+
+    def tobytes(self) -> bytes:
+        header = self.header
+        if header is None:
+            header = bsave_header(DEFAULT_BASE_ADDRESS, DEFAULT_BASE_ADDRESS + ALF_SIZE - 1, DEFAULT_BASE_ADDRESS)
+        return header + self.glyphs.tobytes() + self.trailer
+
+
+def _shift_right(plane: np.ndarray, bits: int) -> np.ndarray:
+    """Desloca cada linha do plano bits pixels para a direita, atravessando os bytes."""
+    unpacked = np.unpackbits(plane, axis=1)
+    shifted = np.zeros_like(unpacked)
+    shifted[:, bits:] = unpacked[:, :-bits]
+    return np.packbits(shifted, axis=1)
+
+
+def _shift_rows(plane: np.ndarray, shifts: np.ndarray) -> np.ndarray:
+    """Desloca cada linha do plano pelo seu próprio número de pixels (itálico)."""
+    unpacked = np.unpackbits(plane, axis=1)
+    width = unpacked.shape[1]
+    source = np.arange(width)[None, :] - shifts[:, None]
+    valid = source >= 0
+    shifted = np.where(valid, np.take_along_axis(unpacked, np.maximum(source, 0), axis=1), 0)
+    return np.packbits(shifted.astype(np.uint8), axis=1)
+
+
+def parse_alf(data: bytes) -> AlfFont:
+    if len(data) < HEADER_SIZE or data[0] != BSAVE_ID:
+        raise ValueError("Arquivo .ALF inválido: cabeçalho binário MSX (FE) ausente.")
+    glyphs = data[HEADER_SIZE:HEADER_SIZE + ALF_SIZE]
+    if len(glyphs) < ALF_SIZE:
+        raise ValueError(f"Arquivo .ALF truncado: {len(glyphs)} de {ALF_SIZE} bytes de caracteres.")
+    return AlfFont(glyphs, data[:HEADER_SIZE], data[HEADER_SIZE + ALF_SIZE:])
+
+
+def load_alf(filename: str) -> AlfFont:
+    with open(filename, "rb") as f:
+        return parse_alf(f.read())
+
+
+def save_alf(filename: str, font: AlfFont):
+    with open(filename, "wb") as f:
+        f.write(font.tobytes())
@@ -0,0 +1,320 @@
+"""
+Linguagem de comandos de desenho do Graphos III (linha de comandos e scripts), sem interface gráfica.
+
+Um comando por linha, ou vários separados por ':'; argumentos separados por
+vírgulas, textos entre aspas, e o que vem depois de um apóstrofo é comentário.
+Coordenadas em pixels MSX, cores de 0 a 15:
+
+    COLOR tinta[,papel]             cores de frente e de fundo dos comandos seguintes
+    LINE x0,y0,x1,y1
+    BOX x0,y0,x1,y1[,F]             retângulo; F = cheio
+    CIRCLE cx,cy,raio[,F]
+    ELLIPSE cx,cy,rx,ry[,F]         elipse de semieixos rx e ry
+    POLY x0,y0,x1,y1,x2,y2[,...][,F]  polígono fechado, de 3 a 32 vértices
+    FILL x,y[,cor]                  preenchimento de área (cor padrão: a tinta)
+    STAMP n,x,y[,modo]              shape n do banco carregado (modos de msx_stamp)
+    TEXT x,y,"texto"[,estilo]       com o alfabeto carregado (estilos de msx_alf)
+    CLS [cor]
+    LOAD "arquivo"                  tela (.SCR .GRP .LAY), banco de shapes (.SHP) ou alfabeto (.ALF)
+    SAVE "arquivo"                  tela no formato da extensão
+    RUN "arquivo"                   executa outro script no mesmo lote
+
+O script inteiro é analisado uma vez (erros de sintaxe aparecem antes de qualquer
+desenho) e executado direto no framebuffer por uma msx_surface.Screen2Surface: os blocos
+8x1 tocados só são marcados, e a restrição de duas cores roda uma única vez no fim
+(ou antes de um SAVE), com a tinta final como cor de substituição. O retângulo
+alterado é acumulado para um único redesenho. Um script de 10.000 linhas,
+retângulos e círculos roda em cerca de um segundo e meio; FILL de áreas muito
+recortadas é o comando mais caro.
+
+    python msx_commands.py desenho.cmd -o DESENHO.SCR
+"""
+import argparse
+import os
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from msx_files import SCREEN_EXTENSIONS, file_kind, load_screen_document, save_screen_document
+from msx_surface import Screen2Surface
+from msx_stamp import STAMP_MODES
+from msx_alf import TEXT_STYLES, load_alf
+from msx_solver import CONSTRAINT_MODES
+
+Command = namedtuple("Command", "line name args")
+
+# Argumentos de cada comando: obrigatórios e opcionais. i = inteiro, s = texto entre aspas, w = palavra
+COMMANDS = {
+    "COLOR": ("i", "i"),
+    "LINE": ("iiii", ""),
+    "BOX": ("iiii", "w"),
+    "CIRCLE": ("iii", "w"),
+    "ELLIPSE": ("iiii", "w"),
+    "POLY": ("iiiiii", "*"),  # Mais pares x,y e a palavra opcional no fim
+    "FILL": ("ii", "i"),
+    "STAMP": ("iii", "w"),
+    "TEXT": ("iis", "w"),
+    "CLS": ("", "i"),
+    "LOAD": ("s", ""),
+    "SAVE": ("s", ""),
+    "RUN": ("s", ""),
+}
+# Palavras aceitas como último argumento
+COMMAND_WORDS = {"BOX": ("f",), "CIRCLE": ("f",), "ELLIPSE": ("f",), "POLY": ("f",), "STAMP": STAMP_MODES,
+                 "TEXT": tuple(TEXT_STYLES)}
+MAX_RUN_DEPTH = 8
+MAX_POLY_POINTS = 32
+MSX_INT_RANGE = (-32768, 32767)  # Inteiros do MSX-BASIC; limita o custo de linhas e círculos enormes
+
+
+def check_color(color: int):
+    if not 0 <= color <= 15:
+        raise ValueError(f"cor {color} fora da paleta (0 a 15)")
+
+
+def split_outside_quotes(text: str, separator: str):
+    """Divide text em separator, ignorando os que estão entre aspas."""
+    parts, start, quoted = [], 0, False
+    for i, char in enumerate(text):
+        if char == '"':
+            quoted = not quoted
+        elif char == separator and not quoted:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+
+def parse_argument(token: str, kind: str, name: str):
+    if kind == "s":
+        if len(token) < 2 or token[0] != '"' or token[-1] != '"':
+            raise ValueError(f"{name}: texto entre aspas esperado, recebido {token or 'nada'}")
+        return token[1:-1]
+    if kind == "w":
+        word = token.lower()
+        if word not in COMMAND_WORDS[name]:
+            raise ValueError(f"{name}: '{token}' inválido (use {', '.join(w.upper() for w in COMMAND_WORDS[name])})")
+        return word
+    try:
+        value = int(token)
+    except ValueError:
+        raise ValueError(f"{name}: número esperado, recebido {token or 'nada'}") from None
+    if not MSX_INT_RANGE[0] <= value <= MSX_INT_RANGE[1]:
+        raise ValueError(f"{name}: {value} fora do intervalo {MSX_INT_RANGE[0]} a {MSX_INT_RANGE[1]}")
+    return value
+
+
+def parse_statement(statement: str, line: int) -> Command:
+    name, rest = (statement.split(None, 1) + [""])[:2]
+    name = name.upper()
+    if name not in COMMANDS:
+        raise ValueError(f"linha {line}: comando desconhecido '{name}'")
+    required, optional = COMMANDS[name]
+    tokens = [token.strip() for token in split_outside_quotes(rest, ",")] if rest.strip() else []
+    if optional == "*":
+        words = int(bool(tokens) and tokens[-1].lower() in COMMAND_WORDS[name])
+        numbers = len(tokens) - words
+        if numbers % 2 or not len(required) <= numbers <= 2 * MAX_POLY_POINTS:
+            raise ValueError(f"linha {line}: {name} espera de {len(required) // 2} a {MAX_POLY_POINTS} pares x,y, "
+                             f"recebeu {numbers} número(s)")
+        kinds = "i" * numbers + "w" * words
+    elif not len(required) <= len(tokens) <= len(required) + len(optional):
+        raise ValueError(f"linha {line}: {name} espera {len(required)}"
+                         f"{f' a {len(required) + len(optional)}' if optional else ''} argumento(s), recebeu {len(tokens)}")
+    else:
+        kinds = required + optional
+    try:
+        return Command(line, name, tuple(parse_argument(token, kind, name) for token, kind in zip(tokens, kinds)))
+    except ValueError as e:
+        raise ValueError(f"linha {line}: {e}") from None
+
+
+def parse_script(text: str):
+    """Texto do script -> lista de Command. Levanta ValueError (com o número da linha) no primeiro erro."""
+    commands = []
+    for number, line in enumerate(text.splitlines(), 1):
+        code = split_outside_quotes(line, "'")[0]
+        for statement in split_outside_quotes(code, ":"):
+            if statement.strip():
+                commands.append(parse_statement(statement, number))
+    return commands
+
+
+class CommandRunner:
+    """
+    Executa comandos sobre um framebuffer (MSX_HEIGHT x MSX_WIDTH, uint8), que é alterado
+    no lugar através de uma msx_surface.Screen2Surface. shapes (msx_shp.ShapeLibrary), font
+    (msx_alf.AlfFont) e document (tela lida de um arquivo) podem vir de fora e ser trocados por LOAD.
+    """
+
+    def __init__(self, pixels: np.ndarray = None, ink: int = 15, paper: int = 0, shapes=None, font=None,
+                 document=None, constraint_mode: str = "simples", stamp_mode: str = "mascara", base_dir: str = "."):
+        self.surface = Screen2Surface(pixels, background=paper)
+        self.ink, self.paper = ink, paper
+        self.shapes, self.font, self.document = shapes, font, document
+        self.constraint_mode = constraint_mode
+        self.stamp_mode = stamp_mode
+        self.base_dir = base_dir
+        self.executed = 0
+        self.constraint_passes = 0
+        self._own_shapes = False  # Banco aberto por LOAD, fechado ao ser trocado
+        self._depth = 0
+
+    @property
+    def pixels(self) -> np.ndarray:
+        return self.surface.pixels
+
+    @property
+    def region(self):
+        """Retângulo alterado (x_min, y_min, x_max, y_max) ainda não redesenhado, ou None."""
+        return self.surface.dirty_region
+
+    def path(self, filename: str) -> str:
+        return filename if os.path.isabs(filename) else os.path.join(self.base_dir, filename)
+
+    # --- Execução ---
+    def run(self, commands):
+        """Executa os comandos e aplica a restrição de cor pendente; devolve o retângulo alterado (ou None)."""
+        self.execute(commands)
+        self.commit()
+        return self.region
+
+    def run_script(self, text: str):
+        return self.run(parse_script(text))
+
+    def execute(self, commands):
+        for command in commands:
+            try:
+                getattr(self, f"do_{command.name.lower()}")(*command.args)
+            except (ValueError, IndexError, OSError) as e:
+                raise ValueError(f"linha {command.line}: {command.name}: {e}") from None
+            self.executed += 1
+
+    def commit(self):
+        """A restrição de duas cores, de uma vez, para todos os blocos tocados desde a anterior."""
+        if self.surface.constraint_blocks.any():
+            self.surface.commit(self.ink, self.constraint_mode)
+            self.constraint_passes += 1
+
+    # --- Comandos ---
+    def do_color(self, ink: int, paper: int = None):
+        check_color(ink)
+        if paper is not None:
+            check_color(paper)
+            self.paper = paper
+        self.ink = ink
+
+    def do_line(self, x0: int, y0: int, x1: int, y1: int):
+        self.surface.line(x0, y0, x1, y1, self.ink)
+
+    def do_box(self, x0: int, y0: int, x1: int, y1: int, fill: str = None):
+        self.surface.rectangle(x0, y0, x1, y1, bool(fill), self.ink)
+
+    def do_circle(self, cx: int, cy: int, radius: int, fill: str = None):
+        if radius < 0:
+            raise ValueError(f"raio negativo ({radius})")
+        self.surface.circle(cx, cy, radius, bool(fill), self.ink)
+
+    def do_ellipse(self, cx: int, cy: int, rx: int, ry: int, fill: str = None):
+        if rx < 0 or ry < 0:
+            raise ValueError(f"semieixo negativo ({rx}, {ry})")
+        self.surface.ellipse(cx, cy, rx, ry, bool(fill), self.ink)
+
+    def do_poly(self, *args):
+        fill = isinstance(args[-1], str)
+        numbers = args[:-1] if fill else args
+        self.surface.polygon(list(zip(numbers[0::2], numbers[1::2])), fill, self.ink)
+
+    def do_fill(self, x: int, y: int, color: int = None):
+        color = self.ink if color is None else color
+        check_color(color)
+        self.surface.fill(x, y, color)
+
+    def do_stamp(self, number: int, x: int, y: int, mode: str = None):
+        if self.shapes is None:
+            raise ValueError("nenhum banco de shapes carregado (use LOAD \"arquivo.SHP\")")
+        if number < 0:
+            raise ValueError(f"shape negativo ({number})")
+        self.surface.stamp(self.shapes[number], x, y, mode or self.stamp_mode, self.ink, self.paper)
+
+    def do_text(self, x: int, y: int, text: str, style: str = "normal"):
+        if self.font is None:
+            raise ValueError("nenhum alfabeto carregado (use LOAD \"arquivo.ALF\")")
+        self.surface.text(self.font, text, x, y, style, self.stamp_mode, self.ink, self.paper)
+
+    def do_cls(self, color: int = None):
+        color = self.paper if color is None else color
+        check_color(color)
+        self.surface.clear(color)
+
+    def do_load(self, filename: str):
+        path = self.path(filename)
+        kind = file_kind(path)
+        if kind in SCREEN_EXTENSIONS:
+            self.document = load_screen_document(path)
+            self.surface.load_vram(self.document.vram)
+        elif kind == ".shp":
+            from msx_shp import ShapeLibrary
+            library = ShapeLibrary(path)
+            if self._own_shapes:
+                self.shapes.close()
+            self.shapes, self._own_shapes = library, True
+        elif kind == ".alf":
+            self.font = load_alf(path)
+        else:
+            raise ValueError(f"formato não suportado: {filename}")
+
+    def do_save(self, filename: str):
+        path = self.path(filename)
+        if file_kind(path) not in SCREEN_EXTENSIONS:
+            raise ValueError(f"SAVE grava apenas telas ({', '.join(e[1:].upper() for e in SCREEN_EXTENSIONS)})")
+        self.commit()
+        vram = self.surface.to_vram(self.document)
+        document = save_screen_document(path, vram, self.document)
+        if document is not None:
+            self.document = document
+
+    def do_run(self, filename: str):
+        if self._depth >= MAX_RUN_DEPTH:
+            raise ValueError(f"RUN aninhado mais de {MAX_RUN_DEPTH} vezes")
+        path = self.path(filename)
+        with open(path, encoding="utf-8") as f:
+            commands = parse_script(f.read())
+        saved_dir = self.base_dir
+        self._depth += 1
+        self.base_dir = os.path.dirname(path)
+        try:
+            self.execute(commands)
+        finally:
+            self._depth -= 1
+            self.base_dir = saved_dir
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Executa scripts de comandos de desenho do Graphos III.")
+    parser.add_argument("scripts", nargs="+", help="arquivos de script, executados em sequência na mesma tela")
+    parser.add_argument("-o", "--output", help="grava a tela final (.SCR, .GRP ou .LAY)")
+    parser.add_argument("--constraint", choices=CONSTRAINT_MODES, default="simples",
+                        help="restrição de duas cores aplicada no fim")
+    args = parser.parse_args(argv)
+
+    runner = CommandRunner(constraint_mode=args.constraint)
+    start = time.perf_counter()
+    try:
+        for script in args.scripts:
+            runner.do_run(os.path.abspath(script))
+        runner.commit()
+        if args.output:
+            runner.do_save(os.path.abspath(args.output))
+    except (OSError, ValueError) as e:
+        print(f"ERRO {e}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+    print(f"{runner.executed} comando(s) em {elapsed:.2f} s, {runner.constraint_passes} passe(s) de restrição")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Leitura e gravação de todos os arquivos do Graphos III por extensão, sem interface gráfica.
+
+Usado pelo editor (msx_screen2_editor.py) e pela conversão em lote (graphos_cli.py):
+telas (.SCR, .LAY, .GRP) viram documentos com um Screen2VRAM em .vram; alfabetos
+(.ALF) e bancos de shapes (.SHP) viram imagens indexadas para exportação.
+"""
+import os
+
+import numpy as np
+
+from msx_screen2 import MSX_PALETTE_RGB, apply_color_constraint, new_block_mask
+from msx_vram import Screen2VRAM
+from msx_scr import ScrFile, load_scr, save_scr
+from msx_lay import LayFile, load_lay, save_lay
+from msx_grp import GrpFile, load_grp, save_grp
+from msx_alf import AlfFont, load_alf, GLYPH_COUNT, GLYPH_HEIGHT, ATLAS_COLUMNS
+from msx_shp import ShapeLibrary
+
+SCREEN_EXTENSIONS = (".scr", ".lay", ".grp")
+GRAPHOS_EXTENSIONS = SCREEN_EXTENSIONS + (".alf", ".shp")
+
+
+def file_kind(filename: str) -> str:
+    """Extensão em minúsculas ('.scr', '.shp', ...) ou '' se não for um arquivo do Graphos."""
+    ext = os.path.splitext(filename)[1].lower()
+    return ext if ext in GRAPHOS_EXTENSIONS else ""
+
+
+def load_screen_document(filename: str):
+    """Lê uma tela .SCR, .LAY ou .GRP; o documento devolvido tem as tabelas em .vram."""
+    kind = file_kind(filename)
+    if kind == ".lay":
+        return ScrFile(load_lay(filename).to_vram())
+    if kind == ".grp":
+        return load_grp(filename)
+    return load_scr(filename)
+
+
+def save_screen_document(filename: str, vram: Screen2VRAM, document=None):
+    """
+    Grava as tabelas no formato indicado pela extensão. Um documento do mesmo formato
+    (lido antes) mantém cabeçalho, programa de exibição e bytes extras originais.
+    Devolve o documento gravado, ou None para .LAY (que só guarda os padrões).
+    """
+    kind = file_kind(filename)
+    if kind == ".lay":
+        save_lay(filename, LayFile.from_vram(vram))
+        return None
+    if kind == ".grp":
+        if not isinstance(document, GrpFile):
+            document = GrpFile(vram)
+        save_grp(filename, document)
+        return document
+    if not isinstance(document, ScrFile):
+        document = ScrFile(vram)
+    save_scr(filename, document)
+    return document
+
+
+def pixels_from_rgb(rgb: np.ndarray) -> np.ndarray:
+    """Converte uma imagem RGB (altura, largura, 3) para índices da paleta MSX pela cor mais próxima."""
+    colors, inverse = np.unique(rgb.reshape(-1, 3), axis=0, return_inverse=True)
+    distance = ((colors[:, None, :].astype(np.int32) - MSX_PALETTE_RGB[None, :, :]) ** 2).sum(axis=2)
+    return distance.argmin(axis=1).astype(np.uint8)[inverse.ravel()].reshape(rgb.shape[:2])
+
+
+def vram_from_pixels(pixels: np.ndarray) -> Screen2VRAM:
+    """Tabelas de uma tela indexada qualquer, depois de aplicar a restrição de duas cores."""
+    pixels = pixels.copy()
+    dirty = new_block_mask()
+    dirty[:] = True
+    background = int(np.bincount(pixels.ravel(), minlength=16).argmax())
+    apply_color_constraint(pixels, dirty, background)
+    return Screen2VRAM.from_pixels(pixels)
+
+
+def font_from_atlas(pixels: np.ndarray, background: int = 0) -> AlfFont:
+    """Alfabeto a partir de um atlas indexado de 32 x 8 caracteres (o inverso de AlfFont.atlas_pixels)."""
+    rows = GLYPH_COUNT // ATLAS_COLUMNS
+    bits = (pixels != background).reshape(rows, GLYPH_HEIGHT, ATLAS_COLUMNS, 8).transpose(0, 2, 1, 3)
+    return AlfFont(np.packbits(bits.reshape(GLYPH_COUNT * GLYPH_HEIGHT, 8), axis=1).tobytes())
+
+
+def render_file(filename: str):
+    """
+    Imagens indexadas (nome, pixels) de um arquivo do Graphos: uma para telas e
+    alfabetos, uma por shape para bancos .SHP (nome com o índice do shape).
+    """
+    kind = file_kind(filename)
+    if kind in SCREEN_EXTENSIONS:
+        return [("", load_screen_document(filename).vram.to_pixels())]
+    if kind == ".alf":
+        return [("", load_alf(filename).atlas_pixels())]
+    if kind == ".shp":
+        with ShapeLibrary(filename) as library:
+            return [(f"_{index:03d}", shape.to_pixels()) for index, shape in enumerate(library)]
+    raise ValueError(f"Formato não suportado: {filename}")
@@ -0,0 +1,87 @@
+"""
+Telas .GRP: cópia direta da VRAM do SCREEN 2 gravada com BSAVE ,S.
+
+Diferente do .SCR, o arquivo guarda a VRAM a partir do endereço 0 com o layout
+padrão do BASIC: padrões em &H0000, nomes em &H1800, atributos de sprites em
+&H1B00 e cores em &H2000, normalmente até &H37FF (algumas telas vão até &H3FFF
+e incluem os padrões de sprites). Os programas III/GRPTO*.BAS convertem desse
+formato para os demais.
+
+A imagem inteira da VRAM é mantida, e as tabelas de padrões, cores e nomes são
+copiadas de e para um Screen2VRAM, de modo que ler e gravar reproduz o arquivo.
+"""
+from msx_vram import Screen2VRAM, PATTERN_SIZE, COLOR_SIZE, NAME_SIZE, DEFAULT_COLOR
+from msx_scr import BSAVE_ID, HEADER_SIZE, bsave_header
+
+GRP_PATTERN = 0x0000
+GRP_NAME = 0x1800
+GRP_COLOR = 0x2000
+GRP_END = GRP_COLOR + COLOR_SIZE  # Fim das tabelas usadas pelo SCREEN 2 (exclusivo)
+
+
+class GrpFile:
+    """Uma tela .GRP: tabelas do SCREEN 2 e a imagem completa da VRAM gravada."""
+
+    def __init__(self, vram: Screen2VRAM = None, header: bytes = None, image: bytes = None):
+        self.vram = vram if vram is not None else Screen2VRAM()
+        self.header = bytes(header) if header is not None else bsave_header(0, GRP_END - 1, 0)
+        self.image = bytearray(image if image is not None else bytes(GRP_END))
+
+    def tobytes(self) -> bytes:
+        """
+        Arquivo completo, com as tabelas atuais do documento gravadas sobre a imagem da VRAM.
+        Uma imagem truncada continua truncada enquanto a parte que falta estiver como foi
+        completada na leitura; se algo foi alterado nela, a imagem é gravada até GRP_END e
+        o fim declarado no cabeçalho é estendido até lá.
+        """
+        length = len(self.image)
+        image = padded_image(self.image)
+        image[GRP_PATTERN:GRP_PATTERN + PATTERN_SIZE] = self.vram.pattern
+        image[GRP_NAME:GRP_NAME + NAME_SIZE] = self.vram.names
+        image[GRP_COLOR:GRP_COLOR + COLOR_SIZE] = self.vram.color
+        header = self.header
+        if length < GRP_END:
+            if image[length:] == EMPTY_IMAGE[length:]:
+                return header + bytes(image[:length])
+            end = max(header[3] | (header[4] << 8), GRP_END - 1)
+            header = bsave_header(0, end, header[5] | (header[6] << 8))
+        return header + bytes(image)
+
+
+def padded_image(image) -> bytearray:
+    """Imagem da VRAM completada até GRP_END como nos visualizadores (padrão 0, cor $F0)."""
+    padded = bytearray(image)
+    if len(padded) < GRP_END:
+        start = max(len(padded), GRP_COLOR)
+        padded += bytes(GRP_END - len(padded))
+        padded[start:GRP_END] = bytes([DEFAULT_COLOR]) * (GRP_END - start)
+    return padded
+
+
+# Imagem de uma tela vazia, como a leitura completa arquivos truncados
+EMPTY_IMAGE = bytes(padded_image(b""))
+
+
+def parse_grp(data) -> GrpFile:
+    data = memoryview(data)
+    if len(data) < HEADER_SIZE or data[0] != BSAVE_ID:
+        raise ValueError("Arquivo .GRP inválido: cabeçalho binário MSX (FE) ausente.")
+    start = data[1] | (data[2] << 8)
+    if start != 0:
+        raise ValueError(f"Arquivo .GRP inválido: a VRAM deve começar no endereço 0, não em &H{start:04X}.")
+
+    image = data[HEADER_SIZE:]
+    padded = padded_image(image)  # Arquivo truncado: o que faltar fica como nos visualizadores
+    buffer = padded[GRP_PATTERN:GRP_PATTERN + PATTERN_SIZE] + padded[GRP_COLOR:GRP_END]
+    vram = Screen2VRAM(buffer, padded[GRP_NAME:GRP_NAME + NAME_SIZE])
+    return GrpFile(vram, data[:HEADER_SIZE].tobytes(), image.tobytes())
+
+
+def load_grp(filename: str) -> GrpFile:
+    with open(filename, "rb") as f:
+        return parse_grp(f.read())
+
+
+def save_grp(filename: str, grp: GrpFile):
+    with open(filename, "wb") as f:
+        f.write(grp.tobytes())
@@ -0,0 +1,97 @@
+"""
+Histórico de desfazer/refazer do editor SCREEN 2, guardado como deltas de blocos 8x1.
+
+Uma cópia sombra do framebuffer representa o estado do último passo registrado.
+Ao fim de cada operação, record() compara o framebuffer com a sombra em uma
+única operação vetorizada e guarda somente os blocos 8x1 que mudaram: o índice
+do bloco (2 bytes) e os 8 pixels antes e depois, com 4 bits por pixel (4 bytes
+cada). Uma linha de 100 pixels custa cerca de 1 KB; milhares de passos cabem em
+poucos MB. Quando o total passa de max_bytes, os passos mais antigos são descartados.
+"""
+from collections import deque, namedtuple
+
+import numpy as np
+
+from msx_screen2 import MSX_HEIGHT, BLOCK_WIDTH, BLOCKS_PER_ROW
+
+HISTORY_MAX_BYTES = 4 * 1024 * 1024
+
+HistoryStep = namedtuple("HistoryStep", "blocks before after region nbytes")
+
+
+def pack_nibbles(blocks: np.ndarray) -> np.ndarray:
+    """(n, 8) índices de cor -> (n, 4) bytes, dois pixels por byte."""
+    return (blocks[:, 0::2] << 4) | blocks[:, 1::2]
+
+
+def unpack_nibbles(packed: np.ndarray) -> np.ndarray:
+    blocks = np.empty((packed.shape[0], BLOCK_WIDTH), dtype=np.uint8)
+    blocks[:, 0::2] = packed >> 4
+    blocks[:, 1::2] = packed & 0x0F
+    return blocks
+
+
+class EditHistory:
+    """Pilhas de desfazer/refazer sobre um framebuffer (MSX_HEIGHT x MSX_WIDTH, uint8)."""
+
+    def __init__(self, pixels: np.ndarray, max_bytes: int = HISTORY_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.undo_steps = deque()
+        self.redo_steps = []
+        self._shadow = pixels.copy()
+
+    def reset(self, pixels: np.ndarray):
+        """Esquece o histórico (nova tela carregada) e passa a comparar com pixels."""
+        self.undo_steps.clear()
+        self.redo_steps.clear()
+        self.nbytes = 0
+        self._shadow[:] = pixels
+
+    def record(self, pixels: np.ndarray) -> bool:
+        """Registra como um passo tudo o que mudou desde o último passo. Devolve se houve mudança."""
+        changed = (pixels != self._shadow).reshape(MSX_HEIGHT, BLOCKS_PER_ROW, BLOCK_WIDTH).any(axis=2)
+        rows, cols = np.nonzero(changed)
+        if rows.size == 0:
+            return False
+        block_view = pixels.reshape(MSX_HEIGHT, BLOCKS_PER_ROW, BLOCK_WIDTH)
+        shadow_view = self._shadow.reshape(MSX_HEIGHT, BLOCKS_PER_ROW, BLOCK_WIDTH)
+        before = pack_nibbles(shadow_view[rows, cols])
+        after = pack_nibbles(block_view[rows, cols])
+        shadow_view[rows, cols] = block_view[rows, cols]
+
+        blocks = (rows * BLOCKS_PER_ROW + cols).astype(np.uint16)
+        region = (int(cols.min()) * BLOCK_WIDTH, int(rows.min()),
+                  int(cols.max()) * BLOCK_WIDTH + BLOCK_WIDTH - 1, int(rows.max()))
+        nbytes = blocks.nbytes + before.nbytes + after.nbytes
+        self.undo_steps.append(HistoryStep(blocks, before, after, region, nbytes))
+        self.nbytes += nbytes
+        for step in self.redo_steps:
+            self.nbytes -= step.nbytes
+        self.redo_steps.clear()
+        while self.nbytes > self.max_bytes and len(self.undo_steps) > 1:
+            self.nbytes -= self.undo_steps.popleft().nbytes
+        return True
+
+    def _apply(self, pixels: np.ndarray, step: HistoryStep, packed: np.ndarray):
+        rows, cols = np.divmod(step.blocks.astype(np.intp), BLOCKS_PER_ROW)
+        blocks = unpack_nibbles(packed)
+        pixels.reshape(MSX_HEIGHT, BLOCKS_PER_ROW, BLOCK_WIDTH)[rows, cols] = blocks
+        self._shadow.reshape(MSX_HEIGHT, BLOCKS_PER_ROW, BLOCK_WIDTH)[rows, cols] = blocks
+        return step.region
+
+    def undo(self, pixels: np.ndarray):
+        """Desfaz o último passo; devolve o retângulo alterado ou None se não houver o que desfazer."""
+        self.record(pixels) # Alterações ainda não registradas viram um passo antes de desfazer
+        if not self.undo_steps:
+            return None
+        step = self.undo_steps.pop()
+        self.redo_steps.append(step)
+        return self._apply(pixels, step, step.before)
+
+    def redo(self, pixels: np.ndarray):
+        if not self.redo_steps:
+            return None
+        step = self.redo_steps.pop()
+        self.undo_steps.append(step)
+        return self._apply(pixels, step, step.after)
@@ -0,0 +1,116 @@
+"""
+Importação de imagens quaisquer (PNG, JPEG, ...) para o SCREEN 2, sem interface gráfica.
+
+A imagem é redimensionada para 256x192 e cada bloco 8x1 recebe primeiro o seu par
+de cores (msx_solver.best_pairs); o pontilhado só escolhe entre as duas cores do
+próprio bloco, então o resultado já obedece à regra de duas cores e vai direto
+para as tabelas da VRAM, sem a substituição de cores que estragaria o pontilhado.
+
+- "nenhum": cada pixel recebe a mais próxima das duas cores (par de menor erro).
+- "ordenado": matriz de Bayer 8x8 aplicada à posição de cada pixel no segmento entre
+  as duas cores; inteiramente vetorizado.
+- "difusao": Floyd-Steinberg. Cada pixel depende do vizinho da esquerda e dos três
+  de cima, então os pixels com o mesmo x + 2y são independentes: a imagem é
+  percorrida nessas diagonais (638 passos), cada uma processada de uma vez para
+  todas as linhas, sem código compilado.
+
+Nos dois modos com pontilhado o par de cada bloco é escolhido pela distância das
+cores ao segmento entre as duas (mixing=True), que favorece os pares cuja mistura
+se aproxima da imagem.
+"""
+import numpy as np
+from PIL import Image, ImageOps
+
+from msx_screen2 import MSX_PALETTE_RGB, MSX_WIDTH, MSX_HEIGHT, BLOCK_WIDTH, BLOCKS_PER_ROW
+from msx_solver import best_pairs, solve_screen
+from msx_vram import Screen2VRAM
+
+DITHER_MODES = ("nenhum", "ordenado", "difusao")
+
+
+def bayer_matrix(order: int = 3) -> np.ndarray:
+    """Limiares de Bayer (2**order x 2**order) em (0, 1), centrados em cada intervalo."""
+    matrix = np.zeros((1, 1), dtype=np.int32)
+    for _ in range(order):
+        matrix = np.block([[4 * matrix, 4 * matrix + 2], [4 * matrix + 3, 4 * matrix + 1]])
+    return (matrix + 0.5) / matrix.size
+
+
+BAYER_8X8 = bayer_matrix(3).astype(np.float32)
+
+
+def screen_rgb(image: Image.Image, keep_aspect: bool = False) -> np.ndarray:
+    """
+    Imagem do PIL -> RGB (MSX_HEIGHT, MSX_WIDTH, 3) uint8. Com keep_aspect, a imagem é
+    reduzida sem distorcer e centralizada com faixas pretas.
+    """
+    image = image.convert("RGB")
+    size = (MSX_WIDTH, MSX_HEIGHT)
+    if keep_aspect:
+        image = ImageOps.pad(image, size, method=Image.LANCZOS, color=(0, 0, 0))
+    elif image.size != size:
+        image = image.resize(size, Image.LANCZOS)
+    return np.asarray(image, dtype=np.uint8)
+
+
+def _pixel_pairs(pairs: np.ndarray) -> np.ndarray:
+    """Par de cores (n_blocos, 2) -> par de cada pixel (MSX_HEIGHT, MSX_WIDTH, 2)."""
+    return np.repeat(pairs.reshape(MSX_HEIGHT, BLOCKS_PER_ROW, 2), BLOCK_WIDTH, axis=1)
+
+
+def ordered_dither(rgb: np.ndarray, pairs: np.ndarray) -> np.ndarray:
+    """Pontilhado ordenado: a segunda cor do bloco onde a projeção do pixel passa do limiar de Bayer."""
+    pixel_pairs = _pixel_pairs(pairs)
+    start = MSX_PALETTE_RGB[pixel_pairs[..., 0]].astype(np.float32)
+    delta = MSX_PALETTE_RGB[pixel_pairs[..., 1]].astype(np.float32) - start
+    length2 = np.maximum((delta * delta).sum(axis=2), 1.0)
+    position = ((rgb.astype(np.float32) - start) * delta).sum(axis=2) / length2
+    size = BAYER_8X8.shape[0]
+    threshold = np.tile(BAYER_8X8, (MSX_HEIGHT // size, MSX_WIDTH // size))
+    return np.where(position > threshold, pixel_pairs[..., 1], pixel_pairs[..., 0]).astype(np.uint8)
+
+
+def diffusion_dither(rgb: np.ndarray, pairs: np.ndarray) -> np.ndarray:
+    """
+    Floyd-Steinberg limitado às duas cores de cada bloco, percorrendo as diagonais
+    x + 2y = passo: o erro vai 7/16 para a direita e 3/16, 5/16, 1/16 para baixo.
+    """
+    height, width = MSX_HEIGHT, MSX_WIDTH
+    work = np.zeros((height + 1, width + 2, 3), dtype=np.float32)  # Uma coluna de folga de cada lado
+    work[:height, 1:width + 1] = rgb
+    pixel_pairs = _pixel_pairs(pairs)
+    first = MSX_PALETTE_RGB[pixel_pairs[..., 0]].astype(np.float32)
+    second = MSX_PALETTE_RGB[pixel_pairs[..., 1]].astype(np.float32)
+    pixels = np.empty((height, width), dtype=np.uint8)
+    for step in range(width + 2 * (height - 1)):
+        ys = np.arange(max(0, (step - width) // 2 + 1), min(height - 1, step // 2) + 1)
+        xs = step - 2 * ys
+        value = np.clip(work[ys, xs + 1], 0.0, 255.0)
+        a, b = first[ys, xs], second[ys, xs]
+        use_second = ((value - b) ** 2).sum(axis=1) < ((value - a) ** 2).sum(axis=1)
+        pixels[ys, xs] = np.where(use_second, pixel_pairs[ys, xs, 1], pixel_pairs[ys, xs, 0])
+        error = value - np.where(use_second[:, None], b, a)
+        work[ys, xs + 2] += error * (7 / 16)
+        work[ys + 1, xs] += error * (3 / 16)
+        work[ys + 1, xs + 1] += error * (5 / 16)
+        work[ys + 1, xs + 2] += error * (1 / 16)
+    return pixels
+
+
+def image_pixels(rgb: np.ndarray, dither: str = "difusao") -> np.ndarray:
+    """RGB da tela -> pixels indexados que obedecem à regra de duas cores, com o pontilhado pedido."""
+    if dither not in DITHER_MODES:
+        raise ValueError(f"Pontilhado desconhecido: {dither} (use {', '.join(DITHER_MODES)})")
+    if dither == "nenhum":
+        return solve_screen(rgb)
+    pairs, _ = best_pairs(rgb.reshape(-1, BLOCK_WIDTH, 3), mixing=True)
+    if dither == "ordenado":
+        return ordered_dither(rgb, pairs)
+    return diffusion_dither(rgb, pairs)
+
+
+def import_image(filename: str, dither: str = "difusao", keep_aspect: bool = False) -> Screen2VRAM:
+    """Lê uma imagem em qualquer formato do PIL e devolve as tabelas do SCREEN 2."""
+    with Image.open(filename) as image:
+        rgb = screen_rgb(image, keep_aspect)
+    return Screen2VRAM.from_pixels(image_pixels(rgb, dither))
@@ -0,0 +1,232 @@
+"""
+Codec dos layouts .LAY do Graphos III (somente a tabela de padrões, sem cores).
+
+Formato (ver readers/g3viewer.doc e readers/msxlayvw.pas): arquivo binário MSX
+com cabeçalho FE 00 92 EL EH 00 92, onde EH*256+EL é o último endereço ocupado.
+Os dados são cifrados somando &H99 a cada byte e usam um RLE restrito: apenas
+os bytes 0 e 255 são codificados, sempre seguidos de um byte de repetição que
+é gravado sem cifra. Todos os demais bytes são guardados literalmente.
+
+O decodificador é incremental (recebe os dados em pedaços, de um arquivo ou de um
+buffer) e copia trechos literais inteiros de uma vez; o codificador encontra as
+sequências de 0/255 e monta o arquivo com operações vetorizadas.
+"""
+import numpy as np
+
+from msx_screen2 import BLOCK_WIDTH
+from msx_vram import Screen2VRAM, PATTERN_SIZE, CELL_ROWS, CELL_COLS
+from msx_scr import BSAVE_ID, HEADER_SIZE, DEFAULT_BASE_ADDRESS, bsave_header
+
+LAY_OFFSET = 0x99
+MAX_RUN = 255
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def decrypt(data) -> np.ndarray:
+    """Remove o deslocamento &H99 de todos os bytes de uma vez."""
+    return np.frombuffer(data, dtype=np.uint8) - np.uint8(LAY_OFFSET)
+
+
+def encrypt(data) -> np.ndarray:
+    """Aplica o deslocamento &H99 a todos os bytes de uma vez."""
+    return np.frombuffer(data, dtype=np.uint8) + np.uint8(LAY_OFFSET)
+
+
+class LayDecoder:
+    """
+    Decodificador incremental de .LAY.
+
+    Chame feed() com pedaços do arquivo, na ordem. done fica verdadeiro assim que
+    a imagem está completa. O resultado fica em pattern (6 KB); os bytes que o
+    cabeçalho declara mas que a imagem não usa ficam em unused, e os que vêm
+    depois do fim declarado (preenchimento do disco) ficam em padding.
+    """
+
+    def __init__(self):
+        self.header = b""
+        self.unused = bytearray()
+        self.padding = bytearray()
+        self._pattern = bytearray()
+        self._remaining = None   # Bytes de dados declarados no cabeçalho e ainda não lidos
+        self._run_byte = None    # Byte 0/255 lido no fim de um pedaço, aguardando a repetição
+        self.done = False
+
+    @property
+    def pattern(self) -> bytes:
+        """Tabela de padrões decodificada, completada com zeros até 6 KB."""
+        return bytes(self._pattern) + bytes(PATTERN_SIZE - len(self._pattern))
+
+    def feed(self, chunk):
+        chunk = memoryview(chunk)
+        if self._remaining is None:
+            needed = HEADER_SIZE - len(self.header)
+            self.header += chunk[:needed].tobytes()
+            chunk = chunk[needed:]
+            if len(self.header) < HEADER_SIZE:
+                return
+            if self.header[0] != BSAVE_ID:
+                raise ValueError("Arquivo .LAY inválido: cabeçalho binário MSX (FE) ausente.")
+            start = self.header[1] | (self.header[2] << 8)
+            end = self.header[3] | (self.header[4] << 8)
+            self._remaining = max(end - start + 1, 0)
+
+        declared = chunk[:self._remaining]
+        self.padding += chunk[len(declared):]
+        self._remaining -= len(declared)
+        if self.done:
+            self.unused += declared
+            return
+        raw = np.frombuffer(declared, dtype=np.uint8)
+        pos = self._decode(raw)
+        if self.done:
+            self.unused += raw[pos:].tobytes()
+        elif self._remaining == 0:
+            self.done = True
+
+    def _emit(self, data):
+        room = PATTERN_SIZE - len(self._pattern)
+        self._pattern += data[:room]
+        if len(data) >= room:
+            self.done = True
+
+    def _decode(self, raw: np.ndarray) -> int:
+        """Decodifica um pedaço já sem cabeçalho; devolve quantos bytes foram consumidos."""
+        n = len(raw)
+        pos = 0
+        if self._run_byte is not None and n:
+            # A repetição do último byte especial chegou neste pedaço
+            self._emit(bytes([self._run_byte]) * int(raw[0]))
+            self._run_byte = None
+            pos = 1
+
+        data = decrypt(raw)
+        special = np.flatnonzero((data == 0) | (data == 0xFF))
+        for s in special.tolist():
+            if self.done:
+                return pos
+            if s < pos:
+                continue # Era um byte de repetição, não um byte especial
+            if s > pos:
+                self._emit(data[pos:s].tobytes())
+                if self.done:
+                    return s
+            value = int(data[s])
+            if s + 1 >= n:
+                self._run_byte = value
+                return n
+            self._emit(bytes([value]) * int(raw[s + 1])) # A repetição não é cifrada
+            pos = s + 2
+        if self.done:
+            return pos # A tabela acabou: o que sobra do pedaço vai para unused
+        if pos < n:
+            literal = data[pos:n].tobytes()
+            room = PATTERN_SIZE - len(self._pattern)
+            self._emit(literal)
+            if self.done:
+                return pos + min(room, len(literal))
+        return n
+
+
+def encode_lay(pattern) -> bytes:
+    """
+    Codifica 6 KB de padrões no RLE do Graphos III, já cifrado.
+
+    Cada sequência de 0 ou 255 vira pares (byte, repetição) de no máximo 255
+    repetições e os outros bytes são copiados literalmente: o menor arquivo que
+    o formato permite.
+    """
+    data = np.frombuffer(pattern, dtype=np.uint8)
+    if data.size == 0:
+        return b""
+
+    # Sequências de bytes iguais
+    starts = np.flatnonzero(np.r_[True, data[1:] != data[:-1]])
+    lengths = np.diff(np.r_[starts, data.size])
+    values = data[starts]
+    special = (values == 0) | (values == 0xFF)
+
+    # Cada sequência vira "tokens": um por byte literal, ou um par por bloco de até 255 repetições
+    tokens_per_run = np.where(special, -(-lengths // MAX_RUN), lengths)
+    token_run = np.repeat(np.arange(starts.size), tokens_per_run)
+    first_token = np.cumsum(tokens_per_run) - tokens_per_run
+    token_index = np.arange(token_run.size) - first_token[token_run]
+    is_pair = special[token_run]
+    counts = np.minimum(MAX_RUN, lengths[token_run] - token_index * MAX_RUN)
+
+    sizes = 1 + is_pair
+    out_pos = np.cumsum(sizes) - sizes
+    out = np.empty(int(sizes.sum()), dtype=np.uint8)
+    out[out_pos] = values[token_run] + np.uint8(LAY_OFFSET)
+    out[out_pos[is_pair] + 1] = counts[is_pair]
+    return out.tobytes()
+
+
+class LayFile:
+    """
+    Um layout .LAY: a tabela de padrões e os bytes do arquivo que não fazem parte
+    da imagem (dados declarados e não usados, preenchimento depois do fim declarado).
+    """
+
+    def __init__(self, pattern=None, header: bytes = None, unused: bytes = b"", padding: bytes = b""):
+        self.pattern = bytes(pattern) if pattern is not None else bytes(PATTERN_SIZE)
+        self.header = header
+        self.unused = bytes(unused)
+        self.padding = bytes(padding)
+
+    def to_vram(self) -> Screen2VRAM:
+        """Tela SCREEN 2 com os padrões do layout e as cores padrão (frente 15, fundo 0)."""
+        vram = Screen2VRAM()
+        vram.pattern[:] = self.pattern
+        return vram
+
+    @classmethod
+    def from_vram(cls, vram: Screen2VRAM) -> "LayFile":
+        """
+        Layout de uma tela colorida. O .LAY só tem padrões e é lido com frente 15 e fundo 0,
+        então o bit de cada pixel é 1 onde a cor não é 0, quaisquer que sejam as cores do bloco.
+        """
+        bits = vram.to_pixels() != 0
+        patterns = np.packbits(bits.reshape(-1, BLOCK_WIDTH), axis=1)
+        # Ordem dos pixels (célula_y, linha, célula_x) -> ordem da VRAM (célula_y, célula_x, linha)
+        patterns = patterns.reshape(CELL_ROWS, 8, CELL_COLS).transpose(0, 2, 1)
+        return cls(patterns.tobytes())
+
+    def tobytes(self) -> bytes:
+        """
+        Arquivo completo, com o fim declarado no cabeçalho recalculado. Um layout lido
+        de disco mantém endereços e bytes extras originais, reproduzindo o arquivo lido.
+        """
+        payload = encode_lay(self.pattern)
+        start = execute = DEFAULT_BASE_ADDRESS
+        if self.header is not None:
+            start = self.header[1] | (self.header[2] << 8)
+            execute = self.header[5] | (self.header[6] << 8)
+        end = start + len(payload) + len(self.unused) - 1
+        return b"".join((bsave_header(start, end, execute), payload, self.unused, self.padding))
+
+
+def _finish(decoder: LayDecoder) -> LayFile:
+    if decoder._remaining is None:
+        raise ValueError("Arquivo .LAY inválido: cabeçalho incompleto.")
+    return LayFile(decoder.pattern, decoder.header, decoder.unused, decoder.padding)
+
+
+def decode_lay(data) -> LayFile:
+    """Decodifica um .LAY inteiro já em memória."""
+    decoder = LayDecoder()
+    decoder.feed(data)
+    return _finish(decoder)
+
+
+def load_lay(filename: str, chunk_size: int = READ_CHUNK_SIZE) -> LayFile:
+    """Lê um .LAY em pedaços, decodificando à medida que os dados chegam."""
+    decoder = LayDecoder()
+    with open(filename, "rb") as f:
+        while chunk := f.read(chunk_size):
+            decoder.feed(chunk)
+    return _finish(decoder)
+
+
+def save_lay(filename: str, lay: LayFile):
+    with open(filename, "wb") as f:
+        f.write(lay.tobytes())
@@ -0,0 +1,129 @@
+"""
+Instrumentação opcional do editor: tempos dos eventos, contadores e exportação de trace.
+
+Desligado (o padrão), cada método instrumentado custa um teste de atributo a mais.
+Ligado, o Profiler guarda:
+
+- um trecho por chamada de cada método marcado com @profiled (eventos do mouse,
+  redesenho), com a duração em microssegundos;
+- a latência de cada evento de entrada até o fim do redesenho que o mostrou;
+- contadores por operação (passes de restrição, blocos verificados, pixels
+  substituídos e redesenhados, itens no canvas), somados até end_operation().
+
+Os registros podem ser gravados no formato Trace Event do Chrome
+(chrome://tracing, Perfetto) com export_chrome_trace(). Nada aqui depende de Tk.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+PROFILE_MAX_EVENTS = 200_000
+STATUS_INTERVAL = 0.25  # Segundos entre atualizações da barra de status durante um arrasto
+
+
+class Profiler:
+    def __init__(self, enabled: bool = False, max_events: int = PROFILE_MAX_EVENTS):
+        self.enabled = enabled
+        self.events = deque(maxlen=max_events)
+        self.origin = time.perf_counter()
+        self.counters = {}
+        self.durations = {}  # nome -> [soma, máximo, chamadas] da operação atual
+        self._input_start = None
+        self._last_status = 0.0
+
+    def _timestamp(self, moment: float) -> float:
+        return (moment - self.origin) * 1e6
+
+    def span(self, name: str, start: float, **args) -> float:
+        """Registra um trecho de start até agora; devolve a duração em segundos."""
+        end = time.perf_counter()
+        duration = end - start
+        self.events.append({"name": name, "ph": "X", "ts": self._timestamp(start), "dur": duration * 1e6,
+                            "pid": os.getpid(), "tid": threading.get_ident(), "args": args})
+        total = self.durations.setdefault(name, [0.0, 0.0, 0])
+        total[0] += duration
+        total[1] = max(total[1], duration)
+        total[2] += 1
+        return duration
+
+    def count(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def input_started(self, start: float):
+        """Início de um evento de entrada; a latência conta a partir do primeiro ainda não desenhado."""
+        if self._input_start is None:
+            self._input_start = start
+
+    def rendered(self):
+        """Fim de um redesenho: fecha a latência da entrada pendente."""
+        if self._input_start is not None:
+            self.span("latencia", self._input_start)
+            self._input_start = None
+
+    def end_operation(self, name: str, **counters) -> str:
+        """Fecha a operação atual: grava os contadores no trace, zera tudo e devolve o resumo."""
+        for key, value in counters.items():
+            self.count(key, value)
+        if self.counters:
+            self.events.append({"name": name, "ph": "C", "ts": self._timestamp(time.perf_counter()),
+                                "pid": os.getpid(), "args": dict(self.counters)})
+        summary = self.summary(name)
+        self.counters = {}
+        self.durations = {}
+        return summary
+
+    def summary(self, name: str) -> str:
+        """Texto curto para a barra de status: tempos médio/máximo por trecho e os contadores."""
+        parts = [f"Perfil {name}:"]
+        for span_name, (total, worst, calls) in self.durations.items():
+            parts.append(f"{span_name} {total / calls * 1000:.2f}/{worst * 1000:.2f} ms x{calls}")
+        parts += [f"{key} {value}" for key, value in self.counters.items()]
+        return "  ".join(parts)
+
+    def status_due(self) -> bool:
+        """Se já passou STATUS_INTERVAL desde a última atualização da barra de status."""
+        now = time.perf_counter()
+        if now - self._last_status < STATUS_INTERVAL:
+            return False
+        self._last_status = now
+        return True
+
+    def clear(self):
+        self.events.clear()
+        self.counters = {}
+        self.durations = {}
+        self._input_start = None
+
+    def export_chrome_trace(self, filename: str) -> int:
+        """Grava os eventos no formato Trace Event JSON; devolve quantos foram gravados."""
+        events = list(self.events)
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return len(events)
+
+
+def profiled(name: str, kind: str = None):
+    """
+    Marca um método de um objeto com atributo .profiler. kind="input" conta o início da
+    latência de entrada; kind="render" a encerra quando o método termina.
+    """
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            profiler = self.profiler
+            if not profiler.enabled:
+                return method(self, *args, **kwargs)
+            start = time.perf_counter()
+            if kind == "input":
+                profiler.input_started(start)
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                profiler.span(name, start)
+                if kind == "render":
+                    profiler.rendered()
+        return wrapper
+    return decorate
@@ -0,0 +1,256 @@
+"""
+Rasterização de primitivas em trechos horizontais (spans), sem interface gráfica.
+
+Uma forma é descrita por três arrays do mesmo tamanho (Spans): a linha e os x
+inicial e final, inclusivos, de cada trecho. Formas cheias geram um ou dois
+trechos por linha direto da geometria, sem procurar pixels no framebuffer, então
+o custo é proporcional à altura da forma para gerar os trechos e à área dela
+para pintá-los.
+
+fill_spans pinta todos os trechos de uma vez e mark_span_blocks marca os blocos
+8x1 tocados na máscara usada pela restrição de cor (msx_screen2.apply_color_constraint),
+as duas operações limitadas ao retângulo que envolve a forma. Os trechos passados a
+elas devem estar recortados na tela (clip_spans).
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from msx_screen2 import MSX_WIDTH, MSX_HEIGHT, BLOCK_WIDTH
+
+Spans = namedtuple("Spans", "ys x0 x1")
+
+EMPTY_SPANS = Spans(np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32))
+
+
+def make_spans(ys, x0, x1) -> Spans:
+    return Spans(np.asarray(ys, dtype=np.int32), np.asarray(x0, dtype=np.int32), np.asarray(x1, dtype=np.int32))
+
+
+def concat_spans(*parts) -> Spans:
+    parts = [part for part in parts if part.ys.size]
+    if not parts:
+        return EMPTY_SPANS
+    return Spans(*(np.concatenate(arrays) for arrays in zip(*parts)))
+
+
+def clip_spans(spans: Spans, width: int = MSX_WIDTH, height: int = MSX_HEIGHT) -> Spans:
+    """Recorta os trechos na tela, descartando os que ficam inteiramente fora dela."""
+    x0 = np.maximum(spans.x0, 0)
+    x1 = np.minimum(spans.x1, width - 1)
+    keep = (spans.ys >= 0) & (spans.ys < height) & (x0 <= x1)
+    return Spans(spans.ys[keep], x0[keep], x1[keep])
+
+
+def spans_bbox(spans: Spans):
+    """(x_min, y_min, x_max, y_max) que envolve os trechos, ou None se não houver nenhum."""
+    if spans.ys.size == 0:
+        return None
+    return int(spans.x0.min()), int(spans.ys.min()), int(spans.x1.max()), int(spans.ys.max())
+
+
+# --- Geração de trechos ---
+def rect_spans(x0: int, y0: int, x1: int, y1: int) -> Spans:
+    """Retângulo cheio: um trecho por linha."""
+    x_min, x_max = min(x0, x1), max(x0, x1)
+    ys = np.arange(min(y0, y1), max(y0, y1) + 1, dtype=np.int32)
+    return Spans(ys, np.full_like(ys, x_min), np.full_like(ys, x_max))
+
+
+def rect_outline_spans(x0: int, y0: int, x1: int, y1: int) -> Spans:
+    """Borda do retângulo: as linhas de cima e de baixo inteiras e um pixel de cada lado nas demais."""
+    x_min, x_max = min(x0, x1), max(x0, x1)
+    y_min, y_max = min(y0, y1), max(y0, y1)
+    sides = np.arange(y_min + 1, y_max, dtype=np.int32)
+    ys = np.concatenate(([y_min, y_max], sides, sides)).astype(np.int32)
+    x0s = np.concatenate(([x_min, x_min], np.full_like(sides, x_min), np.full_like(sides, x_max))).astype(np.int32)
+    x1s = np.concatenate(([x_max, x_max], np.full_like(sides, x_min), np.full_like(sides, x_max))).astype(np.int32)
+    return Spans(ys, x0s, x1s)
+
+
+def line_points(x0: int, y0: int, x1: int, y1: int):
+    """Pontos (xs, ys) da linha de Bresenham, na mesma ordem e com os mesmos desempates do editor."""
+    dx = abs(x1 - x0)
+    dy = abs(y1 - y0)
+    sx = 1 if x0 < x1 else -1
+    sy = 1 if y0 < y1 else -1
+    err = dx - dy
+    xs, ys = [], []
+    while True:
+        xs.append(x0)
+        ys.append(y0)
+        if x0 == x1 and y0 == y1:
+            break
+        e2 = 2 * err
+        if e2 > -dy:
+            err -= dy
+            x0 += sx
+        if e2 < dx:
+            err += dx
+            y0 += sy
+    return np.array(xs, dtype=np.int32), np.array(ys, dtype=np.int32)
+
+
+def circle_points(cx: int, cy: int, radius: int):
+    """Pontos (xs, ys) da borda pelo algoritmo de ponto médio (os 8 octantes, com repetições)."""
+    offsets = []
+    x, y = 0, radius
+    d = 3 - 2 * radius
+    offsets.append((x, y))
+    while y >= x:
+        x += 1
+        if d > 0:
+            y -= 1
+            d = d + 4 * (x - y) + 10
+        else:
+            d = d + 4 * x + 6
+        offsets.append((x, y))
+    ox, oy = np.array(offsets, dtype=np.int32).T
+    xs = np.concatenate((ox, -ox, ox, -ox, oy, -oy, oy, -oy)) + cx
+    ys = np.concatenate((oy, oy, -oy, -oy, ox, ox, -ox, -ox)) + cy
+    return xs, ys
+
+
+def clip_points(xs: np.ndarray, ys: np.ndarray, width: int = MSX_WIDTH, height: int = MSX_HEIGHT):
+    """Descarta os pontos fora da tela."""
+    keep = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+    if keep.all():
+        return xs, ys
+    return xs[keep], ys[keep]
+
+
+def points_spans(xs: np.ndarray, ys: np.ndarray) -> Spans:
+    """Cada ponto vira um trecho de um pixel."""
+    return Spans(np.asarray(ys, dtype=np.int32), np.asarray(xs, dtype=np.int32), np.asarray(xs, dtype=np.int32))
+
+
+def row_extents(xs: np.ndarray, ys: np.ndarray) -> Spans:
+    """Um trecho por linha, do ponto mais à esquerda ao mais à direita daquela linha."""
+    if ys.size == 0:
+        return EMPTY_SPANS
+    order = np.argsort(ys, kind="stable")
+    ys, xs = ys[order], xs[order]
+    starts = np.flatnonzero(np.r_[True, ys[1:] != ys[:-1]])
+    return Spans(ys[starts].astype(np.int32), np.minimum.reduceat(xs, starts).astype(np.int32),
+                 np.maximum.reduceat(xs, starts).astype(np.int32))
+
+
+def circle_spans(cx: int, cy: int, radius: int) -> Spans:
+    """
+    Círculo cheio: a borda de circle_points e, em cada linha de cy - radius a cy + radius,
+    o trecho de uma borda à outra. (Com raio 0 o ponto médio ainda marca pontos nas
+    linhas vizinhas; eles entram só como borda, como no desenho original.)
+    """
+    xs, ys = circle_points(cx, cy, radius)
+    rows = np.abs(ys - cy) <= radius
+    return concat_spans(row_extents(xs[rows], ys[rows]), points_spans(xs, ys))
+
+
+def ellipse_spans(cx: int, cy: int, rx: int, ry: int) -> Spans:
+    """Elipse cheia de semieixos rx e ry: meia largura arredondada em cada linha, calculada de uma vez."""
+    rx, ry = abs(rx), abs(ry)
+    dy = np.arange(-ry, ry + 1, dtype=np.int32)
+    if ry == 0:
+        half = np.array([rx], dtype=np.int32)
+    else:
+        half = np.floor(rx * np.sqrt(np.maximum(1.0 - (dy / ry) ** 2, 0.0)) + 0.5).astype(np.int32)
+    return Spans(dy + cy, cx - half, cx + half)
+
+
+def ellipse_outline_spans(cx: int, cy: int, rx: int, ry: int) -> Spans:
+    """
+    Borda da elipse: em cada linha de ellipse_spans, os pixels que não têm vizinho dentro
+    da elipse na linha de cima ou na de baixo (as pontas de cada trecho sempre entram).
+    """
+    full = ellipse_spans(cx, cy, rx, ry)
+    x0, x1 = full.x0, full.x1
+    far = np.int32(1 << 30)  # Linha vizinha fora da elipse: trecho vazio
+    inner0 = np.maximum(np.r_[far, x0[:-1]], np.r_[x0[1:], far])
+    inner1 = np.minimum(np.r_[-far, x1[:-1]], np.r_[x1[1:], -far])
+    left_end = np.clip(inner0 - 1, x0, x1).astype(np.int32)
+    right_start = np.clip(inner1 + 1, x0, x1).astype(np.int32)
+    return concat_spans(Spans(full.ys, x0, left_end), Spans(full.ys, right_start, x1))
+
+
+def polygon_outline_points(points):
+    """Pontos (xs, ys) das arestas do polígono fechado, cada uma pela linha de Bresenham."""
+    vertices = np.asarray(points, dtype=np.int64).reshape(-1, 2)
+    if len(vertices) == 0:
+        return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)
+    edges = [line_points(int(a[0]), int(a[1]), int(b[0]), int(b[1]))
+             for a, b in zip(vertices, np.roll(vertices, -1, axis=0))]
+    return np.concatenate([xs for xs, _ in edges]), np.concatenate([ys for _, ys in edges])
+
+
+def polygon_spans(points) -> Spans:
+    """
+    Polígono cheio (regra par-ímpar), incluindo as arestas. Para cada linha, as interseções
+    com todas as arestas são calculadas numa única operação e ordenadas; pares
+    consecutivos de interseções delimitam os trechos internos.
+    """
+    vertices = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(vertices) == 0:
+        return EMPTY_SPANS
+    edges_from = vertices
+    edges_to = np.roll(vertices, -1, axis=0)
+    edge_pixels = points_spans(*polygon_outline_points(points))
+    if len(vertices) < 3:
+        return edge_pixels
+
+    # Linhas fora da tela não interessam: seriam descartadas por clip_spans
+    rows = np.arange(max(int(vertices[:, 1].min()), 0), min(int(vertices[:, 1].max()), MSX_HEIGHT - 1) + 1)
+    ya, yb = edges_from[:, 1], edges_to[:, 1]
+    xa, xb = edges_from[:, 0], edges_to[:, 0]
+    y = rows[:, None].astype(np.float64)
+    crosses = (np.minimum(ya, yb) <= y) & (y < np.maximum(ya, yb))  # Semiaberto: vértices não contam duas vezes
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = np.where(crosses, xa + (y - ya) * (xb - xa) / (yb - ya), np.inf)
+    x.sort(axis=1)
+    counts = crosses.sum(axis=1)
+    pairs = counts // 2
+    interior = [EMPTY_SPANS]
+    for k in range(int(pairs.max(initial=0))):
+        has = pairs > k
+        left = np.ceil(x[has, 2 * k])
+        right = np.floor(x[has, 2 * k + 1])
+        interior.append(make_spans(rows[has], left, right))
+    inside = concat_spans(*interior)
+    keep = inside.x0 <= inside.x1
+    return concat_spans(Spans(inside.ys[keep], inside.x0[keep], inside.x1[keep]), edge_pixels)
+
+
+# --- Escrita no framebuffer ---
+def _coverage(ys, x0, x1, y_min: int, x_min: int, height: int, width: int) -> np.ndarray:
+    """Máscara (height, width) coberta pelos trechos, por soma acumulada de +1/-1 nas bordas."""
+    edges = np.zeros((height, width + 1), dtype=np.int16)
+    np.add.at(edges, (ys - y_min, x0 - x_min), 1)
+    np.add.at(edges, (ys - y_min, x1 - x_min + 1), -1)
+    return np.cumsum(edges[:, :width], axis=1) > 0
+
+
+def fill_spans(pixels: np.ndarray, spans: Spans, color: int):
+    """Pinta os trechos (já recortados) com color; devolve o retângulo alterado ou None."""
+    bbox = spans_bbox(spans)
+    if bbox is None:
+        return None
+    x_min, y_min, x_max, y_max = bbox
+    if spans.ys.size == 1:
+        pixels[y_min, x_min:x_max + 1] = color
+    else:
+        mask = _coverage(spans.ys, spans.x0, spans.x1, y_min, x_min, y_max - y_min + 1, x_max - x_min + 1)
+        pixels[y_min:y_max + 1, x_min:x_max + 1][mask] = color
+    return bbox
+
+
+def mark_span_blocks(blocks: np.ndarray, spans: Spans):
+    """Marca na máscara de blocos 8x1 (msx_screen2.new_block_mask) todos os blocos tocados pelos trechos."""
+    if spans.ys.size == 0:
+        return
+    b0, b1 = spans.x0 // BLOCK_WIDTH, spans.x1 // BLOCK_WIDTH
+    if (b0 == b1).all(): # Cada trecho dentro de um único bloco: marcação direta por índice
+        blocks[spans.ys, b0] = True
+        return
+    y_min, y_max = int(spans.ys.min()), int(spans.ys.max())
+    c_min, c_max = int(b0.min()), int(b1.max())
+    mask = _coverage(spans.ys, b0, b1, y_min, c_min, y_max - y_min + 1, c_max - c_min + 1)
+    blocks[y_min:y_max + 1, c_min:c_max + 1] |= mask
@@ -0,0 +1,171 @@
+"""
+Serviço HTTP local que devolve arquivos do Graphos III como PNG, sem interface gráfica.
+
+    python msx_render_service.py --root III/ --port 8765
+
+    GET /render?path=ROBOCOP.SCR             tela 256x192 (também .GRP, .LAY e .ALF)
+    GET /render?path=BANCO.SHP               folha de contato com os shapes do banco
+    GET /render?path=BANCO.SHP&shape=3       só o shape 3
+    GET /render?path=ROBOCOP.SCR&scale=4     ampliado sem interpolação (até MAX_SCALE)
+
+Os caminhos são relativos a --root e não podem sair dele; o servidor escuta só
+em 127.0.0.1 por padrão. Cada pedido roda na sua thread e decodifica o arquivo
+com os mesmos leitores do editor (msx_files, msx_surface), que não têm estado
+compartilhado além dos caches com trava. Os PNGs prontos ficam num cache LRU
+limitado em bytes, com chave (caminho, mtime, tamanho, shape, escala): um arquivo
+modificado gera uma chave nova e a entrada antiga sai do cache com o tempo.
+"""
+import argparse
+import os
+import sys
+import threading
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from msx_files import file_kind, render_file
+from msx_shp import ShapeLibrary
+from msx_thumbs import contact_sheet
+from msx_surface import png_bytes
+
+DEFAULT_PORT = 8765
+RENDER_CACHE_BYTES = 32 * 1024 * 1024
+MAX_SCALE = 8
+
+
+class RenderCache:
+    """Cache LRU de PNGs renderizados, limitado pelo total de bytes."""
+
+    def __init__(self, max_bytes: int = RENDER_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._items.get(key)
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._items.move_to_end(key)
+            return data
+
+    def put(self, key, data: bytes):
+        with self._lock:
+            if key in self._items or len(data) > self.max_bytes:
+                return
+            self._items[key] = data
+            self.nbytes += len(data)
+            while self.nbytes > self.max_bytes:
+                _, old = self._items.popitem(last=False)
+                self.nbytes -= len(old)
+
+
+def render_pixels(filename: str, shape: int = None):
+    """Pixels indexados de um arquivo: a imagem única, um shape do banco ou a folha de contato dos shapes."""
+    if shape is not None:
+        if file_kind(filename) != ".shp":
+            raise ValueError("shape só vale para bancos .SHP")
+        with ShapeLibrary(filename) as library:
+            return library[shape].to_pixels()
+    images = [pixels for _, pixels in render_file(filename)]
+    if len(images) == 1:
+        return images[0]
+    return contact_sheet(images)
+
+
+def render_png(filename: str, shape: int = None, scale: int = 1, cache: RenderCache = None) -> bytes:
+    """PNG indexado com a paleta MSX; com cache, reaproveita renderizações do mesmo arquivo sem modificações."""
+    stat = os.stat(filename)
+    key = (filename, stat.st_mtime_ns, stat.st_size, shape, scale)
+    data = cache.get(key) if cache is not None else None
+    if data is None:
+        data = png_bytes(render_pixels(filename, shape), scale)
+        if cache is not None:
+            cache.put(key, data)
+    return data
+
+
+class RenderServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, root: str, cache: RenderCache):
+        super().__init__(address, RenderHandler)
+        self.root = os.path.realpath(root)
+        self.cache = cache
+
+    def resolve(self, path: str) -> str:
+        """Caminho real de um arquivo pedido, que precisa estar dentro de root."""
+        full = os.path.realpath(os.path.join(self.root, path))
+        if os.path.commonpath([self.root, full]) != self.root:
+            raise PermissionError(path)
+        return full
+
+
+class RenderHandler(BaseHTTPRequestHandler):
+    server_version = "GraphosRender/1.0"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path != "/render":
+            self.send_error(HTTPStatus.NOT_FOUND, "use /render?path=arquivo")
+            return
+        query = parse_qs(url.query)
+        try:
+            path = query["path"][0]
+            shape = int(query["shape"][0]) if "shape" in query else None
+            scale = int(query.get("scale", ["1"])[0])
+            if not 1 <= scale <= MAX_SCALE:
+                raise ValueError(f"escala fora de 1..{MAX_SCALE}")
+            if shape is not None and shape < 0:
+                raise ValueError(f"shape negativo ({shape})")
+        except (KeyError, ValueError) as e:
+            self.send_error(HTTPStatus.BAD_REQUEST, f"parâmetros inválidos: {e}")
+            return
+        try:
+            data = render_png(self.server.resolve(path), shape, scale, self.server.cache)
+        except PermissionError:
+            self.send_error(HTTPStatus.FORBIDDEN, "caminho fora da raiz")
+            return
+        except (FileNotFoundError, IsADirectoryError, IndexError):
+            self.send_error(HTTPStatus.NOT_FOUND, "arquivo ou shape inexistente")
+            return
+        except (OSError, ValueError) as e:
+            self.send_error(HTTPStatus.UNPROCESSABLE_ENTITY, str(e))
+            return
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serviço local que renderiza arquivos do Graphos III em PNG.")
+    parser.add_argument("--root", default=".", help="diretório dos arquivos servidos")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--cache-mb", type=int, default=RENDER_CACHE_BYTES // (1024 * 1024),
+                        help="tamanho máximo do cache de PNGs")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.root):
+        print(f"ERRO diretório inexistente: {args.root}", file=sys.stderr)
+        return 1
+    server = RenderServer((args.host, args.port), args.root, RenderCache(args.cache_mb * 1024 * 1024))
+    print(f"Servindo {server.root} em http://{args.host}:{server.server_address[1]}/render?path=...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
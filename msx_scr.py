@@ -0,0 +1,107 @@
+"""
+Leitura e gravação de telas .SCR do Graphos III.
+
+Formato (ver readers/g3viewer.doc): arquivo binário MSX com cabeçalho de 7 bytes
+(FE início fim execução), seguido do programa de exibição que ocupa os bytes 7 a
+127 (121 bytes) e das cópias da tabela de padrões e da tabela de cores da VRAM:
+
+    FE 00 92 80 C2 00 92 (programa de exibição) (padrões) (cores)
+
+O arquivo é lido de uma vez só e as tabelas vão direto para um Screen2VRAM.
+Cabeçalho, programa e eventuais bytes depois das tabelas são preservados, de modo
+que ler e gravar um arquivo reproduz os mesmos bytes.
+"""
+from msx_vram import Screen2VRAM, TABLES_SIZE, GRPCOL, DEFAULT_COLOR
+
+BSAVE_ID = 0xFE
+HEADER_SIZE = 7
+PROGRAM_SIZE = 121
+DATA_OFFSET = HEADER_SIZE + PROGRAM_SIZE
+
+# Endereço de carga usado pela maioria das versões (algumas usam &H9000)
+DEFAULT_BASE_ADDRESS = 0x9200
+
+# Programa de exibição gravado pelo próprio Graphos III (III/GRAPHOS.SCR), usado em telas novas
+DEFAULT_PROGRAM = bytes.fromhex(
+    "cdcbfe3b3be111760019e5cd4100e1e5110000010018cd5c00e101001809110020cd5c00c344"
+    "001100183e08d9210000110020010800d9f5e5d5d9e5d5d90100037ed9cd4d00d9197ea7ed52"
+    "d919cd4d00a7ed52d9c501080009c1d909d90b78b120ded9d1e123d9d1e123f13d20c8c90600"
+    "00000000000000"
+)
+
+# Tabelas de uma tela vazia, como os visualizadores completam arquivos truncados (padrão 0, cor $F0)
+EMPTY_TABLES = bytes(GRPCOL) + bytes([DEFAULT_COLOR]) * (TABLES_SIZE - GRPCOL)
+
+
+def bsave_header(start: int, end: int, execute: int) -> bytes:
+    """Cabeçalho de arquivo binário MSX (BSAVE): FE início fim execução, little-endian."""
+    return bytes([BSAVE_ID, start & 0xFF, start >> 8, end & 0xFF, end >> 8, execute & 0xFF, execute >> 8])
+
+
+class ScrFile:
+    """Uma tela .SCR: cabeçalho, programa de exibição, tabelas da VRAM e bytes finais."""
+
+    def __init__(self, vram: Screen2VRAM = None, header: bytes = None, program: bytes = None,
+                 trailer: bytes = b"", table_length: int = TABLES_SIZE):
+        self.vram = vram if vram is not None else Screen2VRAM()
+        if header is None:
+            # O fim declarado pelo Graphos III inclui 8 bytes depois da tabela de cores
+            end = DEFAULT_BASE_ADDRESS + PROGRAM_SIZE + TABLES_SIZE + 8 - 1
+            header = bsave_header(DEFAULT_BASE_ADDRESS, end, DEFAULT_BASE_ADDRESS)
+        self.header = bytes(header)
+        self.program = bytes(program if program is not None else DEFAULT_PROGRAM)
+        self.trailer = bytes(trailer)
+        self.table_length = table_length  # Arquivos truncados guardam menos que 12 KB
+
+    @property
+    def base_address(self) -> int:
+        return self.header[1] | (self.header[2] << 8)
+
+    def tobytes(self) -> bytes:
+        """
+        Conteúdo completo do arquivo (padrões seguidos das cores, como em vram.buffer).
+        Um arquivo truncado continua truncado enquanto a parte que falta estiver vazia;
+        se algo foi desenhado nela, as tabelas são gravadas inteiras e o fim declarado
+        no cabeçalho é estendido até elas.
+        """
+        header, length = self.header, self.table_length
+        if length < TABLES_SIZE and self.vram.buffer[length:] != EMPTY_TABLES[length:]:
+            length = TABLES_SIZE
+            end = max(header[3] | (header[4] << 8), self.base_address + PROGRAM_SIZE + TABLES_SIZE - 1)
+            header = bsave_header(self.base_address, end, header[5] | (header[6] << 8))
+        return b"".join((header, self.program, self.vram.buffer[:length], self.trailer))
+
+
+def parse_scr(data) -> ScrFile:
+    """Interpreta o conteúdo de um arquivo .SCR (bytes, bytearray ou memoryview)."""
+    data = memoryview(data)
+    if len(data) < DATA_OFFSET or data[0] != BSAVE_ID:
+        raise ValueError("Arquivo .SCR inválido: cabeçalho binário MSX (FE) ou programa de exibição ausente.")
+
+    tables = data[DATA_OFFSET:DATA_OFFSET + TABLES_SIZE]
+    table_length = len(tables)
+    if table_length == TABLES_SIZE:
+        vram = Screen2VRAM(tables)
+    else:
+        # Arquivo truncado: o que faltar fica como nos visualizadores (padrão 0, cor $F0)
+        buffer = bytearray(EMPTY_TABLES)
+        buffer[:table_length] = tables
+        vram = Screen2VRAM(buffer)
+
+    return ScrFile(vram,
+                   header=data[:HEADER_SIZE].tobytes(),
+                   program=data[HEADER_SIZE:DATA_OFFSET].tobytes(),
+                   trailer=data[DATA_OFFSET + TABLES_SIZE:].tobytes(),
+                   table_length=table_length)
+
+
+def load_scr(filename: str) -> ScrFile:
+    """Lê um arquivo .SCR com uma única leitura."""
+    with open(filename, "rb") as f:
+        return parse_scr(f.read())
+
+
+def save_scr(filename: str, scr: ScrFile):
+    """Grava um arquivo .SCR com uma única escrita."""
+    with open(filename, "wb") as f:
+        f.write(scr.tobytes())
@@ -0,0 +1,182 @@
+"""
+Núcleo do modo SCREEN 2 do MSX, sem nenhuma dependência de interface gráfica.
+
+Guarda a paleta, as dimensões da tela e as rotinas vetorizadas (NumPy) que
+operam sobre o framebuffer indexado usado pelo editor: um array uint8 de
+MSX_HEIGHT x MSX_WIDTH onde cada posição é o índice da cor na paleta MSX.
+"""
+import numpy as np
+
+# --- Paleta de Cores do MSX (HEX RGB) ---
+MSX_PALETTE = {
+    0: "#000000",  # Preto
+    1: "#000000",  # Preto Transparente (geralmente tratado como 0 no VRAM, mas aqui usaremos como preto sólido)
+    2: "#21C842",  # Verde Médio
+    3: "#5EDC78",  # Verde Claro
+    4: "#5454ED",  # Azul Escuro
+    5: "#7D76FC",  # Azul Claro
+    6: "#C75454",  # Vermelho Escuro
+    7: "#42E8EC",  # Ciano
+    8: "#ED6A54",  # Vermelho Médio
+    9: "#FF8C8C",  # Vermelho Claro
+    10: "#C3C3C3", # Cinza Escuro
+    11: "#FFFFFF", # Branco
+    12: "#9C68CC", # Magenta
+    13: "#CC9C9C", # Salmão
+    14: "#3ADC3A", # Verde Lima
+    15: "#CCCC3A", # Amarelo
+}
+
+# Inverso para buscar o índice da cor a partir do HEX
+MSX_PALETTE_INV = {v: k for k, v in MSX_PALETTE.items()}
+
+# Mesma paleta como array (16, 3) de componentes RGB, para conversões vetorizadas
+MSX_PALETTE_RGB = np.array([[int(MSX_PALETTE[i][j:j + 2], 16) for j in (1, 3, 5)] for i in range(16)], dtype=np.uint8)
+
+# --- Geometria da tela ---
+MSX_WIDTH = 256
+MSX_HEIGHT = 192
+BLOCK_WIDTH = 8  # Cada bloco 8x1 pode ter apenas duas cores
+BLOCKS_PER_ROW = MSX_WIDTH // BLOCK_WIDTH
+
+
+def new_framebuffer(color_index: int = 0) -> np.ndarray:
+    """Cria um framebuffer indexado (uint8) preenchido com uma única cor."""
+    return np.full((MSX_HEIGHT, MSX_WIDTH), color_index, dtype=np.uint8)
+
+
+def new_block_mask() -> np.ndarray:
+    """Cria a máscara de blocos 8x1 sujos (uma entrada por bloco da tela)."""
+    return np.zeros((MSX_HEIGHT, BLOCKS_PER_ROW), dtype=bool)
+
+
+def mark_block_span(mask: np.ndarray, msx_y: int, msx_x_start: int, msx_x_end: int):
+    """Marca na máscara os blocos 8x1 da linha msx_y cobertos pelo intervalo de x (inclusivo)."""
+    if not (0 <= msx_y < MSX_HEIGHT):
+        return
+    x0 = max(min(msx_x_start, msx_x_end), 0)
+    x1 = min(max(msx_x_start, msx_x_end), MSX_WIDTH - 1)
+    if x0 <= x1:
+        mask[msx_y, x0 // BLOCK_WIDTH:x1 // BLOCK_WIDTH + 1] = True
+
+
+def rank_block_colors(blocks: np.ndarray):
+    """
+    Ordena as cores de vários blocos de 8 pixels de uma só vez.
+
+    blocks é um array (n, 8) de índices de cor. Devolve (primeira, segunda, distintas):
+    as duas cores mais frequentes de cada bloco e quantas cores diferentes ele tem.
+    Empates são resolvidos pela cor que aparece primeiro no bloco, a mesma ordem
+    que um sort estável sobre um dicionário de contagens produziria.
+    Em blocos de uma única cor, a segunda cor é igual à primeira.
+    """
+    n = blocks.shape[0]
+    rows = np.arange(n)
+    counts = np.bincount((rows[:, None] * 16 + blocks).ravel(), minlength=n * 16).reshape(n, 16)
+
+    # Posição da primeira ocorrência de cada cor (8 = ausente)
+    first_seen = np.full((n, 16), BLOCK_WIDTH, dtype=np.int16)
+    for pos in range(BLOCK_WIDTH - 1, -1, -1):
+        first_seen[rows, blocks[:, pos]] = pos
+
+    key = np.where(counts > 0, counts * BLOCK_WIDTH + (BLOCK_WIDTH - 1 - first_seen), -1)
+    first = key.argmax(axis=1)
+    key[rows, first] = -1
+    second = key.argmax(axis=1)
+    distinct = np.count_nonzero(counts, axis=1)
+    second = np.where(distinct > 1, second, first)
+    return first.astype(np.uint8), second.astype(np.uint8), distinct
+
+
+def apply_color_constraint(pixels: np.ndarray, dirty: np.ndarray, replacement_color: int) -> int:
+    """
+    Aplica a restrição de duas cores do SCREEN 2 a todos os blocos 8x1 marcados em dirty.
+
+    Em cada bloco com mais de duas cores, mantém as duas mais frequentes e troca as
+    demais por replacement_color (o mesmo comportamento do editor desde a primeira versão).
+    Todos os blocos são resolvidos em uma única passada vetorizada.
+    Devolve quantos pixels foram substituídos.
+    """
+    ys, bs = np.nonzero(dirty)
+    if ys.size == 0:
+        return 0
+
+    block_view = pixels.reshape(MSX_HEIGHT, BLOCKS_PER_ROW, BLOCK_WIDTH)
+    blocks = block_view[ys, bs]
+    first, second, distinct = rank_block_colors(blocks)
+
+    over = distinct > 2
+    if not over.any():
+        return 0
+
+    sub = blocks[over]
+    keep = (sub == first[over, None]) | (sub == second[over, None])
+    sub[~keep] = replacement_color
+    block_view[ys[over], bs[over]] = sub
+    return int(np.count_nonzero(~keep))
+
+
+def _run_starts(mask: np.ndarray) -> np.ndarray:
+    """Posições onde começa cada sequência de True em uma máscara 1D."""
+    starts = mask.copy()
+    starts[1:] &= ~mask[:-1]
+    return np.flatnonzero(starts)
+
+
+def cell_bounds(msx_x: int, msx_y: int):
+    """Limites (x_min, y_min, x_max, y_max) da célula 8x8 que contém o pixel."""
+    x0 = (msx_x // 8) * 8
+    y0 = (msx_y // 8) * 8
+    return x0, y0, x0 + 7, y0 + 7
+
+
+def flood_fill(pixels: np.ndarray, start_x: int, start_y: int, fill_color_index: int, bounds=None) -> dict:
+    """
+    Preenchimento de área por segmentos (scanline) diretamente no framebuffer.
+
+    Cada semente é expandida para a esquerda e para a direita até a borda da área,
+    o trecho inteiro é pintado de uma vez e somente uma semente por trecho contíguo
+    das linhas vizinhas é empilhada. A memória usada depende do número de trechos,
+    não do número de pixels.
+
+    bounds (x_min, y_min, x_max, y_max), inclusivo, limita o preenchimento; use
+    cell_bounds() para não atravessar a célula 8x8 de atributos do SCREEN 2.
+    Devolve {linha: (x_min, x_max)} com o trecho pintado em cada linha tocada.
+    """
+    x_lo, y_lo, x_hi, y_hi = bounds if bounds is not None else (0, 0, MSX_WIDTH - 1, MSX_HEIGHT - 1)
+    x_lo, y_lo = max(x_lo, 0), max(y_lo, 0)
+    x_hi, y_hi = min(x_hi, MSX_WIDTH - 1), min(y_hi, MSX_HEIGHT - 1)
+    if not (x_lo <= start_x <= x_hi and y_lo <= start_y <= y_hi):
+        return {}
+
+    target = pixels[start_y, start_x]
+    if target == fill_color_index:
+        return {} # Já está preenchido com a cor alvo
+
+    touched = {}
+    stack = [(start_x, start_y)]
+    while stack:
+        x, y = stack.pop()
+        row = pixels[y]
+        if row[x] != target:
+            continue # Já pintado por outro trecho
+
+        # Expande o trecho até encontrar pixels de outra cor
+        blocked = np.flatnonzero(row[x_lo:x] != target)
+        left = x_lo + int(blocked[-1]) + 1 if blocked.size else x_lo
+        blocked = np.flatnonzero(row[x + 1:x_hi + 1] != target)
+        right = x + int(blocked[0]) if blocked.size else x_hi
+
+        row[left:right + 1] = fill_color_index
+        if y in touched:
+            old_left, old_right = touched[y]
+            touched[y] = (min(old_left, left), max(old_right, right))
+        else:
+            touched[y] = (left, right)
+
+        # Uma semente por trecho contíguo da cor alvo nas linhas de cima e de baixo
+        for ny in (y - 1, y + 1):
+            if y_lo <= ny <= y_hi:
+                for offset in _run_starts(pixels[ny, left:right + 1] == target):
+                    stack.append((left + int(offset), ny))
+    return touched
@@ -1,58 +1,39 @@
+import os
+import time
 import customtkinter as ctk
 import tkinter as tk
 from tkinter import colorchooser
-from collections import defaultdict
-from math import sqrt, floor
-
-# --- Paleta de Cores do MSX (HEX RGB) ---
-MSX_PALETTE = {
-    0: "#000000",  # Preto
-    1: "#000000",  # Preto Transparente (geralmente tratado como 0 no VRAM, mas aqui usaremos como preto sólido)
-    2: "#21C842",  # Verde Médio
-    3: "#5EDC78",  # Verde Claro
-    4: "#5454ED",  # Azul Escuro
-    5: "#7D76FC",  # Azul Claro
-    6: "#C75454",  # Vermelho Escuro
-    7: "#42E8EC",  # Ciano
-    8: "#ED6A54",  # Vermelho Médio
-    9: "#FF8C8C",  # Vermelho Claro
-    10: "#C3C3C3", # Cinza Escuro
-    11: "#FFFFFF", # Branco
-    12: "#9C68CC", # Magenta
-    13: "#CC9C9C", # Salmão
-    14: "#3ADC3A", # Verde Lima
-    15: "#CCCC3A", # Amarelo
-}
-
-# Inverso para buscar o índice da cor a partir do HEX
-MSX_PALETTE_INV = {v: k for k, v in MSX_PALETTE.items()}
+
+import numpy as np
+
+from msx_screen2 import MSX_PALETTE, MSX_PALETTE_RGB, MSX_WIDTH, MSX_HEIGHT, BLOCK_WIDTH, new_framebuffer
+from msx_vram import Screen2VRAM
+from msx_history import EditHistory, HISTORY_MAX_BYTES
+from msx_files import SCREEN_EXTENSIONS, load_screen_document, save_screen_document
+from msx_stamp import STAMP_MODES
+from msx_alf import TEXT_STYLES, GLYPH_HEIGHT
+from msx_profiler import Profiler, profiled
+from msx_solver import CONSTRAINT_MODES
+from msx_commands import CommandRunner, parse_script
+from msx_viewport import TileViewport, ZOOM_LEVELS, DEFAULT_ZOOM
+from msx_surface import Screen2Surface, DRAG_TOOLS, photo_data, drag_circle
 
 # --- Constantes do Editor ---
-MSX_WIDTH = 256
-MSX_HEIGHT = 192
-PIXEL_SCALE = 4  # Cada pixel MSX será um bloco de PIXEL_SCALE x PIXEL_SCALE no canvas
+# Cada pixel MSX é um bloco de zoom x zoom no canvas (ZOOM_LEVELS, em msx_viewport)
+CANVAS_WIDTH = MSX_WIDTH * DEFAULT_ZOOM # Tamanho pedido inicialmente; a janela pode ser menor ou maior
+CANVAS_HEIGHT = MSX_HEIGHT * DEFAULT_ZOOM
+
+STROKE_FRAME_BUDGET = 1 / 60 # Segundos que pontos do lápis esperam, no máximo, para virar pixels na tela
 
-CANVAS_WIDTH = MSX_WIDTH * PIXEL_SCALE
-CANVAS_HEIGHT = MSX_HEIGHT * PIXEL_SCALE
 
 class MSScreen2Editor(ctk.CTkFrame):
-    def __init__(self, master, app_instance=None):
+    def __init__(self, master, app_instance=None, history_max_bytes: int = HISTORY_MAX_BYTES):
         super().__init__(master)
-        self.app_instance = app_instance # Para acesso a funções da app principal, se necessário
+        self.init_state(app_instance, history_max_bytes)
 
         self.grid_rowconfigure(0, weight=1)
         self.grid_columnconfigure(1, weight=1)
 
-        # --- Variáveis de Estado do Editor ---
-        self.current_tool = "pencil" # Ferramenta atual (pencil, line, rect, fill, etc.)
-        self.primary_color_index = 11 # Cor primária padrão: Branco
-        self.secondary_color_index = 0  # Cor secundária padrão: Preto
-        self.current_drawing_color = self.primary_color_index # Cor que está sendo usada para desenhar
-
-        # Armazenar os pixels da tela MSX real
-        # self.pixels[y][x] = cor_index
-        self.pixels = [[self.secondary_color_index for _ in range(MSX_WIDTH)] for _ in range(MSX_HEIGHT)]
-
         # --- Painel de Ferramentas (Coluna 0) ---
         self.toolbar_frame = ctk.CTkFrame(self, width=150)
         self.toolbar_frame.grid(row=0, column=0, sticky="nswe", padx=(5, 2), pady=5)
@@ -70,12 +51,35 @@ class MSScreen2Editor(ctk.CTkFrame):
             ("Círculo Vazio", "circle_empty", self.set_tool),
             ("Círculo Cheio", "circle_fill", self.set_tool),
             ("Preenchimento", "fill_area", self.set_tool),
+            ("Preench. Célula 8x8", "fill_cell", self.set_tool),
+            ("Shape", "shape", self.set_tool),
+            ("Texto", "text", self.set_tool),
             # Adicione mais ferramentas aqui conforme necessário
         ]
         for text, tool_name, command in tools:
             btn = ctk.CTkButton(self.toolbar_frame, text=text, command=lambda t=tool_name: command(t))
             btn.pack(pady=2, padx=5, fill="x")
             self.tool_buttons[tool_name] = btn
+        ctk.CTkButton(self.toolbar_frame, text="Desfazer (Ctrl+Z)", command=self.undo).pack(pady=(8, 2), padx=5, fill="x")
+        ctk.CTkButton(self.toolbar_frame, text="Refazer (Ctrl+Y)", command=self.redo).pack(pady=2, padx=5, fill="x")
+        self.stamp_mode_menu = ctk.CTkOptionMenu(self.toolbar_frame, values=[m.upper() for m in STAMP_MODES],
+                                                 command=lambda value: setattr(self, "stamp_mode", value.lower()))
+        self.stamp_mode_menu.pack(pady=2, padx=5, fill="x")
+        self.text_style_menu = ctk.CTkOptionMenu(self.toolbar_frame, values=[s.upper() for s in TEXT_STYLES],
+                                                 command=lambda value: setattr(self, "text_style", value.lower()))
+        self.text_style_menu.pack(pady=2, padx=5, fill="x")
+        self.constraint_mode_menu = ctk.CTkOptionMenu(self.toolbar_frame, values=[m.upper() for m in CONSTRAINT_MODES],
+                                                      command=lambda value: setattr(self, "constraint_mode", value.lower()))
+        self.constraint_mode_menu.pack(pady=2, padx=5, fill="x")
+        self.exact_preview = False # Preview de linha/retângulo/círculo com os pixels que serão gravados
+        self.exact_preview_box = ctk.CTkCheckBox(self.toolbar_frame, text="Preview exato",
+                                                 command=lambda: setattr(self, "exact_preview",
+                                                                         bool(self.exact_preview_box.get())))
+        self.exact_preview_box.pack(pady=2, padx=5, fill="x")
+        self.zoom_menu = ctk.CTkOptionMenu(self.toolbar_frame, values=[f"{z}X" for z in ZOOM_LEVELS],
+                                           command=lambda value: self.set_zoom(int(value[:-1])))
+        self.zoom_menu.set(f"{DEFAULT_ZOOM}X")
+        self.zoom_menu.pack(pady=2, padx=5, fill="x")
 
         # --- Paleta de Cores ---
         ctk.CTkLabel(self.toolbar_frame, text="Paleta MSX", font=ctk.CTkFont(weight="bold")).pack(pady=(10, 5))
@@ -122,23 +126,100 @@ class MSScreen2Editor(ctk.CTkFrame):
                                 height=CANVAS_HEIGHT,
                                 bg=MSX_PALETTE[self.secondary_color_index],
                                 highlightthickness=0) # Remove a borda padrão do canvas
-        self.canvas.pack(expand=True, fill="both")
+        self.canvas.grid(row=0, column=0, sticky="nswe")
+
+        # --- Framebuffer exibido em células ampliadas ---
+        # frame_image guarda a tela na resolução MSX (1 pixel = 1 pixel); o viewport mostra
+        # cópias ampliadas só das células 8x8 visíveis. Cada alteração copia apenas o
+        # retângulo sujo para frame_image e reamplia as células visíveis que ele toca.
+        self.frame_image = tk.PhotoImage(width=MSX_WIDTH, height=MSX_HEIGHT)
+        self.viewport = TileViewport(self.canvas, self.frame_image)
+        self.h_scrollbar = ctk.CTkScrollbar(self.canvas_frame, orientation="horizontal", command=self.viewport.xview)
+        self.h_scrollbar.grid(row=1, column=0, sticky="we")
+        self.v_scrollbar = ctk.CTkScrollbar(self.canvas_frame, orientation="vertical", command=self.viewport.yview)
+        self.v_scrollbar.grid(row=0, column=1, sticky="ns")
+        self.canvas.configure(xscrollcommand=self.h_scrollbar.set, yscrollcommand=self.v_scrollbar.set)
+
+        # --- Preview das ferramentas de arrasto ---
+        # Um item de canvas por forma, criado uma vez e só movido (coords) a cada movimento.
+        # No modo exato, a forma é rasterizada de verdade numa cópia do framebuffer e só o
+        # retângulo afetado é mostrado, numa imagem sobreposta à tela.
+        self.preview_frame = tk.PhotoImage(width=1, height=1)
+        self.preview_view = tk.PhotoImage(width=DEFAULT_ZOOM, height=DEFAULT_ZOOM)
+        self.preview_image_id = self.canvas.create_image(0, 0, image=self.preview_view, anchor="nw",
+                                                         state="hidden", tags="preview_shape")
 
         # --- Eventos do Mouse ---
         self.canvas.bind("<Button-1>", self.on_mouse_down)
         self.canvas.bind("<B1-Motion>", self.on_mouse_drag)
         self.canvas.bind("<ButtonRelease-1>", self.on_mouse_up)
         self.canvas.bind("<Button-3>", self.on_right_click) # Botão direito para cor secundária
-
-        # Variáveis para desenho
-        self.last_x, self.last_y = None, None
-        self.start_x, self.start_y = None, None # Para ferramentas de arrasto (linha, retângulo, etc.)
+        self.canvas.bind("<Key>", self.on_key) # Digitação da ferramenta de texto
+        self.canvas.bind("<Control-z>", lambda event: self.undo())
+        self.canvas.bind("<Control-y>", lambda event: self.redo())
+        # Zoom (Ctrl+roda, em torno do cursor) e rolagem (roda, Shift+roda, arrasto com o botão do meio)
+        self.canvas.bind("<Configure>", lambda event: self.viewport.show_visible())
+        self.canvas.bind("<MouseWheel>", lambda event: self.on_wheel(event, -event.delta))
+        self.canvas.bind("<Button-4>", lambda event: self.on_wheel(event, -1))
+        self.canvas.bind("<Button-5>", lambda event: self.on_wheel(event, 1))
+        self.canvas.bind("<Button-2>", lambda event: self.canvas.scan_mark(event.x, event.y))
+        self.canvas.bind("<B2-Motion>", self.on_pan)
 
         # Inicializa a tela com a cor secundária
         self.draw_all_pixels()
         self.update_color_displays()
 
 
+    def init_state(self, app_instance=None, history_max_bytes: int = HISTORY_MAX_BYTES):
+        """
+        Estado do editor que não depende de widgets: a superfície, o histórico e as variáveis das
+        ferramentas. Chamado por __init__ antes de montar a interface (e pelos benchmarks, sem ela).
+        """
+        self.app_instance = app_instance # Para acesso a funções da app principal, se necessário
+
+        # --- Variáveis de Estado do Editor ---
+        self.current_tool = "pencil" # Ferramenta atual (pencil, line, rect, fill, etc.)
+        self.primary_color_index = 11 # Cor primária padrão: Branco
+        self.secondary_color_index = 0  # Cor secundária padrão: Preto
+        self.current_drawing_color = self.primary_color_index # Cor que está sendo usada para desenhar
+
+        # A tela MSX real e as primitivas ficam em msx_surface, sem Tk; o editor só mostra o resultado.
+        # self.pixels[y, x] = cor_index (array uint8 de MSX_HEIGHT x MSX_WIDTH), o mesmo array da superfície
+        self.surface = Screen2Surface(new_framebuffer(self.secondary_color_index))
+        self.pixels = self.surface.pixels
+        # Blocos 8x1 alterados pela operação atual, ainda sem a restrição de cor aplicada
+        self.constraint_blocks = self.surface.constraint_blocks
+        # Desfazer/refazer: cada operação guarda apenas os blocos 8x1 que alterou
+        self.history = EditHistory(self.pixels, history_max_bytes)
+        # Último .SCR carregado/salvo: cabeçalho, programa de exibição e tabelas originais
+        self.scr_document = None
+        self.stamp_mode = "mascara" # Operação dos shapes sem máscara (mascara, and, or, xor)
+        self.constraint_mode = "simples" # simples: cores extras viram a cor de desenho; otima: par de menor erro
+        self.text_style = "normal"
+        self.text_cursor = None # Posição (x, y) do próximo caractere da ferramenta de texto
+        self.text_line_start = 0
+        # Instrumentação opcional (compartilhada com a aplicação, que a liga e exporta o trace)
+        self.profiler = getattr(app_instance, "profiler", None) or Profiler()
+
+        self._dirty_region = None # (x_min, y_min, x_max, y_max) ainda não enviado para a imagem
+        self._refresh_scheduled = False
+
+        # Preview das ferramentas de arrasto (os itens de canvas são criados com a interface)
+        self._preview_items = {}
+        self._preview_end = None # Último ponto do arrasto ainda não mostrado
+        self._preview_scheduled = False
+        self._preview_surface = None # Cópia do framebuffer onde o preview exato é rasterizado
+        self._preview_region = None # Retângulo da cópia alterado pelo último preview exato
+
+        # Variáveis para desenho
+        self.last_x, self.last_y = None, None
+        self.start_x, self.start_y = None, None # Para ferramentas de arrasto (linha, retângulo, etc.)
+        # Lápis: os eventos de movimento só enfileiram pontos; flush_stroke rasteriza a fila uma vez por quadro
+        self._stroke_points = []
+        self._stroke_origin = None # Último ponto já rasterizado
+        self._stroke_flush_scheduled = False
+        self._stroke_frame_start = 0.0
+
     def set_drawing_color(self, color_index: int):
         """Define a cor de desenho principal e atualiza o display."""
         if color_index in MSX_PALETTE:
@@ -167,93 +248,128 @@ class MSScreen2Editor(ctk.CTkFrame):
 
 
     def get_msx_pixel_coords(self, event_x, event_y):
-        """Converte as coordenadas do canvas para coordenadas de pixel MSX."""
-        msx_x = floor(event_x / PIXEL_SCALE)
-        msx_y = floor(event_y / PIXEL_SCALE)
-        return msx_x, msx_y
+        """Converte as coordenadas de um evento do canvas para pixel MSX (com o zoom e a rolagem atuais)."""
+        return self.viewport.msx_coords(event_x, event_y)
+
+    # --- Zoom e rolagem ---
+    def set_zoom(self, zoom: int, window_x: int = None, window_y: int = None):
+        """Troca o zoom (um de ZOOM_LEVELS), mantendo parado o pixel sob o ponto dado da janela."""
+        self.viewport.set_zoom(zoom, window_x, window_y)
+        self.zoom_menu.set(f"{self.viewport.zoom}X")
+        for item in self._preview_items.values():
+            self.canvas.itemconfigure(item, width=self.viewport.zoom)
+        if self._preview_end is not None:
+            self.update_preview()
+
+    def on_wheel(self, event, direction: int):
+        """Roda do mouse: zoom com Ctrl, rolagem horizontal com Shift, vertical sem modificador."""
+        direction = 1 if direction > 0 else -1
+        if event.state & 0x0004: # Control
+            self.set_zoom(self.viewport.next_zoom(-direction), event.x, event.y)
+        elif event.state & 0x0001: # Shift
+            self.viewport.xview("scroll", direction, "units")
+        else:
+            self.viewport.yview("scroll", direction, "units")
+
+    def on_pan(self, event):
+        self.canvas.scan_dragto(event.x, event.y, gain=1)
+        self.viewport.show_visible()
 
     def draw_pixel_on_canvas(self, msx_x: int, msx_y: int, color_index: int):
-        """Desenha um único pixel MSX no canvas ampliado."""
+        """Atualiza um único pixel MSX e agenda o redesenho da região suja."""
         if 0 <= msx_x < MSX_WIDTH and 0 <= msx_y < MSX_HEIGHT:
-            x1 = msx_x * PIXEL_SCALE
-            y1 = msx_y * PIXEL_SCALE
-            x2 = x1 + PIXEL_SCALE
-            y2 = y1 + PIXEL_SCALE
-            self.canvas.create_rectangle(x1, y1, x2, y2,
-                                         fill=MSX_PALETTE[color_index],
-                                         outline="", # Sem borda para os pixels
-                                         tags=f"pixel_{msx_x}_{msx_y}") # Tag para fácil atualização
             # Atualiza o array de pixels
-            self.pixels[msx_y][msx_x] = color_index
+            self.pixels[msx_y, msx_x] = color_index
+            self.mark_dirty(msx_x, msx_y, msx_x, msx_y)
+
+    def mark_dirty(self, x_min: int, y_min: int, x_max: int, y_max: int):
+        """Inclui o retângulo (inclusivo) na região suja e agenda um único redesenho."""
+        if self._dirty_region is None:
+            self._dirty_region = (x_min, y_min, x_max, y_max)
+        else:
+            dx0, dy0, dx1, dy1 = self._dirty_region
+            self._dirty_region = (min(dx0, x_min), min(dy0, y_min), max(dx1, x_max), max(dy1, y_max))
+        if not self._refresh_scheduled:
+            self._refresh_scheduled = True
+            self.after_idle(self.refresh_dirty_region)
+
+    @profiled("render", kind="render")
+    def refresh_dirty_region(self):
+        """Copia a região suja de self.pixels para a imagem do canvas (um blit por evento)."""
+        self._refresh_scheduled = False
+        if self._dirty_region is None:
+            return
+        x_min, y_min, x_max, y_max = self._dirty_region
+        self._dirty_region = None
+
+        x_min, y_min = max(x_min, 0), max(y_min, 0)
+        x_max, y_max = min(x_max, MSX_WIDTH - 1), min(y_max, MSX_HEIGHT - 1)
+        if x_min > x_max or y_min > y_max:
+            return
+        if self.profiler.enabled:
+            self.profiler.count("pixels_redesenhados", (x_max - x_min + 1) * (y_max - y_min + 1))
+
+        self.frame_image.put(photo_data(self.pixels[y_min:y_max + 1, x_min:x_max + 1]), to=(x_min, y_min))
+
+        # Reamplia apenas as células visíveis tocadas pelo retângulo alterado
+        self.viewport.invalidate(x_min, y_min, x_max, y_max)
 
     def draw_all_pixels(self):
         """Redesenha todos os pixels do array de pixels no canvas."""
-        self.canvas.delete("all") # Limpa o canvas antes de redesenhar
-        for y in range(MSX_HEIGHT):
-            for x in range(MSX_WIDTH):
-                self.draw_pixel_on_canvas(x, y, self.pixels[y][x])
+        self.mark_dirty(0, 0, MSX_WIDTH - 1, MSX_HEIGHT - 1)
+        self.refresh_dirty_region()
 
 
     # --- Lógica de Restrição de Cores do MSX SCREEN 2 ---
-    def apply_msx_color_constraint(self, msx_y: int, msx_x_start: int, msx_x_end: int):
+    def show_surface_changes(self):
+        """Agenda o redesenho do que a superfície alterou desde a última vez."""
+        region = self.surface.take_dirty_region()
+        if region is not None:
+            self.mark_dirty(*region)
+
+    def commit_operation(self):
         """
-        Aplica a restrição de duas cores para cada bloco horizontal de 8 pixels no MSX SCREEN 2.
-        Todos os pixels em uma linha de 8 pixels (x // 8) * 8 a ((x // 8) * 8) + 7
-        só podem usar duas cores. Se mais de duas forem usadas, as extras são substituídas.
-        Esta é uma simplificação. Em um editor real, você precisaria de uma interface
-        para o usuário escolher as duas cores por bloco de 8.
-        Por simplicidade, aqui vamos:
-        1. Identificar as duas cores mais usadas no bloco.
-        2. Substituir as outras por uma das duas predominantes.
+        Fecha a operação de desenho atual: aplica a restrição de cor a todos os
+        blocos 8x1 sujos em uma única passada vetorizada (Screen2Surface.commit) e
+        agenda o redesenho do que mudou. No modo "simples" as cores excedentes são
+        trocadas pela cor de desenho atual; no modo "otima" cada bloco excedente
+        recebe o par de cores de menor erro (msx_solver).
         """
-        if not (0 <= msx_y < MSX_HEIGHT):
-            return
-
-        # Itera sobre os blocos de 8 pixels afetados
-        block_start = (msx_x_start // 8) * 8
-        block_end = ((msx_x_end // 8) * 8) + 8 # Garante que o último bloco também seja processado
-        if block_end > MSX_WIDTH: block_end = MSX_WIDTH
-
-        for x_block_start in range(block_start, block_end, 8):
-            x_block_end = min(x_block_start + 8, MSX_WIDTH)
-
-            # Coleta as cores usadas neste bloco
-            colors_in_block = defaultdict(int)
-            for x in range(x_block_start, x_block_end):
-                colors_in_block[self.pixels[msx_y][x]] += 1
-
-            # Seleciona as duas cores mais frequentes
-            sorted_colors = sorted(colors_in_block.items(), key=lambda item: item[1], reverse=True)
-            
-            if len(sorted_colors) > 2:
-                # Pegamos as 2 cores mais frequentes. Se houver um empate grande, a ordem pode importar.
-                color1_idx = sorted_colors[0][0]
-                color2_idx = sorted_colors[1][0] if len(sorted_colors) > 1 else color1_idx # Se só 1 cor, a segunda é a mesma
-
-                # Substitui quaisquer outras cores por uma das duas predominantes
-                for x in range(x_block_start, x_block_end):
-                    current_pixel_color = self.pixels[msx_y][x]
-                    if current_pixel_color != color1_idx and current_pixel_color != color2_idx:
-                        # Simplificação: Substitui pela cor principal selecionada para desenho
-                        # Ou você pode escolher a mais próxima no MSX PALETTE, ou a mais frequente
-                        self.pixels[msx_y][x] = self.current_drawing_color # Ou color1_idx
-                        self.draw_pixel_on_canvas(x, msx_y, self.pixels[msx_y][x]) # Redesenha
-
-            # Se houver 1 ou 2 cores, está OK, não faz nada.
+        dirty = self.constraint_blocks
+        if not dirty.any():
+            self.show_surface_changes()
+            return 0
+        checked = int(np.count_nonzero(dirty)) * BLOCK_WIDTH
+        replaced = self.surface.commit(self.current_drawing_color, self.constraint_mode)
+        if self.profiler.enabled:
+            self.profiler.count("passes_restricao")
+            self.profiler.count("pixels_verificados", checked)
+            self.profiler.count("pixels_substituidos", replaced)
+        self.show_surface_changes()
+        return replaced
 
     # --- Funções de Manipulação do Canvas / Eventos do Mouse ---
 
+    @profiled("on_mouse_down", kind="input")
     def on_mouse_down(self, event):
+        self.canvas.focus_set() # Atalhos de teclado (desfazer, texto) vão para o canvas
         self.start_x, self.start_y = self.get_msx_pixel_coords(event.x, event.y)
         self.last_x, self.last_y = self.start_x, self.start_y
         self.current_drawing_color = self.primary_color_index # Usar cor primária no clique esquerdo
 
         if self.current_tool == "pencil":
             self.draw_pencil_pixel(self.start_x, self.start_y)
-        elif self.current_tool in ["line", "rect_empty", "rect_fill", "circle_empty", "circle_fill"]:
+            self.commit_operation()
+            self._stroke_points = []
+            self._stroke_origin = (self.start_x, self.start_y)
+            self._stroke_frame_start = time.perf_counter()
+        elif self.current_tool in DRAG_TOOLS:
             # Para ferramentas de arrasto, apenas guarda o ponto inicial
-            pass
+            if self.exact_preview:
+                self._preview_surface = Screen2Surface(self.pixels.copy())
+                self._preview_region = None
 
+    @profiled("on_mouse_drag", kind="input")
     def on_mouse_drag(self, event):
         msx_x, msx_y = self.get_msx_pixel_coords(event.x, event.y)
 
@@ -265,294 +381,375 @@ class MSScreen2Editor(ctk.CTkFrame):
             return
 
         if self.current_tool == "pencil":
-            self.draw_line_pixels(self.last_x, self.last_y, msx_x, msx_y) # Simula um "lápis" conectando pontos
+            self.queue_stroke_point(msx_x, msx_y) # Os pontos são ligados por linhas em flush_stroke
             self.last_x, self.last_y = msx_x, msx_y
-        elif self.current_tool in ["line", "rect_empty", "rect_fill", "circle_empty", "circle_fill"]:
-            # Limpa o preview anterior e desenha um novo preview
-            self.canvas.delete("preview_shape")
-            if self.current_tool == "line":
-                self._preview_line(self.start_x, self.start_y, msx_x, msx_y)
-            elif self.current_tool == "rect_empty":
-                self._preview_rectangle(self.start_x, self.start_y, msx_x, msx_y, fill=False)
-            elif self.current_tool == "rect_fill":
-                self._preview_rectangle(self.start_x, self.start_y, msx_x, msx_y, fill=True)
-            elif self.current_tool == "circle_empty":
-                self._preview_circle(self.start_x, self.start_y, msx_x, msx_y, fill=False)
-            elif self.current_tool == "circle_fill":
-                self._preview_circle(self.start_x, self.start_y, msx_x, msx_y, fill=True)
+        elif self.current_tool in DRAG_TOOLS:
+            # Só a última posição importa: o preview é atualizado uma vez quando o Tk fica ocioso
+            self._preview_end = (msx_x, msx_y)
+            if not self._preview_scheduled:
+                self._preview_scheduled = True
+                self.after_idle(self.update_preview)
 
+        if self.profiler.enabled and self.profiler.status_due():
+            self._log_status(f"{self.profiler.summary(self.current_tool)}  itens_canvas {len(self.canvas.find_all())}")
 
+    @profiled("on_mouse_up", kind="input")
     def on_mouse_up(self, event):
         end_x, end_y = self.get_msx_pixel_coords(event.x, event.y)
 
         # Para ferramentas de arrasto, aplica a forma final
-        if self.current_tool == "line":
-            self.canvas.delete("preview_shape")
-            self.draw_line_pixels(self.start_x, self.start_y, end_x, end_y)
-        elif self.current_tool == "rect_empty":
-            self.canvas.delete("preview_shape")
-            self.draw_rectangle_pixels(self.start_x, self.start_y, end_x, end_y, fill=False)
-        elif self.current_tool == "rect_fill":
-            self.canvas.delete("preview_shape")
-            self.draw_rectangle_pixels(self.start_x, self.start_y, end_x, end_y, fill=True)
-        elif self.current_tool == "circle_empty":
-            self.canvas.delete("preview_shape")
-            self.draw_circle_pixels(self.start_x, self.start_y, end_x, end_y, fill=False)
-        elif self.current_tool == "circle_fill":
-            self.canvas.delete("preview_shape")
-            self.draw_circle_pixels(self.start_x, self.start_y, end_x, end_y, fill=True)
+        if self.current_tool == "pencil":
+            self.flush_stroke()
+            self._stroke_origin = None
+        elif self.current_tool in DRAG_TOOLS:
+            self.hide_preview()
+            self.draw_tool_shape(self.current_tool, self.start_x, self.start_y, end_x, end_y)
         elif self.current_tool == "fill_area":
             self.fill_area(self.start_x, self.start_y, self.current_drawing_color)
+        elif self.current_tool == "fill_cell":
+            self.fill_area(self.start_x, self.start_y, self.current_drawing_color, cell_mode=True)
+        elif self.current_tool == "shape":
+            shape = getattr(self.app_instance, "current_shape", None)
+            if shape is not None:
+                self.stamp_shape(shape, self.start_x, self.start_y, self.stamp_mode)
+        elif self.current_tool == "text":
+            self.text_cursor = (self.start_x, self.start_y)
+            self.text_line_start = self.start_x
+            self.canvas.focus_set()
+
+        # Fim do gesto: tudo o que ele alterou vira um passo de desfazer
+        self.history.record(self.pixels)
+        if self.profiler.enabled:
+            self.after_idle(self._report_profile, self.current_tool) # Depois do redesenho final do gesto
 
         # Reseta as coordenadas de arrasto
         self.last_x, self.last_y = None, None
         self.start_x, self.start_y = None, None
 
+    @profiled("on_right_click", kind="input")
     def on_right_click(self, event):
         """Define a cor de desenho como a cor secundária ao clicar com o botão direito."""
         self.current_drawing_color = self.secondary_color_index
         msx_x, msx_y = self.get_msx_pixel_coords(event.x, event.y)
         if self.current_tool == "pencil":
             self.draw_pencil_pixel(msx_x, msx_y)
+            self.commit_operation()
         elif self.current_tool == "fill_area":
             self.fill_area(msx_x, msx_y, self.current_drawing_color)
+        elif self.current_tool == "fill_cell":
+            self.fill_area(msx_x, msx_y, self.current_drawing_color, cell_mode=True)
+        self.history.record(self.pixels)
+        if self.profiler.enabled:
+            self.after_idle(self._report_profile, self.current_tool)
         # Para ferramentas de arrasto, se quiser que o botão direito também funcione,
         # você precisaria adaptar a lógica de on_mouse_down e on_mouse_up para considerar o botão.
 
 
-    # --- Implementação das Ferramentas de Desenho ---
-
-    def draw_pencil_pixel(self, msx_x: int, msx_y: int):
-        """Desenha um único pixel MSX na posição."""
-        if 0 <= msx_x < MSX_WIDTH and 0 <= msx_y < MSX_HEIGHT:
-            self.pixels[msx_y][msx_x] = self.current_drawing_color
-            self.draw_pixel_on_canvas(msx_x, msx_y, self.current_drawing_color)
-            self.apply_msx_color_constraint(msx_y, msx_x, msx_x) # Aplica a restrição de cor
-
+    def on_key(self, event):
+        """Digitação da ferramenta de texto: cada tecla carimba um caractere no cursor."""
+        font = getattr(self.app_instance, "current_font", None)
+        if self.current_tool != "text" or self.text_cursor is None or font is None:
+            return
+        double_height, double_width, _, _ = TEXT_STYLES[self.text_style]
+        advance = 16 if double_width else 8
+        line_height = GLYPH_HEIGHT * (2 if double_height else 1)
+        x, y = self.text_cursor
+        if event.keysym == "Return":
+            self.text_cursor = (self.text_line_start, y + line_height)
+        elif event.keysym == "BackSpace":
+            x = max(x - advance, self.text_line_start)
+            self.draw_text(" ", x, y, mode="mascara")
+            self.text_cursor = (x, y)
+        elif len(event.char) == 1 and event.char.isprintable():
+            self.draw_text(event.char, x, y)
+            self.text_cursor = (x + advance, y)
+        self.history.record(self.pixels)
+
+    def queue_stroke_point(self, msx_x: int, msx_y: int):
+        """
+        Enfileira um ponto do arrasto do lápis. A fila é rasterizada quando o Tk fica ocioso
+        (todos os eventos de movimento pendentes já foram lidos) ou, se os eventos não param
+        de chegar, assim que o quadro atual passa de STROKE_FRAME_BUDGET.
+        """
+        if self._stroke_origin is None: # Arrasto que começou sem on_mouse_down (ou outra ferramenta)
+            self._stroke_origin = (self.last_x, self.last_y)
+        self._stroke_points.append((msx_x, msx_y))
+        if time.perf_counter() - self._stroke_frame_start >= STROKE_FRAME_BUDGET:
+            self.flush_stroke()
+        elif not self._stroke_flush_scheduled:
+            self._stroke_flush_scheduled = True
+            self.after_idle(self.flush_stroke)
+
+    @profiled("flush_stroke")
+    def flush_stroke(self):
+        """
+        Liga os pontos enfileirados com segmentos de Bresenham, na mesma ordem e cada um com
+        a sua passada de restrição (o mesmo resultado de desenhar evento a evento), e
+        redesenha a região alterada uma única vez.
+        """
+        self._stroke_flush_scheduled = False
+        self._stroke_frame_start = time.perf_counter()
+        points, self._stroke_points = self._stroke_points, []
+        if not points or self._stroke_origin is None:
+            return
+        x0, y0 = self._stroke_origin
+        for x1, y1 in points:
+            self.draw_line_pixels(x0, y0, x1, y1)
+            x0, y0 = x1, y1
+        self._stroke_origin = (x0, y0)
+        if self.profiler.enabled:
+            self.profiler.count("segmentos", len(points))
+        self.refresh_dirty_region()
+
+    def _log_status(self, message: str):
+        if hasattr(self.app_instance, "log_status"):
+            self.app_instance.log_status(message)
+        else:
+            print(message)
 
-    def draw_line_pixels(self, x0: int, y0: int, x1: int, y1: int):
-        """Implementação do algoritmo de linha de Bresenham."""
-        dx = abs(x1 - x0)
-        dy = abs(y1 - y0)
-        sx = 1 if x0 < x1 else -1
-        sy = 1 if y0 < y1 else -1
-        err = dx - dy
-
-        pixels_to_update = set()
-
-        while True:
-            self.draw_pencil_pixel(x0, y0)
-            pixels_to_update.add((y0, x0)) # Guarda para aplicar restrição
-
-            if x0 == x1 and y0 == y1:
-                break
-            e2 = 2 * err
-            if e2 > -dy:
-                err -= dy
-                x0 += sx
-            if e2 < dx:
-                err += dx
-                y0 += sy
-
-        # Aplica a restrição de cor para todas as linhas afetadas
-        for y, x in pixels_to_update:
-            self.apply_msx_color_constraint(y, x, x)
-
-    def _preview_line(self, x0, y0, x1, y1):
-        """Desenha uma linha de preview no canvas."""
-        x0_c, y0_c = x0 * PIXEL_SCALE, y0 * PIXEL_SCALE
-        x1_c, y1_c = x1 * PIXEL_SCALE, y1 * PIXEL_SCALE
-        self.canvas.create_line(x0_c, y0_c, x1_c, y1_c,
-                                fill=MSX_PALETTE[self.current_drawing_color],
-                                width=PIXEL_SCALE,
-                                tags="preview_shape")
+    def _report_profile(self, operation: str):
+        """Fecha a operação no profiler e mostra o resumo (tempos e contadores) na barra de status."""
+        self._log_status(self.profiler.end_operation(operation, itens_canvas=len(self.canvas.find_all())))
 
-    def draw_rectangle_pixels(self, x0: int, y0: int, x1: int, y1: int, fill: bool):
-        """Desenha um retângulo (cheio ou vazio)."""
-        x_min, x_max = min(x0, x1), max(x0, x1)
-        y_min, y_max = min(y0, y1), max(y0, y1)
+    def run_commands(self, text: str, base_dir: str = ".", shapes=None, font=None):
+        """
+        Executa comandos de desenho (msx_commands) sobre a tela: uma restrição de cor e um
+        redesenho para o lote inteiro, que vira um único passo do desfazer. O que já foi
+        desenhado antes de um erro continua na tela. Devolve (runner, mensagem de erro ou None).
+        """
+        runner = CommandRunner(self.surface.pixels, ink=self.primary_color_index, paper=self.secondary_color_index,
+                               shapes=shapes, font=font, document=self.scr_document,
+                               constraint_mode=self.constraint_mode, stamp_mode=self.stamp_mode, base_dir=base_dir)
+        error = None
+        try:
+            runner.run(parse_script(text))
+        except ValueError as e:
+            error = str(e)
+            runner.commit()
+        if runner.region is not None:
+            self.mark_dirty(*runner.region)
+        self.history.record(self.pixels)
+        self.scr_document = runner.document
+        self.primary_color_index, self.secondary_color_index = runner.ink, runner.paper
+        self.current_drawing_color = runner.ink
+        self.update_color_displays()
+        return runner, error
 
-        pixels_to_update_y = set()
+    def undo(self):
+        region = self.history.undo(self.pixels)
+        if region is not None:
+            self.mark_dirty(*region)
 
-        for y in range(y_min, y_max + 1):
-            pixels_to_update_y.add(y)
-            for x in range(x_min, x_max + 1):
-                if fill or (y == y_min or y == y_max or x == x_min or x == x_max):
-                    self.draw_pencil_pixel(x, y) # Reusa a função que já aplica a restrição
+    def redo(self):
+        region = self.history.redo(self.pixels)
+        if region is not None:
+            self.mark_dirty(*region)
 
-        # Aplica restrição para todas as linhas afetadas
-        for y in pixels_to_update_y:
-            self.apply_msx_color_constraint(y, x_min, x_max)
+    # --- Implementação das Ferramentas de Desenho ---
 
+    def draw_tool_shape(self, tool: str, x0: int, y0: int, x1: int, y1: int):
+        """Desenha no framebuffer a forma de uma ferramenta de arrasto entre os dois pontos."""
+        self.surface.drag_shape(tool, x0, y0, x1, y1, self.current_drawing_color)
+        self.commit_operation()
 
-    def _preview_rectangle(self, x0, y0, x1, y1, fill: bool):
-        """Desenha um retângulo de preview no canvas."""
-        x0_c, y0_c = x0 * PIXEL_SCALE, y0 * PIXEL_SCALE
-        x1_c, y1_c = x1 * PIXEL_SCALE + PIXEL_SCALE, y1 * PIXEL_SCALE + PIXEL_SCALE # Adiciona PIXEL_SCALE para incluir o pixel final
-        
-        fill_color = MSX_PALETTE[self.current_drawing_color] if fill else ""
-        outline_color = MSX_PALETTE[self.current_drawing_color]
+    # --- Preview das ferramentas de arrasto ---
 
-        self.canvas.create_rectangle(x0_c, y0_c, x1_c, y1_c,
-                                     fill=fill_color,
-                                     outline=outline_color,
-                                     width=PIXEL_SCALE, # Borda mais grossa para o preview
-                                     tags="preview_shape")
+    def update_preview(self):
+        """Mostra o preview da ferramenta atual até o último ponto do arrasto."""
+        self._preview_scheduled = False
+        if self._preview_end is None or self.start_x is None:
+            return
+        x1, y1 = self._preview_end
+        if self.exact_preview and self._preview_surface is not None:
+            self._preview_exact(self.start_x, self.start_y, x1, y1)
+            return
+        zoom = self.viewport.zoom
+        x0_c, y0_c = self.start_x * zoom, self.start_y * zoom
+        if self.current_tool == "line":
+            self._show_preview_item("line", (x0_c, y0_c, x1 * zoom, y1 * zoom), fill=True)
+        elif self.current_tool in ("rect_empty", "rect_fill"):
+            # + zoom para incluir o pixel final
+            self._show_preview_item("rectangle", (x0_c, y0_c, x1 * zoom + zoom, y1 * zoom + zoom),
+                                    fill=self.current_tool == "rect_fill")
+        else:
+            # Mesmo centro e raio que draw_circle_pixels
+            center_x, center_y, radius = (v * zoom for v in drag_circle(self.start_x, self.start_y, x1, y1))
+            self._show_preview_item("oval", (center_x - radius, center_y - radius,
+                                             center_x + radius + zoom, center_y + radius + zoom),
+                                    fill=self.current_tool == "circle_fill")
+
+    def _show_preview_item(self, kind: str, coords, fill: bool):
+        """Move o item de preview da forma (criado uma única vez) e esconde os das outras formas."""
+        for other_kind, other_item in self._preview_items.items():
+            if other_kind != kind:
+                self.canvas.itemconfigure(other_item, state="hidden")
+        item = self._preview_items.get(kind)
+        if item is None:
+            create = {"line": self.canvas.create_line, "rectangle": self.canvas.create_rectangle,
+                      "oval": self.canvas.create_oval}[kind]
+            item = create(*coords, width=self.viewport.zoom, tags="preview_shape")
+            self._preview_items[kind] = item
+        else:
+            self.canvas.coords(item, *coords)
+        color = MSX_PALETTE[self.current_drawing_color]
+        if kind == "line":
+            self.canvas.itemconfigure(item, fill=color, state="normal")
+        else:
+            self.canvas.itemconfigure(item, fill=color if fill else "", outline=color, state="normal")
 
-    def draw_circle_pixels(self, x0: int, y0: int, x1: int, y1: int, fill: bool):
-        """Desenha um círculo (cheio ou vazio) usando o algoritmo de ponto médio."""
-        center_x = (x0 + x1) // 2
-        center_y = (y0 + y1) // 2
-        radius = int(sqrt((x1 - x0)**2 + (y1 - y0)**2) / 2) # Distância do centro ao ponto mais distante
-
-        pixels_to_update_y = set()
-
-        def plot_circle_points(cx, cy, x, y):
-            """Desenha os 8 pontos simétricos de um círculo."""
-            points = [
-                (cx + x, cy + y), (cx - x, cy + y), (cx + x, cy - y), (cx - x, cy - y),
-                (cx + y, cy + x), (cx - y, cy + x), (cx + y, cy - x), (cx - y, cy - x),
-            ]
-            for px, py in points:
-                if 0 <= px < MSX_WIDTH and 0 <= py < MSX_HEIGHT:
-                    self.draw_pencil_pixel(px, py)
-                    pixels_to_update_y.add(py)
-
-        x = 0
-        y = radius
-        d = 3 - 2 * radius # Parâmetro de decisão inicial para o algoritmo de ponto médio
-
-        plot_circle_points(center_x, center_y, x, y)
-
-        while y >= x:
-            x += 1
-            if d > 0:
-                y -= 1
-                d = d + 4 * (x - y) + 10
-            else:
-                d = d + 4 * x + 6
-            plot_circle_points(center_x, center_y, x, y)
-
-        if fill:
-            # Preenchimento do círculo (simplesmente desenha linhas horizontais)
-            for y_line in range(center_y - radius, center_y + radius + 1):
-                if 0 <= y_line < MSX_HEIGHT:
-                    # Encontra os pontos mais à esquerda e à direita para esta linha
-                    x_start = -1
-                    x_end = -1
-                    for x_fill in range(MSX_WIDTH):
-                        if self.pixels[y_line][x_fill] == self.current_drawing_color: # Se for um pixel da borda do círculo
-                            if x_start == -1:
-                                x_start = x_fill
-                            x_end = x_fill
-                    
-                    if x_start != -1 and x_end != -1:
-                        for x_fill in range(x_start, x_end + 1):
-                            self.draw_pencil_pixel(x_fill, y_line)
-                            pixels_to_update_y.add(y_line)
-        
-        # Aplica a restrição de cor para todas as linhas afetadas
-        for y_affected in pixels_to_update_y:
-            self.apply_msx_color_constraint(y_affected, 0, MSX_WIDTH-1) # Aplica a toda a linha, mais seguro para círculos
-
-
-    def _preview_circle(self, x0, y0, x1, y1, fill: bool):
-        """Desenha um círculo de preview no canvas."""
-        center_x_msx = (x0 + x1) // 2
-        center_y_msx = (y0 + y1) // 2
-        
-        # O raio é a distância do centro a um dos pontos extremos
-        radius_msx = int(sqrt((x1 - x0)**2 + (y1 - y0)**2) / 2)
-        
-        # Coordenadas do canvas
-        center_x_c = center_x_msx * PIXEL_SCALE
-        center_y_c = center_y_msx * PIXEL_SCALE
-        radius_c = radius_msx * PIXEL_SCALE
-
-        x_start_c = center_x_c - radius_c
-        y_start_c = center_y_c - radius_c
-        x_end_c = center_x_c + radius_c + PIXEL_SCALE # + PIXEL_SCALE para incluir o último pixel MSX
-        y_end_c = center_y_c + radius_c + PIXEL_SCALE
-
-        fill_color = MSX_PALETTE[self.current_drawing_color] if fill else ""
-        outline_color = MSX_PALETTE[self.current_drawing_color]
-
-        self.canvas.create_oval(x_start_c, y_start_c, x_end_c, y_end_c,
-                                fill=fill_color,
-                                outline=outline_color,
-                                width=PIXEL_SCALE,
-                                tags="preview_shape")
-
-
-    def fill_area(self, start_x: int, start_y: int, fill_color_index: int):
+    def _preview_exact(self, x0: int, y0: int, x1: int, y1: int):
         """
-        Preenchimento de área (Flood Fill).
-        Este é um algoritmo recursivo (ou iterativo com pilha) para preencher uma área contígua.
+        Rasteriza a forma com as mesmas rotinas (e a mesma restrição de cor) numa cópia do
+        framebuffer e mostra apenas o retângulo alterado, ampliado, sobre a tela.
         """
-        if not (0 <= start_x < MSX_WIDTH and 0 <= start_y < MSX_HEIGHT):
+        preview = self._preview_surface
+        scratch = preview.pixels
+        if self._preview_region is not None: # Desfaz o preview anterior na cópia
+            rx0, ry0, rx1, ry1 = self._preview_region
+            scratch[ry0:ry1 + 1, rx0:rx1 + 1] = self.pixels[ry0:ry1 + 1, rx0:rx1 + 1]
+            self._preview_region = None
+
+        preview.drag_shape(self.current_tool, x0, y0, x1, y1, self.current_drawing_color)
+        preview.commit(self.current_drawing_color, self.constraint_mode)
+        region = preview.take_dirty_region()
+
+        if region is None:
+            self.canvas.itemconfigure(self.preview_image_id, state="hidden")
             return
+        rx0, ry0 = max(region[0], 0), max(region[1], 0)
+        rx1, ry1 = min(region[2], MSX_WIDTH - 1), min(region[3], MSX_HEIGHT - 1)
+        self._preview_region = (rx0, ry0, rx1, ry1)
+        width, height = rx1 - rx0 + 1, ry1 - ry0 + 1
+        self.preview_frame.configure(width=width, height=height)
+        self.preview_frame.put(photo_data(scratch[ry0:ry1 + 1, rx0:rx1 + 1]), to=(0, 0))
+        zoom = self.viewport.zoom
+        self.preview_view.configure(width=width * zoom, height=height * zoom)
+        self.preview_view.tk.call(self.preview_view, "copy", self.preview_frame, "-zoom", zoom)
+        self.canvas.coords(self.preview_image_id, rx0 * zoom, ry0 * zoom)
+        self.canvas.itemconfigure(self.preview_image_id, state="normal")
+
+    def hide_preview(self):
+        self._preview_end = None
+        for item in self._preview_items.values():
+            self.canvas.itemconfigure(item, state="hidden")
+        self.canvas.itemconfigure(self.preview_image_id, state="hidden")
+        self._preview_surface = None
+        self._preview_region = None
 
-        target_color_index = self.pixels[start_y][start_x]
-        if target_color_index == fill_color_index:
-            return # Já está preenchido com a cor alvo
+    def draw_pencil_pixel(self, msx_x: int, msx_y: int):
+        """Desenha um único pixel MSX na posição (a restrição de cor fica para commit_operation)."""
+        self.surface.point(msx_x, msx_y, self.current_drawing_color)
+        self.show_surface_changes()
 
-        stack = [(start_x, start_y)]
-        visited = set()
-        pixels_to_update_y = set() # Para aplicar a restrição de cor no final
 
-        while stack:
-            x, y = stack.pop()
+    def draw_line_pixels(self, x0: int, y0: int, x1: int, y1: int):
+        """Implementação do algoritmo de linha de Bresenham."""
+        self.surface.line(x0, y0, x1, y1, self.current_drawing_color)
+        self.commit_operation()
 
-            if not (0 <= x < MSX_WIDTH and 0 <= y < MSX_HEIGHT):
-                continue
-            if (x, y) in visited:
-                continue
-            visited.add((x, y))
+    def draw_rectangle_pixels(self, x0: int, y0: int, x1: int, y1: int, fill: bool):
+        """Desenha um retângulo (cheio ou vazio); as bordas fora da tela simplesmente não são desenhadas."""
+        self.surface.rectangle(x0, y0, x1, y1, fill, self.current_drawing_color)
+        self.commit_operation()
 
-            if self.pixels[y][x] == target_color_index:
-                self.pixels[y][x] = fill_color_index
-                self.draw_pixel_on_canvas(x, y, fill_color_index)
-                pixels_to_update_y.add(y)
+    def draw_circle_pixels(self, x0: int, y0: int, x1: int, y1: int, fill: bool):
+        """
+        Desenha um círculo (cheio ou vazio) usando o algoritmo de ponto médio; os dois
+        pontos são um diâmetro. O círculo cheio vai, em cada linha, de uma borda à outra.
+        """
+        self.surface.circle(*drag_circle(x0, y0, x1, y1), fill, self.current_drawing_color)
+        self.commit_operation()
 
-                # Adiciona vizinhos à pilha
-                stack.append((x + 1, y))
-                stack.append((x - 1, y))
-                stack.append((x, y + 1))
-                stack.append((x, y - 1))
-        
-        # Aplica a restrição de cor para todas as linhas afetadas
-        for y_affected in pixels_to_update_y:
-            self.apply_msx_color_constraint(y_affected, 0, MSX_WIDTH-1) # Aplica a toda a linha
+    def fill_area(self, start_x: int, start_y: int, fill_color_index: int, cell_mode: bool = False):
+        """
+        Preenchimento de área (Flood Fill) por segmentos horizontais.
+        Com cell_mode=True o preenchimento fica restrito à célula 8x8 do ponto inicial,
+        respeitando os limites de atributo do SCREEN 2.
+        A restrição de cor e o redesenho são feitos uma única vez para as linhas tocadas.
+        """
+        self.surface.fill(start_x, start_y, fill_color_index, cell_mode)
+        self.commit_operation()
 
 
     # --- Funções de Salvar/Carregar (Esqueletos) ---
+    def stamp_shape(self, shape, msx_x: int, msx_y: int, mode: str = "mascara"):
+        """
+        Carimba um shape (msx_shp.Shape) com o canto superior esquerdo em (msx_x, msx_y).
+        A composição é feita byte a byte sobre padrões e cores, e o resultado já obedece
+        à restrição de duas cores; a cor principal é a frente e a secundária o papel.
+        """
+        region = self.surface.stamp(shape, msx_x, msx_y, mode, self.primary_color_index, self.secondary_color_index)
+        self.show_surface_changes()
+        return region
+
+    def draw_text(self, text: str, msx_x: int, msx_y: int, style: str = None, mode: str = None):
+        """
+        Escreve um texto (uma linha de tela por linha do texto) com o alfabeto carregado, copiando os
+        bytes dos caracteres direto para a tabela de padrões em um único carimbo.
+        """
+        font = getattr(self.app_instance, "current_font", None)
+        if font is None:
+            return None
+        region = self.surface.text(font, text, msx_x, msx_y, style or self.text_style, mode or self.stamp_mode,
+                                   self.primary_color_index, self.secondary_color_index)
+        self.show_surface_changes()
+        return region
+
+    def to_vram(self) -> Screen2VRAM:
+        """
+        Codifica a tela atual nas tabelas de padrões e cores do SCREEN 2.
+        Se a tela veio de um arquivo, devolve as tabelas desse documento atualizadas
+        apenas nos blocos alterados, preservando os bytes originais dos demais.
+        """
+        return self.surface.to_vram(self.scr_document)
+
+    def export_vram(self, filename: str):
+        """Grava as tabelas de padrões e cores (12 KB, mesmo layout da VRAM) em um arquivo binário."""
+        vram = self.to_vram()
+        with open(filename, "wb") as f:
+            f.write(vram.buffer)
+        print(f"VRAM exportada: {filename} ({len(vram.buffer)} bytes)")
+
     def save_screen_data(self, filename: str):
         """
         Salva os dados da tela MSX.
-        Este é um placeholder. A implementação real dependerá do formato
-        que você deseja usar (e.g., binário, array de bytes para BASIC/Assembly).
-        Você precisará extrair o Pattern Table, Color Table e Name Table.
+        Arquivos .SCR e .GRP são gravados no formato do Graphos III / BASIC, mantendo o
+        cabeçalho e os bytes extras da tela carregada (ou os padrões, em telas novas).
+        Arquivos .LAY guardam apenas a tabela de padrões (layout monocromático).
+        Outras extensões exportam uma imagem indexada para visualização (sem extensão: BMP).
         """
         print(f"Salvando dados da tela MSX em {filename}...")
-        # Lógica para converter self.pixels em Pattern Table, Color Table, Name Table
-        # Exemplo simples: salvar como uma imagem BMP para visualização rápida (não nativo MSX)
+        root, ext = os.path.splitext(filename)
+        if ext.lower() in SCREEN_EXTENSIONS:
+            document = save_screen_document(filename, self.to_vram(), self.scr_document)
+            if document is not None:
+                self.scr_document = document
+            print(f"Tela SCREEN 2 salva: {filename}")
+            return
+
         from PIL import Image
-        img = Image.new('P', (MSX_WIDTH, MSX_HEIGHT))
-        img.putpalette([int(c[i:i+2], 16) for color_hex in MSX_PALETTE.values() for i in (1,3,5)]) # RGB bytes
-        
-        for y in range(MSX_HEIGHT):
-            for x in range(MSX_WIDTH):
-                img.putpixel((x, y), self.pixels[y][x])
-        
-        img.save(f"{filename}.bmp")
-        print(f"Imagem BMP salva: {filename}.bmp (para visualização, não é formato MSX nativo)")
+        img = Image.fromarray(self.pixels)
+        img.putpalette(MSX_PALETTE_RGB.tobytes()) # Converte para imagem indexada com a paleta MSX
+        if not ext:
+            filename = f"{filename}.bmp"
+        img.save(filename)
+        print(f"Imagem salva: {filename} (para visualização, não é formato MSX nativo)")
 
 
     def load_screen_data(self, filename: str):
-        """Carrega dados da tela MSX."""
+        """
+        Carrega uma tela .SCR, .GRP (ou um layout .LAY) direto para o framebuffer e redesenha.
+        """
         print(f"Carregando dados da tela MSX de {filename}...")
-        # TODO: Implementar lógica para carregar dados de um arquivo MSX
-        # e preencher self.pixels.
+        self.show_document(load_screen_document(filename))
+
+    def show_document(self, document):
+        """Passa a editar um documento de tela (qualquer objeto com as tabelas em .vram)."""
+        self.surface.load_vram(document.vram)
+        self.surface.take_dirty_region() # draw_all_pixels redesenha tudo
+        self.history.reset(self.pixels)
+        self.scr_document = document
+        self.draw_all_pixels()
 
 # Exemplo de como integrar ao seu App principal:
 # No seu arquivo principal (App.py):
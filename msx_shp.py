@@ -0,0 +1,202 @@
+"""
+Leitura de bancos de shapes .SHP do Graphos III com acesso direto a cada shape.
+
+Formato (ver readers/g3viewer.doc e readers/msxshpvw.pas): uma sequência de até
+254 blocos terminada por FF. Cada bloco começa com o número do shape, o tipo, a
+largura em pixels (múltiplo de 8) e a altura em caracteres 8x8, seguidos dos
+planos de imagem, cada um uma cópia de VRAM de largura*altura bytes:
+
+    tipo 1: padrão                    (monocromático)
+    tipo 2: padrão, cores             (colorido)
+    tipo 3: máscara, padrão           (monocromático com máscara)
+    tipo 4: máscara, padrão, cores    (colorido com máscara)
+
+O arquivo é mapeado em memória e um índice com a posição de cada bloco é montado
+em uma única passada que lê apenas os cabeçalhos. Um shape só é decodificado
+quando pedido, e os shapes decodificados de todos os bancos abertos dividem um
+único cache LRU limitado em bytes.
+"""
+import itertools
+import mmap
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from msx_screen2 import MSX_PALETTE_RGB
+
+SHP_END = 0xFF
+SHP_BLOCK_HEADER = 4
+MAX_SHAPES = 254
+SHAPE_PLANES = {
+    1: ("pattern",),
+    2: ("pattern", "color"),
+    3: ("mask", "pattern"),
+    4: ("mask", "pattern", "color"),
+}
+SHAPE_CACHE_BYTES = 4 * 1024 * 1024
+
+ShapeEntry = namedtuple("ShapeEntry", "number shape_type width height_chars offset")
+
+
+class Shape:
+    """
+    Um shape decodificado. Os planos são arrays uint8 (altura, largura // 8), uma
+    linha de pixels por linha do array e 8 pixels por byte, prontos para operações
+    de bits sobre a tabela de padrões. color e mask são None quando o tipo não os tem.
+    """
+
+    __slots__ = ("number", "shape_type", "width", "height", "pattern", "color", "mask")
+
+    def __init__(self, number: int, shape_type: int, pattern: np.ndarray, color: np.ndarray = None,
+                 mask: np.ndarray = None):
+        self.number = number
+        self.shape_type = shape_type
+        self.pattern = pattern
+        self.color = color
+        self.mask = mask
+        self.height, bytes_per_row = pattern.shape
+        self.width = bytes_per_row * 8
+
+    @property
+    def nbytes(self) -> int:
+        return sum(plane.nbytes for plane in (self.pattern, self.color, self.mask) if plane is not None)
+
+    def to_pixels(self, foreground: int = 15, background: int = 0) -> np.ndarray:
+        """Pixels indexados (altura, largura) para visualização; tipos sem cor usam as cores dadas."""
+        bits = np.unpackbits(self.pattern, axis=1).astype(bool)
+        if self.color is None:
+            return np.where(bits, np.uint8(foreground), np.uint8(background))
+        colors = np.repeat(self.color, 8, axis=1)
+        return np.where(bits, colors >> 4, colors & 0x0F).astype(np.uint8)
+
+    def to_rgb(self, foreground: int = 15, background: int = 0) -> np.ndarray:
+        return MSX_PALETTE_RGB[self.to_pixels(foreground, background)]
+
+
+class ShapeCache:
+    """Cache LRU de shapes decodificados, limitado pelo total de bytes dos planos."""
+
+    def __init__(self, max_bytes: int = SHAPE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            shape = self._items.get(key)
+            if shape is not None:
+                self._items.move_to_end(key)
+            return shape
+
+    def put(self, key, shape: Shape):
+        with self._lock:
+            if key in self._items:
+                return
+            self._items[key] = shape
+            self.nbytes += shape.nbytes
+            while self.nbytes > self.max_bytes and len(self._items) > 1:
+                _, old = self._items.popitem(last=False)
+                self.nbytes -= old.nbytes
+
+    def discard_library(self, library_key: int):
+        with self._lock:
+            for key in [k for k in self._items if k[0] == library_key]:
+                self.nbytes -= self._items.pop(key).nbytes
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
+
+
+# Um único cache para todos os bancos: a memória não cresce com o número de arquivos abertos
+shape_cache = ShapeCache()
+_library_keys = itertools.count()
+
+
+def index_shapes(data) -> tuple:
+    """
+    Monta o índice de um banco de shapes lendo apenas os cabeçalhos dos blocos.
+    Devolve (entradas, completo); completo é falso se a cadeia estiver truncada ou corrompida.
+    """
+    entries = []
+    size = len(data)
+    pos = 0
+    while pos < size and len(entries) < MAX_SHAPES:
+        number = data[pos]
+        if number == SHP_END:
+            return entries, True
+        if pos + SHP_BLOCK_HEADER > size:
+            return entries, False
+        shape_type, width, height_chars = data[pos + 1], data[pos + 2], data[pos + 3]
+        planes = SHAPE_PLANES.get(shape_type)
+        if planes is None or width % 8:
+            return entries, False
+        data_size = width * height_chars * len(planes)
+        if pos + SHP_BLOCK_HEADER + data_size > size:
+            return entries, False
+        entries.append(ShapeEntry(number, shape_type, width, height_chars, pos + SHP_BLOCK_HEADER))
+        pos += SHP_BLOCK_HEADER + data_size
+    return entries, True
+
+
+def decode_plane(data, offset: int, width: int, height_chars: int) -> np.ndarray:
+    """
+    Converte um plano guardado caractere a caractere (como na VRAM) em linhas de pixels.
+    O caractere (X, Y) ocupa os bytes (X + Y * colunas) * 8 até + 7, como em msxshpvw.pas.
+    """
+    columns = width // 8
+    raw = np.frombuffer(data, dtype=np.uint8, count=columns * height_chars * 8, offset=offset)
+    return raw.reshape(height_chars, columns, 8).transpose(0, 2, 1).reshape(height_chars * 8, columns).copy()
+
+
+class ShapeLibrary:
+    """Banco de shapes .SHP mapeado em memória, com decodificação sob demanda."""
+
+    def __init__(self, filename: str, cache: ShapeCache = None):
+        self.filename = filename
+        self.cache = cache if cache is not None else shape_cache
+        self._key = next(_library_keys)
+        self._file = open(filename, "rb")
+        try:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._data = b"" # Arquivo vazio não pode ser mapeado
+        self.entries, self.complete = index_shapes(self._data)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __getitem__(self, index: int) -> Shape:
+        entry = self.entries[index]
+        key = (self._key, index)
+        shape = self.cache.get(key)
+        if shape is None:
+            shape = self._decode(entry)
+            self.cache.put(key, shape)
+        return shape
+
+    def __iter__(self):
+        for index in range(len(self.entries)):
+            yield self[index]
+
+    def _decode(self, entry: ShapeEntry) -> Shape:
+        plane_size = entry.width * entry.height_chars
+        planes = {}
+        for i, name in enumerate(SHAPE_PLANES[entry.shape_type]):
+            planes[name] = decode_plane(self._data, entry.offset + i * plane_size, entry.width, entry.height_chars)
+        return Shape(entry.number, entry.shape_type, planes["pattern"], planes.get("color"), planes.get("mask"))
+
+    def close(self):
+        self.cache.discard_library(self._key)
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
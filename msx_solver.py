@@ -0,0 +1,115 @@
+"""
+Escolha ótima do par de cores de cada bloco 8x1 do SCREEN 2, sem interface gráfica.
+
+Para cada bloco, dentre os 120 pares de cores distintas da paleta MSX, escolhe o
+que minimiza a soma do erro perceptivo entre a cor pretendida de cada pixel e a
+mais próxima das duas cores do par. O erro é a distância "redmean" (RGB com
+pesos que dependem do vermelho médio), uma aproximação barata da diferença
+percebida.
+
+Tudo é vetorizado: a distância de cada pixel a cada uma das 16 cores é calculada
+uma vez, e o erro dos 120 pares para todos os blocos sai de um único mínimo
+elemento a elemento seguido de uma soma. Uma tela inteira (6144 blocos) é
+resolvida em cerca de um décimo de segundo.
+
+best_pairs(mixing=True) escolhe os pares para imagens que ainda serão pontilhadas
+(msx_import): conta a distância de cada cor à mistura mais próxima das duas.
+"""
+from itertools import combinations
+
+import numpy as np
+
+from msx_screen2 import MSX_PALETTE_RGB, MSX_HEIGHT, BLOCKS_PER_ROW, BLOCK_WIDTH, rank_block_colors
+
+CONSTRAINT_MODES = ("simples", "otima")  # simples: msx_screen2.apply_color_constraint
+
+COLOR_PAIRS = np.array(list(combinations(range(16), 2)), dtype=np.uint8)  # (120, 2)
+PAIR_START = MSX_PALETTE_RGB[COLOR_PAIRS[:, 0]].astype(np.float32)  # (120, 3)
+PAIR_DELTA = MSX_PALETTE_RGB[COLOR_PAIRS[:, 1]].astype(np.float32) - PAIR_START
+PAIR_LENGTH2 = np.maximum((PAIR_DELTA * PAIR_DELTA).sum(axis=1), 1.0)  # Cores 0 e 1 são iguais
+SOLVER_CHUNK_BLOCKS = 2048  # Blocos por passada; limita a memória intermediária (~8 MB)
+
+
+def color_distances(rgb: np.ndarray, palette: np.ndarray = MSX_PALETTE_RGB) -> np.ndarray:
+    """
+    Erro redmean (ao quadrado) de cada cor RGB (..., 3) para as 16 cores da paleta: (..., 16).
+    Com outra palette (..., k, 3), que se alinha a rgb, a distância a cada uma das k cores.
+    """
+    rgb = rgb.astype(np.float32)[..., None, :]
+    palette = palette.astype(np.float32)
+    delta = rgb - palette
+    red_mean = (rgb[..., 0] + palette[..., 0]) / 2
+    return ((2 + red_mean / 256) * delta[..., 0] ** 2 + 4 * delta[..., 1] ** 2
+            + (2 + (255 - red_mean) / 256) * delta[..., 2] ** 2)
+
+
+def pair_errors(rgb_blocks: np.ndarray, mixing: bool = False) -> np.ndarray:
+    """
+    Erro de cada um dos 120 pares para cada bloco RGB (m, 8, 3): (m, 120).
+    Sem mixing, cada pixel conta a distância redmean à mais próxima das duas cores;
+    com mixing (para pontilhado), a distância euclidiana ao segmento entre elas no
+    espaço RGB, já que o pontilhado pode produzir qualquer mistura das duas. As
+    projeções no segmento saem de dois produtos de matrizes.
+    """
+    if not mixing:
+        distances = color_distances(rgb_blocks)  # (m, 8, 16)
+        return np.minimum(distances[:, :, COLOR_PAIRS[:, 0]], distances[:, :, COLOR_PAIRS[:, 1]]).sum(axis=1)
+    rgb = rgb_blocks.reshape(-1, 3).astype(np.float32)
+    offset2 = (rgb * rgb).sum(axis=1)[:, None] - 2 * (rgb @ PAIR_START.T) + (PAIR_START * PAIR_START).sum(axis=1)
+    along = rgb @ PAIR_DELTA.T - (PAIR_START * PAIR_DELTA).sum(axis=1)  # (p - a)·d
+    t = np.clip(along / PAIR_LENGTH2, 0.0, 1.0)
+    residual = offset2 - t * (2 * along - t * PAIR_LENGTH2)  # |p - a - t·d|²
+    return residual.reshape(rgb_blocks.shape[0], BLOCK_WIDTH, -1).sum(axis=1)
+
+
+def best_pairs(rgb_blocks: np.ndarray, mixing: bool = False):
+    """Blocos RGB (n, 8, 3) -> (par de cores (n, 2) uint8, erro (n,)) de menor erro (ver pair_errors)."""
+    n = rgb_blocks.shape[0]
+    pairs = np.empty((n, 2), dtype=np.uint8)
+    errors = np.empty(n, dtype=np.float32)
+    for start in range(0, n, SOLVER_CHUNK_BLOCKS):
+        chunk = slice(start, min(start + SOLVER_CHUNK_BLOCKS, n))
+        scores = pair_errors(rgb_blocks[chunk], mixing)
+        best = scores.argmin(axis=1)
+        pairs[chunk] = COLOR_PAIRS[best]
+        errors[chunk] = scores[np.arange(best.size), best]
+    return pairs, errors
+
+
+def solve_blocks(rgb_blocks: np.ndarray):
+    """
+    Blocos RGB (n, 8, 3) -> (índices (n, 8) uint8, erro (n,)). Cada bloco usa no máximo
+    as duas cores do par de menor erro, e cada pixel a mais próxima das duas.
+    """
+    pairs, errors = best_pairs(rgb_blocks)
+    # Cada pixel fica com a mais próxima das duas cores do par do seu bloco
+    distances = color_distances(rgb_blocks, MSX_PALETTE_RGB[pairs][:, None])  # (n, 8, 2)
+    return np.take_along_axis(pairs, distances.argmin(axis=2), axis=1), errors
+
+
+def solve_screen(rgb: np.ndarray) -> np.ndarray:
+    """Imagem RGB (MSX_HEIGHT, MSX_WIDTH, 3) -> pixels indexados que obedecem à regra de duas cores."""
+    blocks = rgb.reshape(-1, BLOCK_WIDTH, 3)
+    indices, _ = solve_blocks(blocks)
+    return indices.reshape(rgb.shape[:2])
+
+
+def apply_optimal_constraint(pixels: np.ndarray, dirty: np.ndarray) -> int:
+    """
+    Como msx_screen2.apply_color_constraint, mas cada bloco marcado com mais de duas cores
+    é refeito com o par de cores de menor erro em relação às cores que os pixels têm agora.
+    Devolve quantos pixels mudaram.
+    """
+    ys, bs = np.nonzero(dirty)
+    if ys.size == 0:
+        return 0
+    block_view = pixels.reshape(MSX_HEIGHT, BLOCKS_PER_ROW, BLOCK_WIDTH)
+    blocks = block_view[ys, bs]
+    _, _, distinct = rank_block_colors(blocks)
+    over = distinct > 2
+    if not over.any():
+        return 0
+    solved, _ = solve_blocks(MSX_PALETTE_RGB[blocks[over]])
+    changed = int(np.count_nonzero(solved != blocks[over]))
+    block_view[ys[over], bs[over]] = solved
+    return changed
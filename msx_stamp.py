@@ -0,0 +1,133 @@
+"""
+Carimbo de shapes e caracteres na tela SCREEN 2 com operações de bits sobre a tabela de padrões.
+
+A região da tela coberta pelo shape é convertida para bytes de padrão e de cor
+(um byte por bloco 8x1), combinada com os planos do shape por AND/OR/XOR em
+arrays inteiros e convertida de volta para pixels. Como cada bloco continua
+tendo um byte de padrão e um de cor, o resultado já respeita a restrição de
+duas cores e não precisa passar por apply_color_constraint.
+
+Semântica das operações (manual do Graphos III, menu SHAPE):
+    máscara (tipos 3 e 4): pixels sob bits 1 da máscara são mantidos, sob bits 0
+        são apagados, e então o padrão do shape é somado (OR). O tipo 3 mantém
+        os atributos da tela e o tipo 4 copia as cores do shape.
+    tipo 1: MASCARA (sobrepõe, apagando o que está por baixo), AND (interseção),
+        OR (união) e XOR (exclusão); os atributos da tela não mudam.
+    tipo 2: sobrepõe padrão e cores.
+"""
+import numpy as np
+
+from msx_screen2 import MSX_HEIGHT, BLOCK_WIDTH, BLOCKS_PER_ROW
+from msx_vram import encode_blocks, decode_blocks
+
+STAMP_MODES = ("mascara", "and", "or", "xor")
+
+
+def shift_plane(plane: np.ndarray, shift: int) -> np.ndarray:
+    """
+    Desloca um plano de bits (linhas, bytes) shift pixels para a direita (0 a 7).
+    Com shift > 0 o resultado ganha uma coluna de bytes, que recebe os bits que transbordam.
+    """
+    if shift == 0:
+        return plane
+    rows, columns = plane.shape
+    out = np.zeros((rows, columns + 1), dtype=np.uint8)
+    out[:, :columns] = plane >> shift
+    out[:, 1:] |= (plane << (BLOCK_WIDTH - shift)).astype(np.uint8)
+    return out
+
+
+def shift_colors(colors: np.ndarray, shift: int) -> np.ndarray:
+    """
+    Desloca um plano de cores como shift_plane. Cada byte da tela recebe a cor do
+    byte do shape que cobre a maior parte dos seus pixels.
+    """
+    if shift == 0:
+        return colors
+    rows, columns = colors.shape
+    out = np.empty((rows, columns + 1), dtype=np.uint8)
+    if shift <= BLOCK_WIDTH // 2:
+        out[:, :columns] = colors
+        out[:, columns] = colors[:, -1]
+    else:
+        out[:, 1:] = colors
+        out[:, 0] = colors[:, 0]
+    return out
+
+
+def orient_blocks(patterns: np.ndarray, colors: np.ndarray, ink: int, paper: int):
+    """
+    Escolhe frente e fundo de cada bloco para que as operações de bits tenham o sentido
+    que o usuário espera: a cor de papel é sempre o fundo (bit 0). Blocos de uma só cor
+    viram papel com frente ink, ou frente cheia sobre o papel.
+    """
+    foreground, background = colors >> 4, colors & 0x0F
+    single = foreground == background
+
+    # Papel como frente: inverte os bits e troca as cores
+    swap = ~single & (foreground == paper)
+    patterns = np.where(swap, ~patterns, patterns)
+    foreground, background = np.where(swap, background, foreground), np.where(swap, foreground, background)
+
+    # Uma cor só: papel vazio ou frente cheia sobre o papel
+    blank = single & (background == paper)
+    solid = single & ~blank
+    patterns = np.where(solid, 0xFF, patterns).astype(np.uint8)
+    foreground = np.where(blank, ink, foreground)
+    background = np.where(solid, paper, background)
+    return patterns, ((foreground << 4) | background).astype(np.uint8)
+
+
+def stamp_planes(pixels: np.ndarray, x: int, y: int, pattern: np.ndarray, color: np.ndarray = None,
+                 mask: np.ndarray = None, mode: str = "mascara", ink: int = 15, paper: int = 0):
+    """
+    Carimba planos de bits (linhas, bytes) no framebuffer com o canto superior esquerdo em (x, y).
+
+    Com x múltiplo de 8 os planos são usados diretamente; nos demais casos eles são
+    deslocados em bloco (shift_plane). Partes fora da tela são recortadas.
+    Devolve o retângulo alterado (x_min, y_min, x_max, y_max) ou None.
+    """
+    if mode not in STAMP_MODES:
+        raise ValueError(f"Modo de carimbo desconhecido: {mode}")
+    block_x, shift = divmod(x, BLOCK_WIDTH)
+    cover = shift_plane(np.full(pattern.shape, 0xFF, dtype=np.uint8), shift)
+    pattern = shift_plane(pattern, shift)
+    if mask is not None:
+        mask = ~shift_plane(~mask, shift) # Fora do shape a máscara mantém a tela
+    if color is not None:
+        color = shift_colors(color, shift)
+
+    # Recorte na tela, em linhas e em blocos de 8 pixels
+    height, columns = pattern.shape
+    r0, r1 = max(y, 0), min(y + height, MSX_HEIGHT)
+    c0, c1 = max(block_x, 0), min(block_x + columns, BLOCKS_PER_ROW)
+    if r0 >= r1 or c0 >= c1:
+        return None
+    clip = (slice(r0 - y, r1 - y), slice(c0 - block_x, c1 - block_x))
+    pattern, cover = pattern[clip], cover[clip]
+
+    region = pixels[r0:r1, c0 * BLOCK_WIDTH:c1 * BLOCK_WIDTH]
+    shape = (r1 - r0, c1 - c0)
+    screen, attributes = encode_blocks(region.reshape(-1, BLOCK_WIDTH))
+    screen, attributes = orient_blocks(screen.reshape(shape), attributes.reshape(shape), ink, paper)
+
+    if mask is not None:
+        screen = (screen & mask[clip]) | pattern
+    elif mode == "mascara" or color is not None:
+        screen = (screen & ~cover) | pattern
+    elif mode == "and":
+        screen = screen & (pattern | ~cover)
+    elif mode == "or":
+        screen = screen | pattern
+    else:
+        screen = screen ^ pattern
+    if color is not None:
+        attributes = np.where(cover != 0, color[clip], attributes)
+
+    region[:] = decode_blocks(screen.astype(np.uint8), attributes).reshape(region.shape)
+    return c0 * BLOCK_WIDTH, r0, c1 * BLOCK_WIDTH - 1, r1 - 1
+
+
+def stamp_shape(pixels: np.ndarray, shape, x: int, y: int, mode: str = "mascara", ink: int = 15, paper: int = 0):
+    """Carimba um msx_shp.Shape; shapes com máscara ignoram mode."""
+    return stamp_planes(pixels, x, y, shape.pattern, shape.color, shape.mask, mode, ink, paper)
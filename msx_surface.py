@@ -0,0 +1,255 @@
+"""
+Superfície de desenho SCREEN 2: o framebuffer com as primitivas do editor, sem interface gráfica.
+
+Screen2Surface junta o que o editor e os scripts fazem sobre uma tela: as
+primitivas em trechos (msx_raster), o preenchimento, os carimbos de shapes e de
+texto, a restrição de duas cores adiada (blocos 8x1 marcados e resolvidos de uma
+vez em commit) e o retângulo alterado ainda não mostrado. A interface só lê
+take_dirty_region() e redesenha; photo_data, rgb_pixels e png_bytes convertem
+pixels para o Tk, para RGB e para PNG indexado.
+
+Cada superfície tem um RLock próprio e todos os métodos que leem ou alteram o
+framebuffer o seguram, então várias threads podem desenhar na mesma superfície
+ou ler snapshot() dela. Superfícies diferentes não dividem nada além do cache de
+shapes (msx_shp.shape_cache, que tem trava própria), então renderizações
+independentes podem rodar em paralelo; as operações grandes do NumPy liberam o GIL.
+"""
+import functools
+import io
+import threading
+from math import sqrt
+
+import numpy as np
+
+from msx_screen2 import (MSX_PALETTE, MSX_PALETTE_RGB, MSX_WIDTH, MSX_HEIGHT, BLOCK_WIDTH, new_framebuffer,
+                         new_block_mask, mark_block_span, apply_color_constraint, cell_bounds, flood_fill)
+from msx_raster import (Spans, make_spans, spans_bbox, clip_spans, fill_spans, mark_span_blocks, clip_points,
+                        line_points, rect_spans, rect_outline_spans, circle_points, circle_spans, ellipse_spans,
+                        ellipse_outline_spans, polygon_spans, polygon_outline_points)
+from msx_stamp import stamp_shape, stamp_planes
+from msx_solver import apply_optimal_constraint
+from msx_vram import Screen2VRAM
+
+DRAG_TOOLS = ("line", "rect_empty", "rect_fill", "circle_empty", "circle_fill")
+
+# Cores indexadas por posição, para montar rapidamente os dados de imagem do Tk
+PALETTE_HEX = [MSX_PALETTE[i] for i in range(16)]
+# Paleta MSX para PNGs indexados (768 bytes, o restante em preto)
+PNG_PALETTE = MSX_PALETTE_RGB.tobytes() + bytes(768 - MSX_PALETTE_RGB.nbytes)
+
+
+def photo_data(pixels: np.ndarray) -> str:
+    """Dados de PhotoImage.put para um retângulo de índices de cor: uma lista de linhas de cores."""
+    return " ".join(["{" + " ".join([PALETTE_HEX[c] for c in row]) + "}" for row in pixels.tolist()])
+
+
+def rgb_pixels(pixels: np.ndarray) -> np.ndarray:
+    """Índices de cor (altura, largura) -> RGB (altura, largura, 3) uint8."""
+    return MSX_PALETTE_RGB[pixels]
+
+
+def indexed_image(pixels: np.ndarray, scale: int = 1):
+    """Imagem "P" do PIL com a paleta MSX, ampliada scale vezes sem interpolação."""
+    from PIL import Image
+    image = Image.fromarray(pixels)
+    image.putpalette(PNG_PALETTE)
+    if scale > 1:
+        image = image.resize((image.width * scale, image.height * scale), Image.NEAREST)
+    return image
+
+
+def png_bytes(pixels: np.ndarray, scale: int = 1) -> bytes:
+    output = io.BytesIO()
+    indexed_image(pixels, scale).save(output, format="PNG")
+    return output.getvalue()
+
+
+def drag_circle(x0: int, y0: int, x1: int, y1: int):
+    """Centro e raio do círculo arrastado de (x0, y0) a (x1, y1): os dois pontos são um diâmetro."""
+    radius = int(sqrt((x1 - x0) ** 2 + (y1 - y0) ** 2) / 2)  # Distância do centro ao ponto mais distante
+    return (x0 + x1) // 2, (y0 + y1) // 2, radius
+
+
+def locked(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class Screen2Surface:
+    def __init__(self, pixels: np.ndarray = None, background: int = 0):
+        self.pixels = pixels if pixels is not None else new_framebuffer(background)
+        self.constraint_blocks = new_block_mask()  # Blocos 8x1 alterados, ainda sem a restrição de cor
+        self.dirty_region = None  # (x_min, y_min, x_max, y_max) alterado e ainda não mostrado
+        self.lock = threading.RLock()
+
+    # --- Região alterada ---
+    def touch(self, x_min: int, y_min: int, x_max: int, y_max: int):
+        if self.dirty_region is None:
+            self.dirty_region = (x_min, y_min, x_max, y_max)
+        else:
+            dx0, dy0, dx1, dy1 = self.dirty_region
+            self.dirty_region = (min(dx0, x_min), min(dy0, y_min), max(dx1, x_max), max(dy1, y_max))
+
+    @locked
+    def take_dirty_region(self):
+        """Devolve e esquece o retângulo alterado desde a última chamada (ou None)."""
+        region, self.dirty_region = self.dirty_region, None
+        return region
+
+    @locked
+    def snapshot(self) -> np.ndarray:
+        return self.pixels.copy()
+
+    # --- Primitivas (a restrição de cor fica para commit) ---
+    @locked
+    def paint_spans(self, spans: Spans, color: int):
+        """Pinta trechos horizontais (msx_raster) em uma única escrita e marca os blocos 8x1 tocados."""
+        spans = clip_spans(spans)
+        region = fill_spans(self.pixels, spans, color)
+        if region is not None:
+            mark_span_blocks(self.constraint_blocks, spans)
+            self.touch(*region)
+
+    @locked
+    def paint_points(self, xs: np.ndarray, ys: np.ndarray, color: int):
+        """Pinta pontos soltos (linhas, bordas de círculo) por índice."""
+        xs, ys = clip_points(xs, ys)
+        if xs.size:
+            self.pixels[ys, xs] = color
+            self.constraint_blocks[ys, xs // BLOCK_WIDTH] = True
+            self.touch(int(xs.min()), int(ys.min()), int(xs.max()), int(ys.max()))
+
+    @locked
+    def point(self, x: int, y: int, color: int):
+        if 0 <= x < MSX_WIDTH and 0 <= y < MSX_HEIGHT:
+            self.pixels[y, x] = color
+            mark_block_span(self.constraint_blocks, y, x, x)
+            self.touch(x, y, x, y)
+
+    def line(self, x0: int, y0: int, x1: int, y1: int, color: int):
+        """Linha de Bresenham."""
+        self.paint_points(*line_points(x0, y0, x1, y1), color)
+
+    def rectangle(self, x0: int, y0: int, x1: int, y1: int, fill: bool, color: int):
+        """Retângulo cheio ou vazio; as bordas fora da tela simplesmente não são desenhadas."""
+        self.paint_spans(rect_spans(x0, y0, x1, y1) if fill else rect_outline_spans(x0, y0, x1, y1), color)
+
+    def circle(self, cx: int, cy: int, radius: int, fill: bool, color: int):
+        """
+        Círculo pelo algoritmo de ponto médio. O cheio vai, em cada linha, de uma borda
+        à outra, sem olhar os pixels da tela.
+        """
+        # Com o raio maior que a distância (em x mais y) até o canto mais longe da tela, a borda
+        # fica toda fora e o círculo cheio cobre a tela inteira (o ponto médio erra menos de 1 pixel)
+        far = max(abs(cx), abs(cx - MSX_WIDTH + 1)) + max(abs(cy), abs(cy - MSX_HEIGHT + 1)) + 2
+        if radius > far:
+            if fill:
+                self.paint_spans(rect_spans(0, 0, MSX_WIDTH - 1, MSX_HEIGHT - 1), color)
+            return
+        if fill:
+            self.paint_spans(circle_spans(cx, cy, radius), color)
+        else:
+            self.paint_points(*circle_points(cx, cy, radius), color)
+
+    def ellipse(self, cx: int, cy: int, rx: int, ry: int, fill: bool, color: int):
+        """Elipse de semieixos rx e ry, cheia ou só a borda."""
+        self.paint_spans(ellipse_spans(cx, cy, rx, ry) if fill else ellipse_outline_spans(cx, cy, rx, ry), color)
+
+    def polygon(self, points, fill: bool, color: int):
+        """Polígono fechado pelos vértices (x, y): cheio pela regra par-ímpar ou só as arestas."""
+        if fill:
+            self.paint_spans(polygon_spans(points), color)
+        else:
+            self.paint_points(*polygon_outline_points(points), color)
+
+    def drag_shape(self, tool: str, x0: int, y0: int, x1: int, y1: int, color: int):
+        """A forma de uma ferramenta de arrasto (DRAG_TOOLS) entre os dois pontos."""
+        if tool == "line":
+            self.line(x0, y0, x1, y1, color)
+        elif tool in ("rect_empty", "rect_fill"):
+            self.rectangle(x0, y0, x1, y1, tool == "rect_fill", color)
+        elif tool in ("circle_empty", "circle_fill"):
+            self.circle(*drag_circle(x0, y0, x1, y1), tool == "circle_fill", color)
+
+    @locked
+    def fill(self, x: int, y: int, color: int, cell_mode: bool = False):
+        """
+        Preenchimento de área por segmentos horizontais. Com cell_mode=True fica restrito
+        à célula 8x8 do ponto inicial, respeitando os limites de atributo do SCREEN 2.
+        """
+        if not (0 <= x < MSX_WIDTH and 0 <= y < MSX_HEIGHT):
+            return
+        touched_rows = flood_fill(self.pixels, x, y, color, cell_bounds(x, y) if cell_mode else None)
+        if touched_rows:
+            ys = list(touched_rows)
+            spans = make_spans(ys, [touched_rows[y][0] for y in ys], [touched_rows[y][1] for y in ys])
+            mark_span_blocks(self.constraint_blocks, spans)
+            self.touch(*spans_bbox(spans))
+
+    @locked
+    def stamp(self, shape, x: int, y: int, mode: str, ink: int, paper: int):
+        """Carimba um msx_shp.Shape; o resultado já obedece à restrição de duas cores."""
+        region = stamp_shape(self.pixels, shape, x, y, mode, ink=ink, paper=paper)
+        if region is not None:
+            self.touch(*region)
+        return region
+
+    @locked
+    def text(self, font, text: str, x: int, y: int, style: str, mode: str, ink: int, paper: int):
+        """Escreve um texto com um msx_alf.AlfFont, copiando os bytes dos caracteres num único carimbo."""
+        if not text:
+            return None
+        region = stamp_planes(self.pixels, x, y, font.text_plane(text, style), mode=mode, ink=ink, paper=paper)
+        if region is not None:
+            self.touch(*region)
+        return region
+
+    @locked
+    def clear(self, color: int):
+        self.pixels[:] = color
+        self.constraint_blocks[:] = False
+        self.touch(0, 0, MSX_WIDTH - 1, MSX_HEIGHT - 1)
+
+    @locked
+    def load_vram(self, vram: Screen2VRAM):
+        vram.to_pixels(out=self.pixels)
+        self.constraint_blocks[:] = False
+        self.touch(0, 0, MSX_WIDTH - 1, MSX_HEIGHT - 1)
+
+    # --- Restrição de cor ---
+    @locked
+    def commit(self, replacement: int, mode: str = "simples") -> int:
+        """
+        Aplica a restrição de cor a todos os blocos 8x1 marcados em uma única passada vetorizada.
+        No modo "simples" as cores excedentes são trocadas por replacement; no modo "otima"
+        cada bloco excedente recebe o par de cores de menor erro (msx_solver).
+        Devolve quantos pixels mudaram.
+        """
+        dirty = self.constraint_blocks
+        if not dirty.any():
+            return 0
+        if mode == "otima":
+            replaced = apply_optimal_constraint(self.pixels, dirty)
+        else:
+            replaced = apply_color_constraint(self.pixels, dirty, replacement)
+        if replaced:
+            rows = np.flatnonzero(dirty.any(axis=1))
+            cols = np.flatnonzero(dirty.any(axis=0))
+            self.touch(int(cols[0]) * BLOCK_WIDTH, int(rows[0]),
+                       int(cols[-1]) * BLOCK_WIDTH + BLOCK_WIDTH - 1, int(rows[-1]))
+        dirty[:] = False
+        return replaced
+
+    @locked
+    def to_vram(self, document=None) -> Screen2VRAM:
+        """
+        Tabelas de padrões e cores da tela. Com um documento lido de arquivo, atualiza as
+        tabelas dele apenas nos blocos alterados, preservando os bytes originais dos demais.
+        """
+        if document is not None:
+            document.vram.update_from_pixels(self.pixels)
+            return document.vram
+        return Screen2VRAM.from_pixels(self.pixels)
@@ -0,0 +1,183 @@
+"""
+Miniaturas dos arquivos do Graphos III para o navegador de diretórios.
+
+As miniaturas são PNGs pequenos guardados no banco do editor, na tabela
+miniaturas, com chave (caminho, mtime, tamanho): abrir de novo uma pasta usa o
+que já está no banco e só decodifica os arquivos novos ou modificados.
+
+A decodificação roda em um pool de threads e os resultados voltam por uma fila;
+a interface chama poll() periodicamente (Tk after) na thread principal, que é a
+única que grava no banco. Nada aqui depende de Tk.
+"""
+import io
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from msx_screen2 import MSX_PALETTE_RGB, MSX_WIDTH, MSX_HEIGHT
+from msx_files import GRAPHOS_EXTENSIONS, render_file
+
+THUMB_WIDTH = 128
+THUMB_HEIGHT = 96
+THUMB_WORKERS = 4
+SHEET_GAP = 2
+
+
+def list_graphos_files(folder: str):
+    """Arquivos do Graphos III (não recursivo) com a assinatura (caminho, mtime_ns, tamanho)."""
+    entries = []
+    with os.scandir(folder) as it:
+        for entry in it:
+            if entry.is_file() and entry.name.lower().endswith(GRAPHOS_EXTENSIONS):
+                stat = entry.stat()
+                entries.append((os.path.abspath(entry.path), stat.st_mtime_ns, stat.st_size))
+    entries.sort(key=lambda e: os.path.basename(e[0]).lower())
+    return entries
+
+
+def contact_sheet(images, width: int = MSX_WIDTH, height: int = MSX_HEIGHT) -> np.ndarray:
+    """Junta várias imagens indexadas, da esquerda para a direita e em linhas, até encher a folha."""
+    sheet = np.zeros((height, width), dtype=np.uint8)
+    x = y = row_height = 0
+    for pixels in images:
+        h, w = pixels.shape
+        if x and x + w > width:
+            x, y, row_height = 0, y + row_height + SHEET_GAP, 0
+        if y >= height:
+            break
+        w, h = min(w, width - x), min(h, height - y)
+        sheet[y:y + h, x:x + w] = pixels[:h, :w]
+        x += w + SHEET_GAP
+        row_height = max(row_height, h)
+    return sheet
+
+
+def make_thumbnail(filename: str) -> bytes:
+    """PNG RGB de no máximo THUMB_WIDTH x THUMB_HEIGHT; bancos de shapes viram uma folha de contato."""
+    images = [pixels for _, pixels in render_file(filename)]
+    if len(images) == 1:
+        pixels = images[0]
+    else:
+        pixels = contact_sheet(images)
+    image = Image.fromarray(MSX_PALETTE_RGB[pixels])
+    image.thumbnail((THUMB_WIDTH, THUMB_HEIGHT), Image.BOX)
+    output = io.BytesIO()
+    image.save(output, format="PNG")
+    return output.getvalue()
+
+
+class ThumbnailStore:
+    """Miniaturas persistidas na tabela miniaturas do banco do editor (graphos_db.GraphosDB)."""
+
+    def __init__(self, db):
+        self.db = db
+        with db.transaction() as conn:
+            conn.execute("""
+                         CREATE TABLE IF NOT EXISTS miniaturas
+                         (
+                             caminho TEXT PRIMARY KEY,
+                             mtime   INTEGER NOT NULL,
+                             tamanho INTEGER NOT NULL,
+                             png     BLOB
+                         )
+                         """)
+
+    def lookup(self, entries) -> dict:
+        """{caminho: png} das entradas cuja assinatura (mtime, tamanho) bate com a guardada."""
+        wanted = {path: (mtime, size) for path, mtime, size in entries}
+        found = {}
+        paths = list(wanted)
+        for i in range(0, len(paths), 500): # Limite de parâmetros por consulta do SQLite
+            chunk = paths[i:i + 500]
+            with self.db.transaction() as conn:
+                rows = conn.execute(
+                    f"SELECT caminho, mtime, tamanho, png FROM miniaturas WHERE caminho IN ({','.join('?' * len(chunk))})",
+                    chunk).fetchall()
+            for path, mtime, size, png in rows:
+                if wanted[path] == (mtime, size):
+                    found[path] = png
+        return found
+
+    def store(self, rows):
+        """Grava várias miniaturas [(caminho, mtime, tamanho, png)] em uma única transação."""
+        with self.db.transaction() as conn:
+            conn.executemany("INSERT OR REPLACE INTO miniaturas (caminho, mtime, tamanho, png) VALUES (?, ?, ?, ?)",
+                             rows)
+
+
+class MemoryThumbnailStore:
+    """Mesma interface de ThumbnailStore, só na memória: usada quando o banco não está disponível."""
+
+    def __init__(self):
+        self._rows = {}
+
+    def lookup(self, entries) -> dict:
+        found = {}
+        for path, mtime, size in entries:
+            row = self._rows.get(path)
+            if row is not None and row[:2] == (mtime, size):
+                found[path] = row[2]
+        return found
+
+    def store(self, rows):
+        for path, mtime, size, png in rows:
+            self._rows[path] = (mtime, size, png)
+
+
+class ThumbnailLoader:
+    """
+    Gera as miniaturas que faltam em segundo plano.
+
+    request() devolve de imediato as miniaturas já guardadas e agenda as demais;
+    poll() devolve as que ficaram prontas desde a última chamada e as grava no banco.
+    Uma nova chamada a request() descarta os resultados atrasados da pasta anterior.
+    """
+
+    def __init__(self, store: ThumbnailStore, workers: int = THUMB_WORKERS):
+        self.store = store
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="miniaturas")
+        self.results = queue.Queue()
+        self.generation = 0
+        self.pending = 0
+
+    def request(self, entries) -> dict:
+        self.generation += 1
+        cached = self.store.lookup(entries)
+        missing = [entry for entry in entries if entry[0] not in cached]
+        self.pending = len(missing)
+        for entry in missing:
+            self.executor.submit(self._work, self.generation, entry)
+        return cached
+
+    def _work(self, generation: int, entry):
+        if generation != self.generation:
+            return # Pasta trocada antes de chegar a vez deste arquivo
+        path, mtime, size = entry
+        try:
+            png = make_thumbnail(path)
+        except Exception: # Qualquer erro do decodificador; sem um resultado, pending nunca chegaria a zero
+            png = None # Arquivo danificado: guardado sem imagem para não ser tentado de novo
+        self.results.put((generation, path, mtime, size, png))
+
+    def poll(self):
+        """[(caminho, png)] prontos para a pasta atual (png None = não foi possível decodificar)."""
+        ready, rows = [], []
+        while True:
+            try:
+                generation, path, mtime, size, png = self.results.get_nowait()
+            except queue.Empty:
+                break
+            rows.append((path, mtime, size, png))
+            if generation == self.generation:
+                ready.append((path, png))
+                self.pending -= 1
+        if rows:
+            self.store.store(rows)
+        return ready
+
+    def shutdown(self):
+        self.generation += 1
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,170 @@
+"""
+Telas guardadas no banco do editor, com histórico de versões comprimido.
+
+Cada versão guarda as tabelas de padrões e cores (12 KB) de uma tela SCREEN 2.
+A primeira versão e uma a cada FULL_SNAPSHOT_INTERVAL são cópias completas; as
+demais guardam só as células 8x8 que mudaram em relação à versão anterior:
+
+    delta = mapa de bits das 768 células (96 bytes) + 16 bytes por célula alterada
+            (8 de padrão e 8 de cor)
+
+Tudo é comprimido com zlib. Restaurar uma versão lê a cópia completa mais próxima
+e aplica no máximo FULL_SNAPSHOT_INTERVAL - 1 deltas, cada um em uma única
+atribuição vetorizada. A listagem de versões lê apenas os metadados.
+"""
+import time
+import zlib
+from collections import namedtuple
+
+import numpy as np
+
+from msx_vram import Screen2VRAM, CELL_ROWS, CELL_COLS
+
+FULL_SNAPSHOT_INTERVAL = 32
+CELL_COUNT = CELL_ROWS * CELL_COLS
+CELL_BYTES = 16  # 8 bytes de padrão + 8 de cor
+COMPRESSION_LEVEL = 6
+
+VersionInfo = namedtuple("VersionInfo", "version created kind cells size")
+ScreenInfo = namedtuple("ScreenInfo", "name versions updated")
+
+
+def vram_cells(vram: Screen2VRAM) -> np.ndarray:
+    """Tabelas como (768, 16): padrão e cor de cada célula, na ordem dos nomes padrão."""
+    if not vram.has_default_names():
+        vram = vram.copy()
+        vram.normalize_names()
+    tables = np.frombuffer(vram.buffer, dtype=np.uint8).reshape(2, CELL_COUNT, 8)
+    return np.concatenate((tables[0], tables[1]), axis=1)
+
+
+def cells_to_buffer(cells: np.ndarray) -> bytearray:
+    return bytearray(cells[:, :8].tobytes() + cells[:, 8:].tobytes())
+
+
+def encode_delta(previous: np.ndarray, current: np.ndarray) -> tuple:
+    """(blob comprimido, células alteradas) com apenas as células que diferem."""
+    changed = (previous != current).any(axis=1)
+    payload = np.packbits(changed).tobytes() + current[changed].tobytes()
+    return zlib.compress(payload, COMPRESSION_LEVEL), int(changed.sum())
+
+
+def apply_delta(cells: np.ndarray, blob: bytes):
+    payload = zlib.decompress(blob)
+    bitmap_size = CELL_COUNT // 8
+    changed = np.unpackbits(np.frombuffer(payload[:bitmap_size], dtype=np.uint8)).astype(bool)
+    cells[changed] = np.frombuffer(payload[bitmap_size:], dtype=np.uint8).reshape(-1, CELL_BYTES)
+
+
+class ScreenVersions:
+    """Histórico de telas no banco (graphos_db.GraphosDB), tabelas telas e versoes_tela."""
+
+    def __init__(self, db):
+        self.db = db
+        self._latest = {}  # nome -> (versão, células), evita reconstruir a última versão a cada gravação
+        with db.transaction() as conn:
+            conn.execute("""
+                         CREATE TABLE IF NOT EXISTS telas
+                         (
+                             id         INTEGER PRIMARY KEY,
+                             nome       TEXT UNIQUE NOT NULL,
+                             atualizada REAL NOT NULL
+                         )
+                         """)
+            conn.execute("""
+                         CREATE TABLE IF NOT EXISTS versoes_tela
+                         (
+                             tela_id INTEGER NOT NULL REFERENCES telas (id),
+                             versao  INTEGER NOT NULL,
+                             criada  REAL    NOT NULL,
+                             tipo    TEXT    NOT NULL,
+                             celulas INTEGER NOT NULL,
+                             dados   BLOB    NOT NULL,
+                             PRIMARY KEY (tela_id, versao)
+                         ) WITHOUT ROWID
+                         """)
+
+    def _screen_id(self, conn, name: str, create: bool = False):
+        row = conn.execute("SELECT id FROM telas WHERE nome = ?", (name,)).fetchone()
+        if row is None and create:
+            return conn.execute("INSERT INTO telas (nome, atualizada) VALUES (?, ?)", (name, time.time())).lastrowid
+        return row[0] if row else None
+
+    def screens(self):
+        with self.db.transaction() as conn:
+            rows = conn.execute("""
+                                SELECT nome, (SELECT MAX(versao) FROM versoes_tela WHERE tela_id = id), atualizada
+                                FROM telas
+                                ORDER BY atualizada DESC
+                                """).fetchall()
+        return [ScreenInfo(*row) for row in rows]
+
+    def versions(self, name: str):
+        """Metadados das versões de uma tela, da mais nova para a mais antiga (sem ler os dados)."""
+        with self.db.transaction() as conn:
+            rows = conn.execute("""
+                                SELECT versao, criada, tipo, celulas, LENGTH(dados)
+                                FROM versoes_tela
+                                WHERE tela_id = (SELECT id FROM telas WHERE nome = ?)
+                                ORDER BY versao DESC
+                                """, (name,)).fetchall()
+        return [VersionInfo(*row) for row in rows]
+
+    def save(self, name: str, vram: Screen2VRAM) -> int:
+        """Grava uma nova versão (se a tela mudou) e devolve o número da versão atual."""
+        current = vram_cells(vram)
+        latest = self._latest.get(name)
+        if latest is None:
+            try:
+                latest = self._restore(name, None)
+            except KeyError:
+                latest = None
+        now = time.time()
+        with self.db.transaction() as conn:
+            screen_id = self._screen_id(conn, name, create=True)
+            if latest is None:
+                version, kind, cells = 1, "full", CELL_COUNT
+            else:
+                last_version, previous = latest
+                if np.array_equal(previous, current):
+                    return last_version
+                version = last_version + 1
+                kind = "full" if (version - 1) % FULL_SNAPSHOT_INTERVAL == 0 else "delta"
+            if kind == "full":
+                blob, cells = zlib.compress(current.tobytes(), COMPRESSION_LEVEL), CELL_COUNT
+            else:
+                blob, cells = encode_delta(previous, current)
+            conn.execute("INSERT INTO versoes_tela (tela_id, versao, criada, tipo, celulas, dados) VALUES (?, ?, ?, ?, ?, ?)",
+                         (screen_id, version, now, kind, cells, blob))
+            conn.execute("UPDATE telas SET atualizada = ? WHERE id = ?", (now, screen_id))
+        self._latest[name] = (version, current.copy())
+        return version
+
+    def load(self, name: str, version: int = None) -> Screen2VRAM:
+        """Restaura uma versão (a mais recente, se version for None)."""
+        _, cells = self._restore(name, version)
+        return Screen2VRAM(cells_to_buffer(cells))
+
+    def _restore(self, name: str, version):
+        with self.db.transaction() as conn:
+            screen_id = self._screen_id(conn, name)
+            if screen_id is not None and version is None:
+                version = conn.execute("SELECT MAX(versao) FROM versoes_tela WHERE tela_id = ?", (screen_id,)).fetchone()[0]
+            if screen_id is None or version is None:
+                raise KeyError(f"Tela '{name}' não está no banco.")
+            rows = conn.execute("""
+                                SELECT versao, tipo, dados
+                                FROM versoes_tela
+                                WHERE tela_id = ?
+                                  AND versao <= ?
+                                  AND versao >= (SELECT MAX(versao)
+                                                 FROM versoes_tela
+                                                 WHERE tela_id = ? AND versao <= ? AND tipo = 'full')
+                                ORDER BY versao
+                                """, (screen_id, version, screen_id, version)).fetchall()
+        if not rows or rows[-1][0] != version:
+            raise KeyError(f"Versão {version} da tela '{name}' não encontrada.")
+        cells = np.frombuffer(zlib.decompress(rows[0][2]), dtype=np.uint8).reshape(CELL_COUNT, CELL_BYTES).copy()
+        for _, _, blob in rows[1:]:
+            apply_delta(cells, blob)
+        return version, cells
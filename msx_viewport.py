@@ -0,0 +1,139 @@
+"""
+Exibição ampliada e rolável do framebuffer do editor SCREEN 2 num tk.Canvas.
+
+A tela fica numa PhotoImage na resolução MSX (frame_image); o canvas mostra
+cópias ampliadas de cada célula 8x8, uma imagem por célula, criadas só para as
+células visíveis. O canvas tem o tamanho da tela ampliada como scrollregion, e a
+rolagem é feita pelo próprio Tk (xview/yview), que só move os itens; depois de
+cada rolagem as células que entraram na janela ganham a sua imagem.
+
+As imagens das células formam um cache LRU limitado em bytes: células alteradas
+são reampliadas se estiverem no cache e as que saíram da janela são descartadas
+primeiro. Trocar o zoom esvazia o cache, mantendo fixo o pixel sob o cursor.
+"""
+import tkinter as tk
+from collections import OrderedDict
+
+from msx_screen2 import MSX_WIDTH, MSX_HEIGHT
+
+ZOOM_LEVELS = (1, 2, 3, 4, 6, 8, 12, 16)
+DEFAULT_ZOOM = 4
+CELL_SIZE = 8
+CELL_COLS = MSX_WIDTH // CELL_SIZE
+CELL_ROWS = MSX_HEIGHT // CELL_SIZE
+TILE_CACHE_BYTES = 16 * 1024 * 1024  # O Tk guarda 4 bytes por pixel ampliado
+
+
+class TileViewport:
+    def __init__(self, canvas, frame_image, zoom: int = DEFAULT_ZOOM, cache_bytes: int = TILE_CACHE_BYTES):
+        self.canvas = canvas
+        self.frame_image = frame_image
+        self.cache_bytes = cache_bytes
+        self.tiles = OrderedDict()  # (cx, cy) -> (PhotoImage, item do canvas); o mais recente no fim
+        self.zoom = zoom
+        self.canvas.configure(scrollregion=(0, 0, MSX_WIDTH * zoom, MSX_HEIGHT * zoom))
+
+    # --- Coordenadas ---
+    def msx_coords(self, window_x, window_y):
+        """Coordenadas de um evento (relativas à janela do canvas) -> pixel MSX, com a rolagem atual."""
+        return (int(self.canvas.canvasx(window_x) // self.zoom),
+                int(self.canvas.canvasy(window_y) // self.zoom))
+
+    def visible_cells(self):
+        """Células (cx0, cy0, cx1, cy1), inclusivo, que aparecem ao menos em parte na janela."""
+        left, top = self.canvas.canvasx(0), self.canvas.canvasy(0)
+        right = left + max(self.canvas.winfo_width(), 1) - 1
+        bottom = top + max(self.canvas.winfo_height(), 1) - 1
+        span = CELL_SIZE * self.zoom
+        return (max(int(left // span), 0), max(int(top // span), 0),
+                min(int(right // span), CELL_COLS - 1), min(int(bottom // span), CELL_ROWS - 1))
+
+    # --- Cache de células ---
+    def _render_tile(self, image, cx: int, cy: int):
+        x, y = cx * CELL_SIZE, cy * CELL_SIZE
+        image.tk.call(image, "copy", self.frame_image, "-from", x, y, x + CELL_SIZE, y + CELL_SIZE,
+                      "-to", 0, 0, "-zoom", self.zoom)
+
+    def _drop(self, cell):
+        image, item = self.tiles.pop(cell)
+        self.canvas.delete(item)
+
+    def _trim(self, visible):
+        """Descarta as células mais antigas fora da janela enquanto o cache passar do limite."""
+        limit = max(self.cache_bytes // (4 * (CELL_SIZE * self.zoom) ** 2), 1)
+        cx0, cy0, cx1, cy1 = visible
+        for cell in list(self.tiles):
+            if len(self.tiles) <= limit:
+                break
+            if not (cx0 <= cell[0] <= cx1 and cy0 <= cell[1] <= cy1):
+                self._drop(cell)
+
+    def show_visible(self):
+        """Cria as imagens das células visíveis que ainda não estão no cache."""
+        visible = self.visible_cells()
+        cx0, cy0, cx1, cy1 = visible
+        span = CELL_SIZE * self.zoom
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                cell = (cx, cy)
+                if cell in self.tiles:
+                    self.tiles.move_to_end(cell)
+                    continue
+                image = tk.PhotoImage(width=span, height=span)
+                self._render_tile(image, cx, cy)
+                item = self.canvas.create_image(cx * span, cy * span, image=image, anchor="nw", tags="tile")
+                self.canvas.tag_lower(item)  # Abaixo dos previews
+                self.tiles[cell] = (image, item)
+        self._trim(visible)
+
+    def invalidate(self, x_min: int, y_min: int, x_max: int, y_max: int):
+        """Pixels alterados em frame_image: reamplia as células visíveis e descarta as demais."""
+        vx0, vy0, vx1, vy1 = self.visible_cells()
+        for cy in range(y_min // CELL_SIZE, y_max // CELL_SIZE + 1):
+            for cx in range(x_min // CELL_SIZE, x_max // CELL_SIZE + 1):
+                entry = self.tiles.get((cx, cy))
+                if entry is None:
+                    continue
+                if vx0 <= cx <= vx1 and vy0 <= cy <= vy1:
+                    self._render_tile(entry[0], cx, cy)
+                else:
+                    self._drop((cx, cy))
+
+    def clear(self):
+        for cell in list(self.tiles):
+            self._drop(cell)
+
+    # --- Zoom e rolagem ---
+    def set_zoom(self, zoom: int, window_x: int = None, window_y: int = None):
+        """
+        Troca o zoom mantendo no mesmo lugar da janela o pixel sob (window_x, window_y)
+        (por padrão, o centro da janela).
+        """
+        if zoom == self.zoom:
+            return
+        if window_x is None:
+            window_x, window_y = self.canvas.winfo_width() // 2, self.canvas.winfo_height() // 2
+        anchor_x = self.canvas.canvasx(window_x) / self.zoom
+        anchor_y = self.canvas.canvasy(window_y) / self.zoom
+        self.clear()
+        self.zoom = zoom
+        width, height = MSX_WIDTH * zoom, MSX_HEIGHT * zoom
+        self.canvas.configure(scrollregion=(0, 0, width, height))
+        self.canvas.xview_moveto(max(anchor_x * zoom - window_x, 0) / width)
+        self.canvas.yview_moveto(max(anchor_y * zoom - window_y, 0) / height)
+        self.show_visible()
+
+    def next_zoom(self, direction: int) -> int:
+        """Nível de ZOOM_LEVELS seguinte ao atual para cima (direction > 0) ou para baixo."""
+        if direction > 0:
+            return next((z for z in ZOOM_LEVELS if z > self.zoom), self.zoom)
+        return next((z for z in reversed(ZOOM_LEVELS) if z < self.zoom), self.zoom)
+
+    def xview(self, *args):
+        """Comando da barra de rolagem horizontal."""
+        self.canvas.xview(*args)
+        self.show_visible()
+
+    def yview(self, *args):
+        self.canvas.yview(*args)
+        self.show_visible()
@@ -0,0 +1,182 @@
+"""
+Modelo de documento nativo do SCREEN 2: tabelas de padrões, cores e nomes da VRAM.
+
+O layout é o mesmo do Buffer usado por readers/msxscrvw.pas: a tabela de padrões
+em GRPCGP=$0000 e a de cores em GRPCOL=$1800, lado a lado em 12 KB contíguos.
+A tabela de nomes (768 bytes) fica à parte, pois os arquivos .SCR não a guardam
+e o Graphos III sempre usa a sequência 0..255 repetida nos três terços da tela.
+
+As conversões entre as tabelas e o framebuffer indexado do editor são vetorizadas
+com NumPy.
+"""
+import numpy as np
+
+from msx_screen2 import MSX_WIDTH, MSX_HEIGHT, BLOCK_WIDTH, rank_block_colors
+
+# --- Endereços das tabelas (mesmos de msxscrvw.pas) ---
+GRPCGP = 0x0000
+GRPCOL = 0x1800
+PATTERN_SIZE = 0x1800
+COLOR_SIZE = 0x1800
+TABLES_SIZE = GRPCOL + COLOR_SIZE
+NAME_SIZE = 0x300
+
+DEFAULT_COLOR = 0xF0  # Frente 15 e fundo 0, o mesmo valor que os visualizadores usam
+CELL_ROWS = MSX_HEIGHT // 8
+CELL_COLS = MSX_WIDTH // 8
+DEFAULT_NAMES = bytes(range(256)) * 3
+
+
+def encode_blocks(blocks: np.ndarray):
+    """
+    Converte blocos 8x1 de pixels indexados (n, 8) em bytes de padrão e de cor.
+
+    A cor de fundo é a mais frequente do bloco e a de frente é a segunda;
+    blocos com uma única cor ficam com padrão 0 e frente igual ao fundo.
+    Pixels de uma terceira cor (se houver) viram pixels de frente.
+    """
+    background, foreground, _ = rank_block_colors(blocks)
+    bits = blocks != background[:, None]
+    patterns = np.packbits(bits, axis=1).ravel()
+    colors = (foreground << 4) | background
+    return patterns, colors
+
+
+def decode_blocks(patterns: np.ndarray, colors: np.ndarray) -> np.ndarray:
+    """Converte bytes de padrão e de cor (mesmo formato) em pixels indexados (..., 8)."""
+    bits = np.unpackbits(patterns[..., None], axis=-1).astype(bool)
+    foreground = (colors >> 4)[..., None]
+    background = (colors & 0x0F)[..., None]
+    return np.where(bits, foreground, background).astype(np.uint8)
+
+
+class Screen2VRAM:
+    """
+    Tabelas de padrões, cores e nomes de uma tela SCREEN 2.
+
+    buffer guarda padrões e cores (12 KB) exatamente como a VRAM; pattern, color
+    e names devolvem memoryviews sem cópia, e pattern_array/color_array devolvem
+    arrays NumPy (CELL_ROWS, CELL_COLS, 8) que também compartilham a memória.
+    """
+
+    def __init__(self, buffer=None, names=None):
+        if buffer is None:
+            buffer = bytearray(TABLES_SIZE)
+            buffer[GRPCOL:GRPCOL + COLOR_SIZE] = bytes([DEFAULT_COLOR]) * COLOR_SIZE
+        elif len(buffer) != TABLES_SIZE:
+            raise ValueError(f"Tabelas SCREEN 2 devem ter {TABLES_SIZE} bytes, recebido {len(buffer)}.")
+        self.buffer = bytearray(buffer)
+        self.names = bytearray(DEFAULT_NAMES if names is None else names)
+        if len(self.names) != NAME_SIZE:
+            raise ValueError(f"Tabela de nomes deve ter {NAME_SIZE} bytes, recebido {len(self.names)}.")
+
+    # --- Acesso sem cópia ---
+    @property
+    def pattern(self) -> memoryview:
+        return memoryview(self.buffer)[GRPCGP:GRPCGP + PATTERN_SIZE]
+
+    @property
+    def color(self) -> memoryview:
+        return memoryview(self.buffer)[GRPCOL:GRPCOL + COLOR_SIZE]
+
+    @property
+    def name_table(self) -> memoryview:
+        return memoryview(self.names)
+
+    def pattern_array(self) -> np.ndarray:
+        """Tabela de padrões como array (CELL_ROWS, CELL_COLS, 8) ligado ao buffer."""
+        return np.frombuffer(self.buffer, dtype=np.uint8, count=PATTERN_SIZE, offset=GRPCGP).reshape(CELL_ROWS, CELL_COLS, 8)
+
+    def color_array(self) -> np.ndarray:
+        """Tabela de cores como array (CELL_ROWS, CELL_COLS, 8) ligado ao buffer."""
+        return np.frombuffer(self.buffer, dtype=np.uint8, count=COLOR_SIZE, offset=GRPCOL).reshape(CELL_ROWS, CELL_COLS, 8)
+
+    def has_default_names(self) -> bool:
+        return self.names == DEFAULT_NAMES
+
+    def copy(self) -> "Screen2VRAM":
+        return Screen2VRAM(self.buffer, self.names)
+
+    def tobytes(self) -> bytes:
+        """Padrões seguidos das cores, como gravados nos arquivos .SCR."""
+        return bytes(self.buffer)
+
+    def normalize_names(self):
+        """Reordena padrões e cores para a tabela de nomes padrão (0..255 em cada terço)."""
+        if self.has_default_names():
+            return
+        patterns, colors = self._named_tables()
+        self.pattern_array()[:] = patterns
+        self.color_array()[:] = colors
+        self.names[:] = DEFAULT_NAMES
+
+    def _named_tables(self):
+        """Padrões e cores na ordem da tela, resolvidos pela tabela de nomes."""
+        names = np.frombuffer(bytes(self.names), dtype=np.uint8).reshape(3, 256)
+        banks = np.arange(3)[:, None]
+        patterns = self.pattern_array().reshape(3, 256, 8)[banks, names]
+        colors = self.color_array().reshape(3, 256, 8)[banks, names]
+        return patterns.reshape(CELL_ROWS, CELL_COLS, 8), colors.reshape(CELL_ROWS, CELL_COLS, 8)
+
+    # --- Conversão pixels <-> tabelas ---
+    @classmethod
+    def from_pixels(cls, pixels: np.ndarray) -> "Screen2VRAM":
+        vram = cls()
+        vram.store_pixels(pixels)
+        return vram
+
+    def store_pixels(self, pixels: np.ndarray, cell_box=None):
+        """
+        Codifica os pixels indexados nas tabelas de padrões e cores.
+        cell_box (cx0, cy0, cx1, cy1), em células 8x8 e inclusivo, limita a região.
+        """
+        self.normalize_names()
+        cx0, cy0, cx1, cy1 = cell_box if cell_box is not None else (0, 0, CELL_COLS - 1, CELL_ROWS - 1)
+        region = pixels[cy0 * 8:(cy1 + 1) * 8, cx0 * 8:(cx1 + 1) * 8]
+        rows, cols = cy1 - cy0 + 1, cx1 - cx0 + 1
+
+        patterns, colors = encode_blocks(region.reshape(-1, BLOCK_WIDTH))
+        # Ordem dos pixels (célula_y, linha, célula_x) -> ordem da VRAM (célula_y, célula_x, linha)
+        patterns = patterns.reshape(rows, 8, cols).transpose(0, 2, 1)
+        colors = colors.reshape(rows, 8, cols).transpose(0, 2, 1)
+        self.pattern_array()[cy0:cy1 + 1, cx0:cx1 + 1] = patterns
+        self.color_array()[cy0:cy1 + 1, cx0:cx1 + 1] = colors
+
+    def to_pixels(self, out: np.ndarray = None, cell_box=None) -> np.ndarray:
+        """
+        Decodifica as tabelas para pixels indexados (MSX_HEIGHT x MSX_WIDTH).
+        Com out, escreve no array existente; cell_box limita a região decodificada.
+        """
+        if out is None:
+            out = np.empty((MSX_HEIGHT, MSX_WIDTH), dtype=np.uint8)
+        cx0, cy0, cx1, cy1 = cell_box if cell_box is not None else (0, 0, CELL_COLS - 1, CELL_ROWS - 1)
+        if self.has_default_names():
+            patterns, colors = self.pattern_array(), self.color_array()
+        else:
+            patterns, colors = self._named_tables()
+        patterns = patterns[cy0:cy1 + 1, cx0:cx1 + 1]
+        colors = colors[cy0:cy1 + 1, cx0:cx1 + 1]
+
+        blocks = decode_blocks(patterns, colors)  # (célula_y, célula_x, linha, bit)
+        rows, cols = patterns.shape[:2]
+        out[cy0 * 8:(cy1 + 1) * 8, cx0 * 8:(cx1 + 1) * 8] = blocks.transpose(0, 2, 1, 3).reshape(rows * 8, cols * 8)
+        return out
+
+    def update_from_pixels(self, pixels: np.ndarray) -> int:
+        """
+        Recodifica apenas os blocos 8x1 cujos pixels diferem do que as tabelas já mostram.
+        Blocos iguais mantêm os bytes originais (e a escolha de frente/fundo de quem os
+        gravou), então carregar e salvar uma tela sem alterações reproduz o arquivo.
+        Devolve quantos blocos foram recodificados.
+        """
+        self.normalize_names()
+        current = self.to_pixels()
+        changed = (current != pixels).reshape(CELL_ROWS, 8, CELL_COLS, 8).any(axis=3)  # (célula_y, linha, célula_x)
+        if not changed.any():
+            return 0
+        cy, line, cx = np.nonzero(changed)
+        blocks = pixels.reshape(CELL_ROWS, 8, CELL_COLS, 8)[cy, line, cx]
+        patterns, colors = encode_blocks(blocks)
+        self.pattern_array()[cy, cx, line] = patterns
+        self.color_array()[cy, cx, line] = colors
+        return int(cy.size)
@@ -0,0 +1,43 @@
+import glob
+import os
+
+import numpy as np
+import pytest
+
+from msx_alf import ALF_SIZE, AlfFont, TEXT_STYLES, parse_alf
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLES = sorted(glob.glob(os.path.join(ROOT, "III", "*.ALF")))
+
+
+@pytest.mark.parametrize("filename", SAMPLES, ids=os.path.basename)
+def test_sample_roundtrip_is_byte_exact(filename):
+    with open(filename, "rb") as f:
+        data = f.read()
+    assert parse_alf(data).tobytes() == data
+
+
+def test_new_font_roundtrip():
+    font = AlfFont(np.random.default_rng(9).integers(0, 256, ALF_SIZE, dtype=np.uint8).tobytes())
+    assert parse_alf(font.tobytes()).glyphs.tobytes() == font.glyphs.tobytes()
+
+
+def test_truncated_font_is_rejected():
+    with pytest.raises(ValueError, match="truncado"):
+        parse_alf(AlfFont().tobytes()[:100])
+
+
+def test_text_plane_copies_glyph_bytes():
+    font = AlfFont(np.random.default_rng(10).integers(0, 256, ALF_SIZE, dtype=np.uint8).tobytes())
+    plane = font.text_plane("AB\nC")
+    assert plane.shape == (16, 2)
+    assert plane[:8, 0].tolist() == font.glyphs[ord("A")].tolist()
+    assert plane[:8, 1].tolist() == font.glyphs[ord("B")].tolist()
+    assert plane[8:, 1].tolist() == font.glyphs[ord(" ")].tolist()
+
+
+@pytest.mark.parametrize("style", TEXT_STYLES)
+def test_text_styles_sizes(style):
+    double_height, double_width, _, _ = TEXT_STYLES[style]
+    plane = AlfFont(bytes([0xFF]) * ALF_SIZE).text_plane("AB", style)
+    assert plane.shape == (8 * (1 + double_height), 2 * (1 + double_width))
@@ -0,0 +1,52 @@
+import os
+import shutil
+
+import graphos_cli
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE = os.path.join(ROOT, "III", "FRANCE.GRP")
+
+
+def test_missing_input_fails(tmp_path, capsys):
+    status = graphos_cli.main(["png", SAMPLE, str(tmp_path / "nada.SCR"), "-o", str(tmp_path / "out"), "-j", "1"])
+    assert status == 1
+    assert "arquivo não encontrado" in capsys.readouterr().err
+    assert (tmp_path / "out" / "FRANCE.GRP.png").exists()
+
+
+def test_clashing_outputs_are_rejected(tmp_path, capsys):
+    for root in ("a", "b"):
+        os.makedirs(tmp_path / root)
+        shutil.copy(SAMPLE, tmp_path / root / "FRANCE.GRP")
+    status = graphos_cli.main(["png", str(tmp_path / "a"), str(tmp_path / "b"), "-o", str(tmp_path / "out"), "-j", "1"])
+    assert status == 1
+    err = capsys.readouterr().err
+    assert "mesma saída que" in err and os.path.join(str(tmp_path / "b"), "FRANCE.GRP") in err
+
+
+def test_same_file_twice_is_converted_once(tmp_path, capsys):
+    status = graphos_cli.main(["png", SAMPLE, os.path.dirname(SAMPLE) + "/FRANCE.GRP",
+                               "-o", str(tmp_path), "-j", "1", "-q"])
+    assert status == 0
+    assert capsys.readouterr().out.startswith("1 convertido(s), 0 com erro")
+
+
+def test_png_to_screen_names_clash(tmp_path):
+    jobs = [(str(tmp_path / name), str(tmp_path), str(tmp_path / "out"), "scr", "simples")
+            for name in ("TELA.SCR.png", "TELA.png")]
+    kept, clashes = graphos_cli.drop_clashes(jobs)
+    assert kept == jobs[:1] and clashes == [(jobs[1], jobs[0][0])]
+
+
+def test_bad_input_does_not_stop_the_batch(tmp_path, monkeypatch, capsys):
+    from PIL import Image
+    source = tmp_path / "in"
+    os.makedirs(source)
+    Image.new("P", (256, 192)).save(source / "BOA.png")
+    Image.new("1", (1000, 1000)).save(source / "GRANDE.png")
+    # Com o limite reduzido, o PNG grande faz o PIL levantar DecompressionBombError
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 100_000)
+    status = graphos_cli.main(["scr", str(source), "-o", str(tmp_path / "out"), "-j", "1"])
+    assert status == 1
+    assert (tmp_path / "out" / "BOA.SCR").exists()
+    assert "GRANDE.png" in capsys.readouterr().err
@@ -0,0 +1,88 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from msx_commands import CommandRunner, parse_script
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_statements_comments_and_quotes():
+    commands = parse_script("color 15,1 : BOX 0,0,10,10,f ' comentário : CLS\nTEXT 8,8,\"a:b'c\"")
+    assert [(c.line, c.name, c.args) for c in commands] == [
+        (1, "COLOR", (15, 1)), (1, "BOX", (0, 0, 10, 10, "f")), (2, "TEXT", (8, 8, "a:b'c"))]
+
+
+@pytest.mark.parametrize("script, message", [
+    ("PLOT 1,2", "comando desconhecido 'PLOT'"),
+    ("LINE 1,2,3", "LINE espera 4 argumento(s), recebeu 3"),
+    ("BOX 1,2,3,4,F,G", "BOX espera 4 a 5 argumento(s), recebeu 6"),
+    ("LINE 1,2,x,4", "número esperado, recebido x"),
+    ("LINE 1,,3,4", "número esperado, recebido nada"),
+    ("TEXT 1,2,abc", "texto entre aspas esperado"),
+    ("CIRCLE 1,2,3,G", "'G' inválido"),
+    ("CIRCLE 1,2,40000", "40000 fora do intervalo"),
+    ("POLY 1,2,3,4", "POLY espera de 3 a 32 pares x,y"),
+    ("COLOR 1\nLINE 1", "linha 2: LINE"),
+])
+def test_parse_errors(script, message):
+    with pytest.raises(ValueError) as error:
+        parse_script(script)
+    assert message in str(error.value)
+
+
+def test_syntax_errors_stop_before_drawing():
+    runner = CommandRunner()
+    with pytest.raises(ValueError):
+        runner.run_script("BOX 0,0,255,191,F\nLINE 1")
+    assert not runner.pixels.any()
+
+
+@pytest.mark.parametrize("script, message", [
+    ("STAMP 0,0,0", "nenhum banco de shapes carregado"),
+    ("LOAD \"III/ALFABET1.SHP\"\nSTAMP -1,0,0", "shape negativo (-1)"),
+    ("LOAD \"III/ALFABET1.SHP\"\nSTAMP 9999,0,0", "linha 2: STAMP"),
+    ("TEXT 0,0,\"a\"", "nenhum alfabeto carregado"),
+    ("CIRCLE 10,10,-1", "raio negativo"),
+    ("ELLIPSE 10,10,5,-1", "semieixo negativo"),
+    ("COLOR 16", "cor 16 fora da paleta"),
+    ("FILL 1,1,20", "cor 20 fora da paleta"),
+    ("LOAD \"x.txt\"", "formato não suportado"),
+    ("SAVE \"x.png\"", "SAVE grava apenas telas"),
+])
+def test_runtime_errors(script, message):
+    runner = CommandRunner(base_dir=ROOT)
+    with pytest.raises(ValueError) as error:
+        runner.run_script(script)
+    assert message in str(error.value)
+
+
+def test_nested_run_is_bounded(tmp_path):
+    (tmp_path / "loop.cmd").write_text('RUN "loop.cmd"', encoding="utf-8")
+    with pytest.raises(ValueError, match="RUN aninhado"):
+        CommandRunner(base_dir=str(tmp_path)).run_script('RUN "loop.cmd"')
+
+
+def test_huge_circle_returns_quickly():
+    runner = CommandRunner(ink=15)
+    start = time.perf_counter()
+    runner.run_script("CIRCLE 10,10,30000\nCIRCLE 10,10,30000,F")
+    assert time.perf_counter() - start < 1.0
+    assert (runner.pixels == 15).all()
+
+
+def test_script_runs_one_constraint_pass_and_saves(tmp_path):
+    rng = np.random.default_rng(6)
+    lines = ["COLOR 15,1", "CLS"]
+    for i in range(200):
+        x0, x1 = rng.integers(0, 256, 2)
+        y0, y1 = rng.integers(0, 192, 2)
+        lines += [f"COLOR {i % 15 + 1}", f"BOX {x0},{y0},{x1},{y1},F", f"CIRCLE {x0},{y0},{x1 % 40}",
+                  f"ELLIPSE {x1},{y1},{y0 % 30},{x0 % 20},F", f"POLY {x0},{y0},{x1},{y1},{x0},{y1}"]
+    lines.append('SAVE "saida.scr"')
+    runner = CommandRunner(base_dir=str(tmp_path))
+    runner.run_script("\n".join(lines))
+    assert runner.constraint_passes == 1
+    assert (tmp_path / "saida.scr").exists()
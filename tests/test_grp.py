@@ -0,0 +1,54 @@
+import glob
+import os
+
+import numpy as np
+import pytest
+
+from msx_vram import TABLES_SIZE, DEFAULT_COLOR
+from msx_scr import HEADER_SIZE, bsave_header
+from msx_grp import GRP_COLOR, GRP_END, GrpFile, parse_grp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLES = sorted(glob.glob(os.path.join(ROOT, "III", "*.GRP")))
+
+
+@pytest.mark.parametrize("filename", SAMPLES, ids=os.path.basename)
+def test_sample_roundtrip_is_byte_exact(filename):
+    with open(filename, "rb") as f:
+        data = f.read()
+    assert parse_grp(data).tobytes() == data
+
+
+def test_new_screen_roundtrip():
+    rng = np.random.default_rng(10)
+    grp = GrpFile()
+    grp.vram.buffer[:] = rng.integers(0, 256, TABLES_SIZE, dtype=np.uint8).tobytes()
+    data = grp.tobytes()
+    assert len(data) == HEADER_SIZE + GRP_END
+    again = parse_grp(data)
+    assert again.vram.buffer == grp.vram.buffer
+    assert again.tobytes() == data
+
+
+def test_truncated_file_gets_default_colors():
+    full = GrpFile()
+    full.vram.color[:] = bytes(len(full.vram.color))
+    data = bsave_header(0, GRP_COLOR + 15, 0) + full.tobytes()[HEADER_SIZE:HEADER_SIZE + GRP_COLOR + 16]
+    grp = parse_grp(data)
+    assert grp.vram.color[:16] == bytes(16)
+    assert grp.vram.color[16:] == bytes([DEFAULT_COLOR]) * (len(grp.vram.color) - 16)
+    # Sem alterações na parte que falta, o arquivo continua truncado
+    assert grp.tobytes() == data
+
+    grp.vram.color[-1] = 0x4F
+    saved = grp.tobytes()
+    assert len(saved) == HEADER_SIZE + GRP_END
+    assert saved[3] | (saved[4] << 8) == GRP_END - 1
+    assert parse_grp(saved).vram.buffer == grp.vram.buffer
+
+
+def test_rejects_other_start_address():
+    data = bytearray(GrpFile().tobytes())
+    data[1] = 0x10
+    with pytest.raises(ValueError, match="endereço 0"):
+        parse_grp(bytes(data))
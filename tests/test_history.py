@@ -0,0 +1,69 @@
+import numpy as np
+
+from msx_screen2 import new_framebuffer
+from msx_history import EditHistory, pack_nibbles, unpack_nibbles
+
+
+def test_nibble_packing_roundtrip():
+    blocks = np.random.default_rng(14).integers(0, 16, (50, 8), dtype=np.uint8)
+    packed = pack_nibbles(blocks)
+    assert packed.shape == (50, 4)
+    assert packed[0, 0] == (blocks[0, 0] << 4) | blocks[0, 1]
+    assert (unpack_nibbles(packed) == blocks).all()
+
+
+def test_undo_and_redo_restore_each_step():
+    pixels = new_framebuffer(0)
+    history = EditHistory(pixels)
+    states = [pixels.copy()]
+    for color, (x, y) in enumerate([(3, 4), (100, 50), (255, 191)], 1):
+        pixels[y, x:x + 5] = color
+        assert history.record(pixels)
+        states.append(pixels.copy())
+    assert not history.record(pixels)  # Nada mudou desde o último passo
+
+    assert history.undo(pixels) == (248, 191, 255, 191)
+    assert (pixels == states[2]).all()
+    history.undo(pixels)
+    history.undo(pixels)
+    assert (pixels == states[0]).all()
+    assert history.undo(pixels) is None
+    history.redo(pixels)
+    history.redo(pixels)
+    assert (pixels == states[2]).all()
+
+
+def test_undo_records_pending_changes_first():
+    pixels = new_framebuffer(0)
+    history = EditHistory(pixels)
+    pixels[10, 10] = 5
+    history.undo(pixels)
+    assert not pixels.any()
+    history.redo(pixels)
+    assert pixels[10, 10] == 5
+
+
+def test_new_record_clears_redo():
+    pixels = new_framebuffer(0)
+    history = EditHistory(pixels)
+    pixels[0, 0] = 1
+    history.record(pixels)
+    history.undo(pixels)
+    assert history.redo_steps
+    pixels[5, 5] = 2
+    history.record(pixels)
+    assert not history.redo_steps
+    assert history.redo(pixels) is None
+    assert history.nbytes == sum(step.nbytes for step in history.undo_steps)
+
+
+def test_eviction_keeps_the_newest_step():
+    pixels = new_framebuffer(0)
+    history = EditHistory(pixels, max_bytes=100)
+    for y in range(20):
+        pixels[y, :] = y % 15 + 1  # 32 blocos por passo, mais que max_bytes
+        history.record(pixels)
+    assert len(history.undo_steps) == 1
+    assert history.nbytes == history.undo_steps[0].nbytes
+    history.undo(pixels)
+    assert (pixels[19] == 0).all() and (pixels[18] == 4).all()
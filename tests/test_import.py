@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from msx_screen2 import MSX_WIDTH, MSX_HEIGHT, rank_block_colors
+from msx_import import DITHER_MODES, image_pixels, import_image, screen_rgb
+
+
+def gradient_rgb() -> np.ndarray:
+    y, x = np.mgrid[0:MSX_HEIGHT, 0:MSX_WIDTH]
+    return np.stack([x * 255 // (MSX_WIDTH - 1), y * 255 // (MSX_HEIGHT - 1), (x + y) % 256], axis=-1).astype(np.uint8)
+
+
+@pytest.mark.parametrize("dither", DITHER_MODES)
+def test_dithered_pixels_use_two_colors_per_block(dither):
+    pixels = image_pixels(gradient_rgb(), dither)
+    assert pixels.shape == (MSX_HEIGHT, MSX_WIDTH) and pixels.dtype == np.uint8
+    assert rank_block_colors(pixels.reshape(-1, 8))[2].max() <= 2
+
+
+def test_unknown_dither():
+    with pytest.raises(ValueError, match="Pontilhado desconhecido"):
+        image_pixels(gradient_rgb(), "aleatorio")
+
+
+def test_screen_rgb_resizes_any_image():
+    assert screen_rgb(Image.new("RGB", (640, 480), (10, 20, 30))).shape == (MSX_HEIGHT, MSX_WIDTH, 3)
+    assert screen_rgb(Image.new("L", (100, 400), 200), keep_aspect=True).shape == (MSX_HEIGHT, MSX_WIDTH, 3)
+
+
+def test_import_image_roundtrips_through_vram(tmp_path):
+    path = tmp_path / "gradiente.png"
+    Image.fromarray(gradient_rgb()).save(path)
+    vram = import_image(str(path), "ordenado")
+    assert (vram.to_pixels() == image_pixels(gradient_rgb(), "ordenado")).all()
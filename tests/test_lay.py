@@ -0,0 +1,67 @@
+import numpy as np
+
+from msx_screen2 import new_framebuffer
+from msx_vram import Screen2VRAM
+from msx_files import load_screen_document, save_screen_document
+from msx_lay import LayDecoder, LayFile, decode_lay, encode_lay
+
+
+def random_screen(seed: int) -> np.ndarray:
+    """Tela com duas cores quaisquer por bloco 8x1, longe do par padrão F0."""
+    rng = np.random.default_rng(seed)
+    pairs = rng.integers(0, 16, (192 * 32, 2))
+    bits = rng.integers(0, 2, (192 * 32, 8))
+    return np.take_along_axis(pairs, bits, axis=1).astype(np.uint8).reshape(192, 256)
+
+
+def test_roundtrip_keeps_pattern_and_extra_bytes():
+    pattern = np.random.default_rng(1).integers(0, 256, 0x1800, dtype=np.uint8)
+    pattern[100:900] = 0
+    pattern[2000:2600] = 255
+    lay = LayFile(pattern.tobytes(), unused=b"\x01\x02", padding=b"\x1a" * 5)
+    data = lay.tobytes()
+    again = decode_lay(data)
+    assert again.pattern == lay.pattern
+    assert again.unused == b"\x01\x02" and again.padding == b"\x1a" * 5
+    assert again.tobytes() == data
+
+
+def test_saving_non_f0_screen_keeps_visible_pixels(tmp_path):
+    pixels = random_screen(2)
+    pixels[40:80, 16:64] = 15  # Caixa branca cheia
+    pixels[100:108, 200:216] = 4
+    filename = str(tmp_path / "TELA.LAY")
+    save_screen_document(filename, Screen2VRAM.from_pixels(pixels))
+    loaded = load_screen_document(filename).vram.to_pixels()
+    assert (loaded == np.where(pixels != 0, 15, 0)).all()
+
+
+def test_white_box_on_black_is_not_inverted(tmp_path):
+    pixels = new_framebuffer(0)
+    pixels[8:40, 8:40] = 15
+    filename = str(tmp_path / "CAIXA.LAY")
+    save_screen_document(filename, Screen2VRAM.from_pixels(pixels))
+    assert (load_screen_document(filename).vram.to_pixels() == pixels).all()
+
+
+def test_f0_layout_roundtrip_is_exact():
+    pattern = np.random.default_rng(3).integers(0, 256, 0x1800, dtype=np.uint8).tobytes()
+    assert LayFile.from_vram(LayFile(pattern).to_vram()).pattern == pattern
+
+
+def test_encoder_splits_long_runs():
+    data = encode_lay(bytes(0x1800))
+    assert len(data) == 2 * -(-0x1800 // 255)
+    assert decode_lay(LayFile(bytes(0x1800)).tobytes()).pattern == bytes(0x1800)
+
+
+def test_literals_after_final_run_are_kept_as_unused():
+    pattern = bytes(0x1800 - 300) + b"\xff" * 300  # Termina numa repetição
+    data = LayFile(pattern, unused=b"\x10\x11\x12").tobytes()
+    for chunk_size in (len(data), 7, 1):
+        decoder = LayDecoder()
+        for i in range(0, len(data), chunk_size):
+            decoder.feed(data[i:i + chunk_size])
+        assert decoder.pattern == pattern
+        assert bytes(decoder.unused) == b"\x10\x11\x12"
+    assert decode_lay(data).tobytes() == data
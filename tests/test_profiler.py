@@ -0,0 +1,70 @@
+import json
+
+from msx_profiler import Profiler, profiled
+
+
+class Widget:
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self.calls = []
+
+    @profiled("mouse", kind="input")
+    def on_mouse(self, x):
+        self.calls.append(x)
+        return x * 2
+
+    @profiled("redesenho", kind="render")
+    def redraw(self):
+        self.calls.append("redraw")
+
+
+def test_disabled_profiler_records_nothing():
+    widget = Widget(Profiler())
+    assert widget.on_mouse(3) == 6
+    widget.redraw()
+    assert widget.calls == [3, "redraw"]
+    assert not widget.profiler.events and not widget.profiler.durations
+
+
+def test_latency_spans_from_first_input_to_render():
+    profiler = Profiler(enabled=True)
+    widget = Widget(profiler)
+    widget.on_mouse(1)
+    widget.on_mouse(2)
+    widget.redraw()
+    names = [event["name"] for event in profiler.events]
+    assert names == ["mouse", "mouse", "redesenho", "latencia"]
+    first, latency = profiler.events[0], profiler.events[-1]
+    assert latency["ts"] == first["ts"]  # Conta desde o primeiro evento ainda não desenhado
+    assert latency["dur"] >= sum(event["dur"] for event in list(profiler.events)[:3])
+    widget.redraw()
+    assert [event["name"] for event in profiler.events].count("latencia") == 1
+
+
+def test_end_operation_resets_counters_and_durations():
+    profiler = Profiler(enabled=True)
+    Widget(profiler).on_mouse(1)
+    profiler.count("blocos", 4)
+    summary = profiler.end_operation("linha", pixels=10)
+    assert summary.startswith("Perfil linha:") and "mouse" in summary and "blocos 4" in summary
+    assert "pixels 10" in summary
+    assert profiler.counters == {} and profiler.durations == {}
+    counter = profiler.events[-1]
+    assert counter["ph"] == "C" and counter["args"] == {"blocos": 4, "pixels": 10}
+
+
+def test_chrome_trace_export(tmp_path):
+    profiler = Profiler(enabled=True)
+    widget = Widget(profiler)
+    widget.on_mouse(1)
+    widget.redraw()
+    profiler.end_operation("linha", pixels=1)
+    path = tmp_path / "trace.json"
+    assert profiler.export_chrome_trace(str(path)) == len(profiler.events)
+    with open(path, encoding="utf-8") as f:
+        trace = json.load(f)
+    assert len(trace["traceEvents"]) == len(profiler.events)
+    for event in trace["traceEvents"]:
+        assert event["ph"] in ("X", "C") and isinstance(event["ts"], float) and "pid" in event
+        if event["ph"] == "X":
+            assert event["dur"] >= 0 and "tid" in event
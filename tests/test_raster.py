@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from msx_raster import (ellipse_spans, ellipse_outline_spans, polygon_spans, polygon_outline_points, circle_spans,
+                        circle_points)
+
+
+def coverage(spans, size: int = 320) -> np.ndarray:
+    mask = np.zeros((size, size), dtype=bool)
+    for y, x0, x1 in zip(*spans):
+        mask[y, x0:x1 + 1] = True
+    return mask
+
+
+@pytest.mark.parametrize("cx, cy, rx, ry", [(50, 50, 20, 10), (60, 60, 0, 5), (60, 60, 5, 0), (150, 150, 40, 41)])
+def test_ellipse_outline_is_border_of_filled_ellipse(cx, cy, rx, ry):
+    filled = coverage(ellipse_spans(cx, cy, rx, ry))
+    padded = np.pad(filled, 1)
+    inside = padded[:-2, 1:-1] & padded[2:, 1:-1] & padded[1:-1, :-2] & padded[1:-1, 2:]
+    assert (coverage(ellipse_outline_spans(cx, cy, rx, ry)) == (filled & ~inside)).all()
+
+
+def test_filled_polygon_contains_its_outline():
+    points = [(10, 10), (200, 40), (120, 180), (30, 120)]
+    filled = coverage(polygon_spans(points))
+    xs, ys = polygon_outline_points(points)
+    assert filled[ys, xs].all()
+    assert filled[100, 100] and not filled[5, 5]
+
+
+def test_filled_circle_covers_every_row_between_its_edges():
+    filled = coverage(circle_spans(100, 100, 30))
+    xs, ys = circle_points(100, 100, 30)
+    assert filled[ys, xs].all()
+    for y in range(70, 131):
+        row = np.flatnonzero(filled[y])
+        assert row.size == row[-1] - row[0] + 1
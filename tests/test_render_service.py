@@ -0,0 +1,89 @@
+import os
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from msx_render_service import RenderCache, RenderServer, render_png
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLES = os.path.join(ROOT, "III")
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = RenderServer(("127.0.0.1", 0), SAMPLES, RenderCache())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get(server, query: str):
+    url = f"http://127.0.0.1:{server.server_address[1]}{query}"
+    try:
+        with urllib.request.urlopen(url, timeout=10) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def test_renders_png(server):
+    status, data = get(server, "/render?path=FRANCE.GRP&scale=2")
+    assert status == 200 and data.startswith(b"\x89PNG")
+
+
+@pytest.mark.parametrize("path", ["../main.py", "%2Fetc%2Fpasswd", "..%2F..%2Fetc%2Fpasswd"])
+def test_paths_outside_root_are_forbidden(server, path):
+    assert get(server, f"/render?path={path}")[0] == 403
+
+
+def test_resolve_rejects_escapes(server):
+    with pytest.raises(PermissionError):
+        server.resolve("../main.py")
+    with pytest.raises(PermissionError):
+        server.resolve(os.path.abspath(os.path.join(ROOT, "main.py")))
+    assert server.resolve("FRANCE.GRP") == os.path.join(server.root, "FRANCE.GRP")
+
+
+@pytest.mark.parametrize("query", ["", "path=ALFABET1.SHP&shape=x", "path=ALFABET1.SHP&shape=-1",
+                                   "path=FRANCE.GRP&scale=0", "path=FRANCE.GRP&scale=9"])
+def test_invalid_parameters(server, query):
+    assert get(server, f"/render?{query}")[0] == 400
+
+
+@pytest.mark.parametrize("query", ["path=ALFABET1.SHP&shape=999", "path=NADA.SCR"])
+def test_missing_file_or_shape(server, query):
+    assert get(server, f"/render?{query}")[0] == 404
+
+
+def test_shape_of_a_screen_is_unprocessable(server):
+    assert get(server, "/render?path=FRANCE.GRP&shape=0")[0] == 422
+
+
+def test_cache_evicts_oldest_bytes():
+    cache = RenderCache(max_bytes=10)
+    cache.put("a", b"1234")
+    cache.put("b", b"1234")
+    assert cache.get("a") == b"1234"  # a passa a ser o mais recente
+    cache.put("c", b"1234")
+    assert cache.get("b") is None and cache.get("a") and cache.get("c")
+    assert cache.nbytes == 8
+    cache.put("grande", b"x" * 11)
+    assert cache.get("grande") is None and cache.nbytes == 8
+
+
+def test_modified_file_gets_a_new_key(tmp_path):
+    path = tmp_path / "FRANCE.GRP"
+    with open(os.path.join(SAMPLES, "FRANCE.GRP"), "rb") as f:
+        path.write_bytes(f.read())
+    cache = RenderCache()
+    first = render_png(str(path), cache=cache)
+    assert render_png(str(path), cache=cache) == first
+    assert (cache.hits, cache.misses) == (1, 1)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    render_png(str(path), cache=cache)
+    assert cache.misses == 2 and len(cache._items) == 2
@@ -0,0 +1,43 @@
+import glob
+import os
+
+import numpy as np
+import pytest
+
+from msx_vram import TABLES_SIZE
+from msx_scr import DATA_OFFSET, PROGRAM_SIZE, ScrFile, parse_scr
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLES = sorted(glob.glob(os.path.join(ROOT, "III", "*.SCR")) + glob.glob(os.path.join(ROOT, "readers", "*.scr")))
+
+
+@pytest.mark.parametrize("filename", SAMPLES, ids=os.path.basename)
+def test_sample_roundtrip_is_byte_exact(filename):
+    with open(filename, "rb") as f:
+        data = f.read()
+    assert parse_scr(data).tobytes() == data
+
+
+def test_new_screen_roundtrip():
+    rng = np.random.default_rng(4)
+    scr = ScrFile()
+    scr.vram.buffer[:] = rng.integers(0, 256, TABLES_SIZE, dtype=np.uint8).tobytes()
+    again = parse_scr(scr.tobytes())
+    assert again.vram.buffer == scr.vram.buffer
+    assert again.tobytes() == scr.tobytes()
+
+
+def test_truncated_file_stays_truncated_when_untouched():
+    data = ScrFile().tobytes()[:DATA_OFFSET + 1000]
+    assert parse_scr(data).tobytes() == data
+
+
+def test_drawing_in_missing_part_of_truncated_file_is_saved():
+    scr = parse_scr(ScrFile().tobytes()[:DATA_OFFSET + 1000])
+    scr.vram.buffer[5000] = 0xAA
+    scr.vram.buffer[TABLES_SIZE - 1] = 0x4F
+    again = parse_scr(scr.tobytes())
+    assert again.vram.buffer == scr.vram.buffer
+    assert again.table_length == TABLES_SIZE
+    end = again.header[3] | (again.header[4] << 8)
+    assert end >= again.base_address + PROGRAM_SIZE + TABLES_SIZE - 1
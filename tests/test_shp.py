@@ -0,0 +1,62 @@
+import glob
+import os
+
+import pytest
+
+from msx_shp import ShapeCache, ShapeLibrary, index_shapes
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLES = sorted(glob.glob(os.path.join(ROOT, "III", "*.SHP")))
+
+
+def shape_block(number: int, shape_type: int, width: int, height_chars: int, planes) -> bytes:
+    return bytes([number, shape_type, width, height_chars]) + b"".join(planes)
+
+
+@pytest.fixture
+def library_file(tmp_path):
+    # Shape 1: 16x8 monocromático, caractere 0 todo 0x01 e caractere 1 com a linha no byte
+    pattern = bytes([0x01] * 8) + bytes(range(8))
+    # Shape 2: 8x16 colorido com máscara
+    mask, colored, color = bytes([0xFF] * 16), bytes([0xAA] * 16), bytes([0x4F] * 16)
+    path = tmp_path / "TESTE.SHP"
+    path.write_bytes(shape_block(1, 1, 16, 1, [pattern]) + shape_block(2, 4, 8, 2, [mask, colored, color]) + b"\xff")
+    return str(path)
+
+
+def test_index_and_decode(library_file):
+    with ShapeLibrary(library_file, ShapeCache()) as library:
+        assert library.complete and len(library) == 2
+        first, second = library
+        assert (first.width, first.height, first.shape_type) == (16, 8, 1)
+        # Cada linha de pixels junta os bytes da mesma linha dos dois caracteres
+        assert first.pattern.tolist() == [[0x01, row] for row in range(8)]
+        assert first.color is None and first.mask is None
+        assert (second.width, second.height) == (8, 16)
+        assert (second.mask == 0xFF).all() and (second.color == 0x4F).all()
+        assert second.to_pixels().shape == (16, 8)
+
+
+def test_truncated_library_keeps_whole_shapes(library_file):
+    with open(library_file, "rb") as f:
+        data = f.read()
+    entries, complete = index_shapes(data[:-10])
+    assert not complete and [entry.number for entry in entries] == [1]
+
+
+def test_cache_is_shared_and_released(library_file):
+    cache = ShapeCache()
+    library = ShapeLibrary(library_file, cache)
+    assert library[0] is library[0]
+    assert cache.nbytes > 0
+    library.close()
+    assert cache.nbytes == 0
+
+
+@pytest.mark.parametrize("filename", SAMPLES, ids=os.path.basename)
+def test_sample_libraries_decode(filename):
+    # Inclui bancos vazios (AMOR.SHP) e truncados (FERRAMEN.SHP)
+    with ShapeLibrary(filename, ShapeCache()) as library:
+        for shape in library:
+            assert shape.pattern.shape == (shape.height, shape.width // 8)
+            assert shape.to_pixels().max() < 16
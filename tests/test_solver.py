@@ -0,0 +1,49 @@
+import numpy as np
+
+from msx_screen2 import MSX_PALETTE_RGB, MSX_WIDTH, MSX_HEIGHT, new_block_mask, rank_block_colors
+from msx_solver import COLOR_PAIRS, apply_optimal_constraint, color_distances, pair_errors, solve_blocks, solve_screen
+
+
+def block_colors(pixels: np.ndarray) -> np.ndarray:
+    return rank_block_colors(pixels.reshape(-1, 8))[2]
+
+
+def test_solve_screen_uses_two_colors_per_block():
+    rgb = np.random.default_rng(1).integers(0, 256, (MSX_HEIGHT, MSX_WIDTH, 3), dtype=np.uint8)
+    pixels = solve_screen(rgb)
+    assert pixels.shape == (MSX_HEIGHT, MSX_WIDTH) and pixels.dtype == np.uint8
+    assert block_colors(pixels).max() <= 2
+
+
+def test_solve_blocks_matches_best_pair():
+    blocks = np.random.default_rng(2).integers(0, 256, (300, 8, 3), dtype=np.uint8)
+    indices, errors = solve_blocks(blocks)
+    scores = pair_errors(blocks)
+    assert np.allclose(errors, scores.min(axis=1))
+    # O erro devolvido é o dos índices escolhidos
+    chosen = np.take_along_axis(color_distances(blocks), indices[..., None].astype(np.intp), axis=2)
+    assert np.allclose(chosen[..., 0].sum(axis=1), errors, rtol=1e-5)
+
+
+def test_palette_blocks_with_two_colors_are_kept():
+    rng = np.random.default_rng(3)
+    pairs = COLOR_PAIRS[rng.integers(0, len(COLOR_PAIRS), 200)]
+    blocks = np.take_along_axis(pairs, rng.integers(0, 2, (200, 8)), axis=1)
+    indices, errors = solve_blocks(MSX_PALETTE_RGB[blocks])
+    # As cores 0 e 1 são o mesmo preto: só compara o RGB
+    assert (MSX_PALETTE_RGB[indices] == MSX_PALETTE_RGB[blocks]).all()
+    assert not errors.any()
+
+
+def test_apply_optimal_constraint_only_fixes_marked_blocks():
+    pixels = np.random.default_rng(4).integers(0, 16, (MSX_HEIGHT, MSX_WIDTH), dtype=np.uint8)
+    before = pixels.copy()
+    dirty = new_block_mask()
+    dirty[:96] = True
+    changed = apply_optimal_constraint(pixels, dirty)
+    assert changed == np.count_nonzero(pixels != before)
+    assert block_colors(pixels[:96]).max() <= 2
+    assert (pixels[96:] == before[96:]).all()
+    apply_optimal_constraint(pixels, ~new_block_mask())
+    assert block_colors(pixels).max() <= 2
+    assert apply_optimal_constraint(pixels, ~new_block_mask()) == 0
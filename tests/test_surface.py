@@ -0,0 +1,45 @@
+import threading
+
+import numpy as np
+
+from msx_screen2 import MSX_WIDTH, MSX_HEIGHT, rank_block_colors
+from msx_surface import Screen2Surface
+from msx_vram import Screen2VRAM
+
+
+def test_threads_drawing_while_reading_vram():
+    surface = Screen2Surface()
+    errors, snapshots = [], []
+
+    def draw(seed):
+        rng = np.random.default_rng(seed)
+        try:
+            for _ in range(200):
+                x0, x1 = rng.integers(0, MSX_WIDTH, 2)
+                y0, y1 = rng.integers(0, MSX_HEIGHT, 2)
+                surface.rectangle(int(x0), int(y0), int(x1), int(y1), bool(rng.integers(2)), int(rng.integers(1, 16)))
+                surface.commit(0, "otima")
+        except Exception as e:
+            errors.append(e)
+
+    def read():
+        try:
+            for _ in range(50):
+                with surface.lock:
+                    snapshots.append((surface.snapshot(), surface.to_vram()))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=draw, args=(seed,)) for seed in range(4)] + [threading.Thread(target=read)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    # Cada leitura viu a tela inteira de um instante: as tabelas reproduzem o snapshot tirado junto
+    for pixels, vram in snapshots:
+        assert (vram.to_pixels() == Screen2VRAM.from_pixels(pixels).to_pixels()).all()
+    surface.commit(0, "otima")
+    assert rank_block_colors(surface.pixels.reshape(-1, 8))[2].max() <= 2
+    assert (surface.to_vram().to_pixels() == surface.pixels).all()
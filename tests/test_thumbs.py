@@ -0,0 +1,40 @@
+import time
+
+import msx_thumbs
+from msx_thumbs import MemoryThumbnailStore, ThumbnailLoader
+
+
+class MemoryStore:
+    def __init__(self):
+        self.rows = []
+
+    def lookup(self, entries):
+        return {}
+
+    def store(self, rows):
+        self.rows += rows
+
+
+def test_unexpected_decoder_error_still_completes(monkeypatch):
+    def broken(path):
+        if path == "ruim.scr":
+            raise IndexError("tabela truncada")
+        return b"png"
+
+    monkeypatch.setattr(msx_thumbs, "make_thumbnail", broken)
+    loader = ThumbnailLoader(MemoryStore(), workers=2)
+    loader.request([("ruim.scr", 1, 10), ("bom.scr", 1, 10)])
+    ready = []
+    deadline = time.monotonic() + 5
+    while loader.pending and time.monotonic() < deadline:
+        ready += loader.poll()
+        time.sleep(0.01)
+    loader.shutdown()
+    assert loader.pending == 0
+    assert sorted(ready) == [("bom.scr", b"png"), ("ruim.scr", None)]
+
+
+def test_memory_store_checks_signature():
+    store = MemoryThumbnailStore()
+    store.store([("a.scr", 1, 10, b"png-a"), ("b.scr", 1, 10, b"png-b")])
+    assert store.lookup([("a.scr", 1, 10), ("b.scr", 2, 10), ("c.scr", 1, 10)]) == {"a.scr": b"png-a"}
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from graphos_db import GraphosDB
+from msx_vram import Screen2VRAM, TABLES_SIZE
+from msx_versions import (FULL_SNAPSHOT_INTERVAL, CELL_COUNT, ScreenVersions, apply_delta, encode_delta,
+                          vram_cells)
+
+
+@pytest.fixture
+def versions(tmp_path):
+    db = GraphosDB(str(tmp_path / "teste.db"))
+    yield ScreenVersions(db)
+    db.close()
+
+
+def edited_screens(count: int):
+    """Telas sucessivas, cada uma com algumas células alteradas em relação à anterior."""
+    rng = np.random.default_rng(13)
+    vram = Screen2VRAM()
+    screens = []
+    for _ in range(count):
+        vram = vram.copy()
+        for offset in rng.integers(0, TABLES_SIZE, 20):
+            vram.buffer[offset] = int(rng.integers(0, 256))
+        screens.append(vram)
+    return screens
+
+
+def test_every_version_is_restored_exactly(versions):
+    screens = edited_screens(FULL_SNAPSHOT_INTERVAL + 8)
+    for number, vram in enumerate(screens, 1):
+        assert versions.save("tela", vram) == number
+    kinds = {info.version: info.kind for info in versions.versions("tela")}
+    assert kinds[1] == kinds[FULL_SNAPSHOT_INTERVAL + 1] == "full" and kinds[2] == "delta"
+    for number, vram in enumerate(screens, 1):
+        assert versions.load("tela", number).buffer == vram.buffer
+    assert versions.load("tela").buffer == screens[-1].buffer
+
+    # Outra instância (sem o cache da última versão) continua a partir do banco
+    reopened = ScreenVersions(versions.db)
+    assert reopened.save("tela", screens[0]) == len(screens) + 1
+    assert reopened.load("tela").buffer == screens[0].buffer
+
+
+def test_unchanged_save_keeps_the_version(versions):
+    vram = edited_screens(1)[0]
+    assert versions.save("tela", vram) == 1
+    assert versions.save("tela", vram.copy()) == 1
+    assert len(versions.versions("tela")) == 1
+
+
+def test_unknown_screen_or_version(versions):
+    versions.save("tela", Screen2VRAM())
+    with pytest.raises(KeyError):
+        versions.load("outra")
+    with pytest.raises(KeyError):
+        versions.load("tela", 2)
+
+
+def test_delta_keeps_only_changed_cells():
+    previous = vram_cells(Screen2VRAM())
+    current = previous.copy()
+    current[[0, 100, CELL_COUNT - 1], 3] ^= 0xFF
+    blob, cells = encode_delta(previous, current)
+    assert cells == 3
+    restored = previous.copy()
+    apply_delta(restored, blob)
+    assert (restored == current).all()
@@ -0,0 +1,121 @@
+import pytest
+
+import msx_viewport
+from msx_screen2 import MSX_WIDTH, MSX_HEIGHT
+from msx_viewport import CELL_COLS, CELL_ROWS, CELL_SIZE, ZOOM_LEVELS, TileViewport
+
+
+class FakeImage:
+    """Substitui tk.PhotoImage: conta as cópias ampliadas feitas para a célula."""
+
+    def __init__(self, width=0, height=0):
+        self.tk = self
+        self.copies = 0
+
+    def call(self, *args):
+        self.copies += 1
+
+
+class FakeCanvas:
+    """Rolagem como a do Tk: a origem da janela dentro da scrollregion, limitada às bordas."""
+
+    def __init__(self, width: int, height: int):
+        self.width, self.height = width, height
+        self.left = self.top = 0.0
+        self.region = (0, 0, 0, 0)
+        self.items = set()
+        self._next = 0
+
+    def configure(self, scrollregion):
+        self.region = scrollregion
+
+    def winfo_width(self):
+        return self.width
+
+    def winfo_height(self):
+        return self.height
+
+    def canvasx(self, x):
+        return self.left + x
+
+    def canvasy(self, y):
+        return self.top + y
+
+    def xview_moveto(self, fraction):
+        self.left = max(min(fraction * self.region[2], self.region[2] - self.width), 0)
+
+    def yview_moveto(self, fraction):
+        self.top = max(min(fraction * self.region[3], self.region[3] - self.height), 0)
+
+    def create_image(self, *args, **kwargs):
+        self._next += 1
+        self.items.add(self._next)
+        return self._next
+
+    def tag_lower(self, item):
+        pass
+
+    def delete(self, item):
+        self.items.discard(item)
+
+
+@pytest.fixture
+def viewport(monkeypatch):
+    monkeypatch.setattr(msx_viewport.tk, "PhotoImage", FakeImage)
+    return TileViewport(FakeCanvas(200, 150), FakeImage(), zoom=4)
+
+
+def test_visible_cells(viewport):
+    span = CELL_SIZE * 4
+    assert viewport.visible_cells() == (0, 0, 199 // span, 149 // span)
+    viewport.canvas.xview_moveto(1.0)
+    viewport.canvas.yview_moveto(1.0)
+    assert viewport.visible_cells() == ((MSX_WIDTH * 4 - 200) // span, (MSX_HEIGHT * 4 - 150) // span,
+                                        CELL_COLS - 1, CELL_ROWS - 1)
+
+
+@pytest.mark.parametrize("zoom", ZOOM_LEVELS)
+def test_zoom_keeps_the_pixel_under_the_cursor(viewport, zoom):
+    viewport.canvas.xview_moveto(0.3)
+    viewport.canvas.yview_moveto(0.3)
+    cursor = (90, 70)
+    before = viewport.msx_coords(*cursor)
+    viewport.set_zoom(zoom, *cursor)
+    assert viewport.zoom == zoom
+    assert viewport.canvas.region == (0, 0, MSX_WIDTH * zoom, MSX_HEIGHT * zoom)
+    assert viewport.msx_coords(*cursor) == before
+
+
+def test_zoom_clears_the_cache_and_shows_the_window(viewport):
+    viewport.show_visible()
+    old_items = set(viewport.canvas.items)
+    viewport.set_zoom(8, 100, 75)
+    cx0, cy0, cx1, cy1 = viewport.visible_cells()
+    assert set(viewport.tiles) == {(cx, cy) for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1)}
+    assert not old_items & viewport.canvas.items
+
+
+def test_cache_is_bounded_but_keeps_visible_cells(viewport):
+    tile_bytes = 4 * (CELL_SIZE * viewport.zoom) ** 2
+    viewport.cache_bytes = 40 * tile_bytes
+    for fraction in (0.0, 0.2, 0.4, 0.6, 0.8, 1.0):
+        viewport.canvas.xview_moveto(fraction)
+        viewport.show_visible()
+        cx0, cy0, cx1, cy1 = viewport.visible_cells()
+        visible = {(cx, cy) for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1)}
+        assert visible <= set(viewport.tiles)
+        assert len(viewport.tiles) <= max(40, len(visible))
+        assert len(viewport.canvas.items) == len(viewport.tiles)
+
+
+def test_invalidate_rerenders_visible_and_drops_hidden(viewport):
+    viewport.cache_bytes = 1 << 30
+    viewport.show_visible()
+    viewport.canvas.xview_moveto(1.0)
+    viewport.show_visible()  # (0, 0) continua no cache, fora da janela
+    visible_cell = (CELL_COLS - 1, 0)
+    image = viewport.tiles[visible_cell][0]
+    copies = image.copies
+    viewport.invalidate(0, 0, MSX_WIDTH - 1, 7)
+    assert (0, 0) not in viewport.tiles
+    assert viewport.tiles[visible_cell][0].copies == copies + 1